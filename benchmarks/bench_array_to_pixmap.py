@@ -0,0 +1,53 @@
+"""Per-frame cost of converting a uint8 array to a QPixmap.
+
+Compares the PIL round trip (`Image.fromarray` followed by
+`ImageQt.toqpixmap`) with wrapping the array as QImage without copying.
+
+Usage (with pimsviewer installed):
+
+    python benchmarks/bench_array_to_pixmap.py [--repeat N]
+"""
+import os
+import sys
+import timeit
+import argparse
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PIL import Image, ImageQt
+from PyQt5.QtWidgets import QApplication
+
+from pimsviewer.utils import qimage_from_array, image_to_pixmap
+
+
+def pil_round_trip(array):
+    return ImageQt.toqpixmap(Image.fromarray(array))
+
+
+def zero_copy(array):
+    return image_to_pixmap(qimage_from_array(array))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+
+    print('%-6s %-5s %12s %12s %8s' % ('size', 'mode', 'PIL (ms)', 'QImage (ms)', 'speedup'))
+    for size in [2048, 8192]:
+        for mode, shape in [('gray', (size, size)), ('rgb', (size, size, 3))]:
+            array = np.random.randint(0, 255, shape, dtype=np.uint8)
+
+            before = min(timeit.repeat(lambda: pil_round_trip(array), number=1, repeat=args.repeat))
+            after = min(timeit.repeat(lambda: zero_copy(array), number=1, repeat=args.repeat))
+
+            print('%-6s %-5s %12.2f %12.2f %7.1fx' % ('%dk' % (size // 1024), mode, before * 1e3, after * 1e3, before / after))
+
+    app.exit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Time to first frame of `pimsviewer <file>`.
+
+Every run starts a fresh Python process that imports pimsviewer, creates the
+main window with the example plugins (like the `pimsviewer` command), opens
+the file and shows its first frame. The median time since process start is
+reported for each of these phases. Without a file, a 2048x2048 PNG is used.
+
+Usage (with pimsviewer installed):
+
+    python benchmarks/bench_startup.py [FILE] [--repeat N] [--max-ms MS]
+
+With --max-ms, the exit status is 1 when the median time to first frame is
+larger, so that startup regressions can be caught in CI.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+CHILD = """
+import sys, time
+start = float(sys.argv[1])
+times = [time.time()]
+
+from PyQt5.QtWidgets import QApplication
+from pimsviewer.gui import GUI
+from pimsviewer.example_plugins import AnnotatePlugin, ProcessingPlugin
+times.append(time.time())
+
+app = QApplication(sys.argv)
+gui = GUI(extra_plugins=[AnnotatePlugin, ProcessingPlugin])
+times.append(time.time())
+
+gui.open(fileName=sys.argv[2], wait=True)
+gui.show()
+app.processEvents()
+times.append(time.time())
+
+print(' '.join('%f' % (t - start) for t in times))
+"""
+
+PHASES = ['interpreter', 'imports', 'window', 'first frame']
+
+
+def write_test_file(directory):
+    from PIL import Image
+
+    filename = os.path.join(directory, 'startup.png')
+    Image.fromarray(np.random.randint(0, 255, (2048, 2048), dtype=np.uint8)).save(filename)
+    return filename
+
+
+def run_once(filename):
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    start = time.time()
+    output = subprocess.check_output([sys.executable, '-c', CHILD, repr(start), filename], env=env)
+    return [float(t) for t in output.decode().split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('file', nargs='?')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = args.file or write_test_file(directory)
+
+        # the first run warms the disk cache and compiled bytecode
+        run_once(filename)
+        runs = np.array([run_once(filename) for _ in range(args.repeat)])
+
+    medians = np.median(runs, axis=0) * 1e3
+    print('%-12s %10s %10s' % ('phase', 'done (ms)', 'took (ms)'))
+    previous = 0.0
+    for phase, done in zip(PHASES, medians):
+        print('%-12s %10.0f %10.0f' % (phase, done, done - previous))
+        previous = done
+
+    if args.max_ms is not None and medians[-1] > args.max_ms:
+        print('Time to first frame of %.0f ms exceeds %.0f ms' % (medians[-1], args.max_ms))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""Timings of the viewer's hot paths on synthetic files.
+
+Runs on the offscreen Qt platform, on a synthetic file (see synthetic.py) of
+the given axis sizes and dtype, and times per call:
+
+    reader_getitem      WrappedReader.__getitem__ along t
+    get_current_frame   GUI.get_current_frame, stepping along t
+    composite           Compositor.composite of the current frames
+    array_to_pixmap     PimsImage.array_to_pixmap of the composited frames
+    annotate_index      AnnotatePlugin.set_positions of a large DataFrame
+    annotate_show_frame AnnotatePlugin.showFrame, stepping along t
+
+and measures the sustained frame rate of playback along t, at the frame
+rate of the file (playback) and as fast as possible (playback_max).
+
+Results are printed and can be saved as JSON, and compared to an earlier
+run; with --threshold, the exit status is 1 when any median time grew by
+more than that factor.
+
+Usage (with pimsviewer installed):
+
+    python benchmarks/bench_suite.py [--sizes t=100,c=3,y=1024,x=1024] [--dtype uint16]
+        [--output results.json] [--compare baseline.json [--threshold 1.2]]
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pims
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtWidgets import QApplication
+
+import pimsviewer
+from pimsviewer.gui import GUI
+from pimsviewer.wrapped_reader import WrappedReader
+from pimsviewer.example_plugins import AnnotatePlugin
+
+from synthetic import synthetic_file
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__[len('bench_'):]] = func
+    return func
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def timing_stats(durations):
+    durations = np.asarray(durations) * 1e3
+    return OrderedDict([('unit', 'ms'), ('n', len(durations)), ('median', float(np.median(durations))),
+                        ('p95', float(np.percentile(durations, 95))), ('min', float(durations.min())),
+                        ('mean', float(durations.mean()))])
+
+
+def set_position(gui, dim, position):
+    """Moves along an axis without showing the frame."""
+    dimension = gui.dimensions[dim]
+    dimension.blockSignals(True)
+    dimension.position = position
+    dimension.blockSignals(False)
+
+
+def positions_dataframe(n, frames, width, height):
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'frame': np.sort(rng.integers(0, frames, n)), 'x': rng.random(n) * width,
+                         'y': rng.random(n) * height, 'r': 2 + rng.random(n) * 8})
+
+
+@benchmark
+def bench_reader_getitem(context):
+    reader = WrappedReader(pims.open(context.filename))
+    reader.iter_axes = 't'
+    reader.bundle_axes = 'cyx' if 'c' in context.sizes else 'yx'
+    try:
+        return timing_stats([timed(reader.__getitem__, i) for i in range(context.frames)])
+    finally:
+        reader.close()
+
+
+@benchmark
+def bench_get_current_frame(context):
+    gui = context.gui
+    durations = []
+    for i in range(context.frames):
+        set_position(gui, 't', i)
+        durations.append(timed(gui.get_current_frame))
+    return timing_stats(durations)
+
+
+def current_frames(context, n=8):
+    gui = context.gui
+    frames = []
+    for i in range(min(n, context.frames)):
+        set_position(gui, 't', i)
+        frames.append((gui.get_current_request(), gui.get_current_frame()))
+    return frames
+
+
+@benchmark
+def bench_composite(context):
+    gui = context.gui
+    projections = gui.get_projections()
+    frames = [(frame, request.bundle_axes) for request, frame in current_frames(context)]
+    durations = [timed(gui.compositor.composite, *frames[i % len(frames)], projections)
+                 for i in range(context.frames)]
+    return timing_stats(durations)
+
+
+@benchmark
+def bench_array_to_pixmap(context):
+    gui = context.gui
+    projections = gui.get_projections()
+    data = [gui.compositor.composite(frame, request.bundle_axes, projections).copy()
+            for request, frame in current_frames(context)]
+    image = gui.imageView.image
+    return timing_stats([timed(image.array_to_pixmap, data[i % len(data)]) for i in range(context.frames)])
+
+
+@benchmark
+def bench_annotate_index(context):
+    plugin = context.annotate
+    durations = [timed(plugin.set_positions, context.positions_df) for _ in range(3)]
+    return timing_stats(durations)
+
+
+@benchmark
+def bench_annotate_show_frame(context):
+    gui = context.gui
+    plugin = context.annotate
+    plugin.set_positions(context.positions_df)
+
+    durations = []
+    for i in range(context.frames):
+        set_position(gui, 't', i)
+        durations.append(timed(plugin.showFrame, gui.imageView, gui.dimensions))
+
+    # the markers would otherwise be drawn during playback
+    plugin.clearAll(gui.imageView)
+    return timing_stats(durations)
+
+
+def play(context, fps, max_playback_fps):
+    gui = context.gui
+    dimension = gui.dimensions['t']
+    dimension.position = 0
+    dimension.max_playback_fps = max_playback_fps
+    dimension.fps = fps
+
+    loop = QEventLoop()
+    QTimer.singleShot(int(context.duration * 1e3), loop.quit)
+    dimension.playing = True
+    loop.exec_()
+    dimension.playing = False
+
+    return OrderedDict([('unit', 'fps'), ('target_fps', min(fps, max_playback_fps)),
+                        ('achieved_fps', dimension.clock.achieved_fps), ('dropped', dimension.clock.dropped)])
+
+
+@benchmark
+def bench_playback(context):
+    return play(context, context.fps, context.fps)
+
+
+@benchmark
+def bench_playback_max(context):
+    return play(context, 1000.0, 1000.0)
+
+
+class Context(object):
+    """What the benchmarks run on: the file, a viewer showing it and an Annotate plugin."""
+
+    def __init__(self, filename, sizes, args):
+        super(Context, self).__init__()
+
+        self.filename = filename
+        self.sizes = sizes
+        self.frames = min(args.frames, sizes['t'])
+        self.fps = args.fps
+        self.duration = args.duration
+
+        self.gui = GUI(extra_plugins=[AnnotatePlugin])
+        self.gui.resize(1280, 1024)
+        self.gui.show()
+        self.gui.open(fileName=filename, wait=True)
+        if 'c' in sizes:
+            self.gui.dimensions['c'].merge = True
+
+        self.annotate = [plugin for plugin in self.gui.plugins if isinstance(plugin, AnnotatePlugin)][0]
+        self.positions_df = positions_dataframe(args.positions, sizes['t'], sizes['x'], sizes['y'])
+
+    def close(self):
+        self.gui.close_file()
+        self.gui.close()
+
+
+def parse_sizes(value):
+    sizes = OrderedDict()
+    for part in value.split(','):
+        dim, _, size = part.partition('=')
+        sizes[dim.strip()] = int(size)
+    if 't' not in sizes or 'x' not in sizes or 'y' not in sizes:
+        raise argparse.ArgumentTypeError('sizes should include t, y and x')
+    return sizes
+
+
+def environment():
+    import PyQt5.QtCore
+
+    return OrderedDict([('python', platform.python_version()), ('platform', platform.platform()),
+                        ('processor', platform.processor()), ('cpus', os.cpu_count()),
+                        ('numpy', np.__version__), ('pims', pims.__version__), ('qt', PyQt5.QtCore.QT_VERSION_STR),
+                        ('pimsviewer', os.path.dirname(pimsviewer.__file__))])
+
+
+def print_results(results, baseline=None):
+    print('%-20s %10s %10s %10s %10s' % ('benchmark', 'median', 'p95', 'baseline', 'ratio'))
+    for name, result in results.items():
+        old = (baseline or {}).get(name)
+        if result['unit'] == 'ms':
+            values = (result['median'], result['p95'])
+            key = 'median'
+        else:
+            values = (result['achieved_fps'], result['target_fps'])
+            key = 'achieved_fps'
+
+        row = '%-20s %10.2f %10.2f' % ((name,) + values)
+        if old is not None:
+            row += ' %10.2f %9.2fx' % (old[key], result[key] / old[key] if old[key] else float('nan'))
+        print('%s  %s' % (row, result['unit']))
+
+
+def regressions(results, baseline, threshold):
+    """Names of the timings that are slower than in the baseline by more than threshold."""
+    return [name for name, result in results.items()
+            if result['unit'] == 'ms' and name in baseline and result['median'] > threshold * baseline[name]['median']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('t=100,c=3,y=1024,x=1024'),
+                        help='axis sizes of the synthetic file (default: t=100,c=3,y=1024,x=1024)')
+    parser.add_argument('--dtype', default='uint16')
+    parser.add_argument('--frames', type=int, default=50, help='number of frames stepped through')
+    parser.add_argument('--positions', type=int, default=1000000, help='number of rows of the Annotate DataFrame')
+    parser.add_argument('--fps', type=float, default=60.0, help='frame rate of playback')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds of playback')
+    parser.add_argument('--only', help='comma separated benchmarks to run (default: all)')
+    parser.add_argument('--output', help='JSON file to save the results to')
+    parser.add_argument('--compare', help='JSON file of an earlier run')
+    parser.add_argument('--threshold', type=float, help='fail when a median time is this factor slower than --compare')
+    args = parser.parse_args()
+
+    names = list(BENCHMARKS) if args.only is None else args.only.split(',')
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error("Unknown benchmark '%s', choose from %s" % (name, ', '.join(BENCHMARKS)))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    app = QApplication(sys.argv)
+
+    results = OrderedDict()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = synthetic_file(directory, args.sizes, args.dtype)
+        context = Context(filename, args.sizes, args)
+        try:
+            for name in names:
+                results[name] = BENCHMARKS[name](context)
+                app.processEvents()
+        finally:
+            context.close()
+
+    config = OrderedDict([('sizes', args.sizes), ('dtype', args.dtype), ('frames', args.frames),
+                          ('positions', args.positions), ('fps', args.fps), ('duration', args.duration)])
+    if baseline is not None and json.loads(json.dumps(config)) != baseline['config']:
+        print('Warning: the baseline was run with other settings: %s' % json.dumps(baseline['config']))
+
+    print_results(results, baseline and baseline['results'])
+
+    if args.output:
+        run = OrderedDict([('created', datetime.datetime.now().isoformat()), ('environment', environment()),
+                           ('config', config), ('results', results)])
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    if baseline is not None and args.threshold is not None:
+        slower = regressions(results, baseline['results'], args.threshold)
+        if slower:
+            print('Slower than %.2fx the baseline: %s' % (args.threshold, ', '.join(slower)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Synthetic files for benchmarks, of any size, dtype and axis layout.
+
+A file named like 't100_c3_y1024_x1024_uint16.synthetic' is opened by
+`pims.open` (and so by pimsviewer) as a FramesSequenceND with those axis
+sizes and pixel type, once this module is imported. The file itself can be
+empty: planes are computed, at about the cost of a copy, so that timings
+measure pimsviewer instead of a decoder.
+"""
+import os
+import re
+import numpy as np
+from pims import FramesSequenceND
+
+EXTENSION = 'synthetic'
+
+
+def synthetic_name(sizes, dtype='uint16'):
+    return '%s_%s.%s' % ('_'.join('%s%d' % (dim, size) for dim, size in sizes.items()), np.dtype(dtype).name, EXTENSION)
+
+
+def parse_synthetic_name(filename):
+    """Returns the axis sizes and dtype encoded in a file name."""
+    parts = os.path.splitext(os.path.basename(filename))[0].split('_')
+    sizes = {}
+    for part in parts[:-1]:
+        match = re.match(r'^([a-z])(\d+)$', part)
+        if match is None:
+            raise ValueError("Cannot parse axis '%s' of %s" % (part, filename))
+        sizes[match.group(1)] = int(match.group(2))
+
+    if 'x' not in sizes or 'y' not in sizes:
+        raise ValueError("%s has no x and y axes" % filename)
+
+    return sizes, np.dtype(parts[-1])
+
+
+def synthetic_file(directory, sizes, dtype='uint16'):
+    """Creates an (empty) synthetic file in directory and returns its name."""
+    filename = os.path.join(directory, synthetic_name(sizes, dtype))
+    open(filename, 'w').close()
+    return filename
+
+
+class SyntheticReader(FramesSequenceND):
+    class_priority = 20
+
+    @classmethod
+    def class_exts(cls):
+        return {EXTENSION}
+
+    def __init__(self, filename, **kwargs):
+        super(SyntheticReader, self).__init__()
+
+        self.filename = filename
+        sizes, self._dtype = parse_synthetic_name(filename)
+        for dim, size in sizes.items():
+            self._init_axis(dim, size)
+
+        # planes are read one at a time, like most microscopy readers do
+        self._register_get_frame(self._get_plane, 'yx')
+
+        rng = np.random.default_rng(0)
+        if self._dtype.kind == 'f':
+            self._plane = rng.random((sizes['y'], sizes['x'])).astype(self._dtype)
+        else:
+            high = min(np.iinfo(self._dtype).max, 4095)
+            self._plane = rng.integers(0, high // 2, (sizes['y'], sizes['x'])).astype(self._dtype)
+
+    @property
+    def pixel_type(self):
+        return self._dtype
+
+    @property
+    def frame_rate(self):
+        return 60.0
+
+    def _get_plane(self, **ind):
+        # differs per plane, without the cost of generating random numbers
+        return self._plane + self._dtype.type(sum(ind.values()) % 64)
@@ -1,3 +1,9 @@
 name = 'pimsviewer'
 
-from .gui import GUI, run
+
+def __getattr__(attr):
+    # the viewer imports PyQt5, which rendering from the command line does not need
+    if attr in ('GUI', 'run'):
+        from pimsviewer import gui
+        return getattr(gui, attr)
+    raise AttributeError("module 'pimsviewer' has no attribute '%s'" % attr)
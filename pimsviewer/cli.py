@@ -0,0 +1,171 @@
+import os
+import sys
+import click
+
+from pimsviewer.projection import PROJECTIONS
+from pimsviewer.display import DisplayMapper, COLORMAPS
+
+
+class MainGroup(click.Group):
+    """Runs the viewer when no subcommand is given, so that `pimsviewer FILE` keeps working.
+
+    The viewer is imported when used, so that rendering does not need Qt.
+    """
+
+    def parse_args(self, ctx, args):
+        if not args or (args[0] not in self.list_commands(ctx) and args[0] not in ctx.help_option_names):
+            args = ['view'] + list(args)
+        return super(MainGroup, self).parse_args(ctx, args)
+
+    def list_commands(self, ctx):
+        return ['view'] + super(MainGroup, self).list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        if name == 'view':
+            from pimsviewer.gui import run
+            return run
+        return super(MainGroup, self).get_command(ctx, name)
+
+
+class FrameRange(click.ParamType):
+    """A frame number, or a range 'start:stop:step' as in Python slices."""
+    name = 'range'
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, slice):
+            return value
+
+        try:
+            parts = [int(part) if part.strip() else None for part in value.split(':')]
+        except ValueError:
+            self.fail("'%s' is not a frame number or range like 0:100:2" % value, param, ctx)
+
+        if len(parts) == 1:
+            if parts[0] is None:
+                self.fail("'%s' is not a frame number or range like 0:100:2" % value, param, ctx)
+            return slice(parts[0], parts[0] + 1 if parts[0] != -1 else None)
+        if len(parts) > 3 or parts[2:] == [0]:
+            self.fail("'%s' is not a frame number or range like 0:100:2" % value, param, ctx)
+
+        return slice(*parts)
+
+
+def parse_positions(ctx, param, values):
+    positions = {}
+    for value in values:
+        dim, _, pos = value.partition('=')
+        try:
+            positions[dim.strip()] = int(pos)
+        except ValueError:
+            raise click.BadParameter("'%s' is not a position like z=3" % value)
+    return positions
+
+
+def default_axis(sizes, fixed):
+    for dim in 'tvz':
+        if sizes.get(dim, 1) > 1 and dim not in fixed:
+            return dim
+    return None
+
+
+@click.group(cls=MainGroup)
+def main():
+    """View or render image files that PIMS can read."""
+
+
+@main.command()
+@click.argument('filepath', type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True, resolve_path=True))
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--axis', help='Axis along which frames are rendered  [default: t, v or z, whichever is not merged or fixed with --at]')
+@click.option('--frames', type=FrameRange(), default='::', help='Frame number or range start:stop:step along the axis  [default: all]')
+@click.option('--at', 'positions', multiple=True, callback=parse_positions, metavar='AXIS=POS', help='Position along another axis, e.g. z=3; can be repeated')
+@click.option('--merge', default='', metavar='AXES', help="Axes to merge: channels ('c') are blended, z and v are projected")
+@click.option('--projection', type=click.Choice(PROJECTIONS), default='sum', show_default=True, help='Projection of merged z and v axes')
+@click.option('--limits', nargs=2, type=float, default=None, help='Contrast limits  [default: from the first frame]')
+@click.option('--gamma', type=click.FloatRange(min=0, min_open=True), default=1.0, show_default=True)
+@click.option('--colormap', type=click.Choice(COLORMAPS), default='gray', show_default=True)
+@click.option('--positions-file', type=click.Path(exists=True, dir_okay=False), help='CSV, Parquet or Feather file with columns frame,x,y(,r) of markers to draw')
+@click.option('--montage', is_flag=True, help='Render all frames as tiles of one image')
+@click.option('--columns', type=click.IntRange(min=1), help='Number of columns of the montage  [default: about as many as rows]')
+@click.option('--scale', type=click.FloatRange(min=0, min_open=True), default=1.0, show_default=True, help='Scale factor of montage tiles')
+@click.option('--workers', type=click.IntRange(min=1), help='Number of worker processes  [default: number of CPUs]')
+def render(filepath, output, axis, frames, positions, merge, projection, limits, gamma, colormap, positions_file,
+           montage, columns, scale, workers):
+    """Renders frames of FILEPATH to OUTPUT without a display.
+
+    Frames are rendered like the viewer shows them and written in the
+    format of the extension of OUTPUT, e.g. png or tif. When rendering more
+    than one frame, their number is added to OUTPUT (name_00001.png), unless
+    it contains a field like {:04d} itself. With --montage, all frames are
+    written as tiles of a single image.
+    """
+    from pimsviewer.wrapped_reader import open_reader, make_request
+    from pimsviewer.compositing import Compositor
+    from pimsviewer.render import render_frame, write_image, Markers
+    from pimsviewer.export import Exporter, Montage, output_pattern
+
+    reader = open_reader(filepath)
+    try:
+        sizes = dict(reader.sizes)
+    finally:
+        reader.close()
+
+    for dim in list(merge) + list(positions):
+        if dim not in sizes:
+            raise click.BadParameter("File has no axis '%s' (axes: %s)" % (dim, ''.join(sizes)))
+
+    projection_axis = next((dim for dim in 'zv' if dim in merge and dim in sizes), None)
+    projections = {dim: projection for dim in 'zv'}
+
+    if axis is None:
+        axis = default_axis(sizes, merge + ''.join(positions))
+    elif axis not in sizes:
+        raise click.BadParameter("File has no axis '%s' (axes: %s)" % (axis, ''.join(sizes)), param_hint='--axis')
+    elif axis in merge:
+        raise click.BadParameter("Cannot render along merged axis '%s'" % axis, param_hint='--axis')
+
+    compositor = Compositor(DisplayMapper(gamma=gamma, colormap=colormap))
+    if limits:
+        try:
+            compositor.display.limits = limits
+        except ValueError as exception:
+            raise click.BadParameter(str(exception), param_hint='--limits')
+
+    overlays = []
+    if positions_file is not None:
+        from pimsviewer.positions import PositionIndex, load_positions
+        overlays.append(Markers(PositionIndex.from_dataframe(load_positions(positions_file))))
+
+    request = make_request(sizes, positions, merge, axis or '', projection_axis)
+    settings = dict(compositor=compositor, projection_axis=projection_axis, projections=projections, overlays=overlays)
+
+    if axis is None:
+        reader = open_reader(filepath)
+        try:
+            write_image(render_frame(reader, request, **settings), output)
+        finally:
+            reader.close()
+        click.echo('Wrote %s' % output, err=True)
+        return
+
+    indices = range(*frames.indices(sizes[axis]))
+    if len(indices) == 0:
+        raise click.BadParameter("No frames in range along '%s' of size %d" % (axis, sizes[axis]), param_hint='--frames')
+
+    if montage:
+        exporter = Montage(filepath, request, axis, indices, output, columns=columns, scale=scale,
+                           max_workers=workers, **settings)
+    else:
+        if len(indices) > 1 and '{' not in output:
+            output = output_pattern(output)
+        exporter = Exporter(filepath, request, axis, indices, output, max_workers=workers, **settings)
+
+    with click.progressbar(length=len(exporter), label='Rendering', file=sys.stderr) as bar:
+        written = exporter.run(lambda done, total: bar.update(done - bar.pos))
+
+    click.echo('Wrote %d file%s to %s' % (len(written), 's' if len(written) != 1 else '',
+                                          os.path.dirname(os.path.abspath(written[0]))), err=True)
+
+
+if __name__ == '__main__':
+    main()
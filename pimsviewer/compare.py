@@ -0,0 +1,85 @@
+from functools import partial
+from os import path
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QDockWidget
+
+from pimsviewer.imagewidget import ImageWidget
+from pimsviewer.compositing import Compositor
+from pimsviewer.prefetch import Prefetcher
+from pimsviewer.reader_pool import ReaderPool
+from pimsviewer.wrapped_reader import open_reader, make_request
+from pimsviewer.timing import timings
+
+
+class ComparePane(QDockWidget):
+    """Shows another file next to the image, at the same positions along all axes.
+
+    Frames are read with the frame cache and the decode threads of the viewer,
+    which are shared by all files that are shown. Positions beyond the size
+    of this file show its last frame along that axis. Projections are not
+    computed, the plane at the position along the projected axis is shown.
+    """
+
+    def __init__(self, opened, filename, parent=None):
+        super(ComparePane, self).__init__(path.basename(filename), parent)
+        self.app = parent
+        self.filename = filename
+
+        self.setObjectName('comparePane')
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setAllowedAreas(Qt.AllDockWidgetAreas)
+
+        self.reader = opened.reader
+        self.readerPool = ReaderPool(self.reader, partial(open_reader, filename), self.app.max_readers)
+        self.prefetcher = Prefetcher(self.readerPool, executor=self.app.decodeExecutor)
+        if opened.frame is not None:
+            self.prefetcher.seed(opened.request, opened.frame)
+
+        # contrast is set per file, e.g. for raw and processed data
+        self.compositor = Compositor()
+        self.view = ImageWidget()
+        self.view.display = self.compositor.display
+        self.view.setMinimumSize(200, 200)
+        self.setWidget(self.view)
+
+    def get_request(self):
+        sizes = self.reader.sizes
+        positions = {}
+        for dim, dimension in self.app.dimensions.items():
+            if dim in sizes:
+                positions[dim] = min(dimension.position, sizes[dim] - 1)
+
+        merged = ''.join(dim for dim in self.app.dimensions if self.app.dimensions[dim].merge)
+        return make_request(sizes, positions, merged, self.app.iter_axis, self.app.get_projection_axis(sizes))
+
+    def showFrame(self):
+        if self.reader is None:
+            return
+
+        request = self.get_request()
+        with timings.measure('compare'):
+            try:
+                frame = self.prefetcher.get_frame(request)
+            except IndexError:
+                frame = self.prefetcher.get_frame(request.with_index(0))
+
+            self.view.setPixmap(self.compositor.composite(frame, request.bundle_axes, self.app.get_projections()))
+
+        if request.iter_axes:
+            dimension = self.app.dimensions[request.iter_axes]
+            fps = dimension.fps if dimension.playing else 0.0
+            self.prefetcher.prefetch(request, self.reader.sizes[request.iter_axes], fps)
+
+    def close_file(self):
+        if self.reader is None:
+            return
+
+        self.prefetcher.shutdown()
+        self.readerPool.close()
+        self.reader.close()
+        self.reader = None
+
+    def closeEvent(self, event):
+        self.close_file()
+        self.app.remove_compare_pane(self)
+        super(ComparePane, self).closeEvent(event)
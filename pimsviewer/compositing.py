@@ -0,0 +1,126 @@
+import numpy as np
+
+from pimsviewer.display import DisplayMapper, COLORMAPS
+from pimsviewer.projection import project
+
+# default channel colors with a high luminance, as used by pims.to_rgb
+CHANNEL_COLORMAPS = {
+    1: ['gray'],
+    2: ['green', 'magenta'],
+    3: ['cyan', 'green', 'magenta'],
+    4: ['cyan', 'green', 'magenta', 'red'],
+}
+
+
+def default_channel_colormap(i, n):
+    try:
+        return CHANNEL_COLORMAPS[n][i]
+    except KeyError:
+        colors = COLORMAPS[1:]
+        return colors[i % len(colors)]
+
+
+class Compositor(object):
+    """Turns frames with named axes into data for display.
+
+    The axes of a frame are given as a string in the order of the array
+    axes, like `bundle_axes` of a reader. Axes other than 'y', 'x' and 'c'
+    are projected, by default summed in a float32 accumulator. When there is no 'c' axis, the
+    result is a raw (y, x) view, which is mapped to the display by `display`.
+    Channels are mapped with their own DisplayMapper (contrast and colormap)
+    and blended into an RGB image.
+    """
+
+    def __init__(self, display=None):
+        super(Compositor, self).__init__()
+
+        if display is None:
+            display = DisplayMapper()
+        self.display = display
+        self.channels = []
+
+        self._signature = None
+        self._accumulator = None
+        self._channel_buffer = None
+        self._output = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_accumulator'] = state['_channel_buffer'] = state['_output'] = None
+        return state
+
+    def channel(self, i, n=None):
+        """Returns the DisplayMapper of channel i, out of n channels."""
+        if n is not None and len(self.channels) != n:
+            self.channels = [DisplayMapper(colormap=default_channel_colormap(j, n)) for j in range(n)]
+
+        return self.channels[i]
+
+    def reset(self):
+        """Forget automatic contrast limits, e.g. when opening a new file."""
+        self.display.reset()
+        for mapper in self.channels:
+            mapper.reset()
+
+    def reduce(self, frame, axis, mode='sum'):
+        return project(frame, axis, mode)
+
+    def composite(self, frame, axes, projections=None):
+        """`projections` maps axes to a projection mode, see PROJECTIONS."""
+        axes = list(axes)
+        if projections is None:
+            projections = {}
+
+        for dim in [dim for dim in axes if dim not in 'yxc']:
+            ix = axes.index(dim)
+            frame = self.reduce(frame, ix, projections.get(dim, 'sum'))
+            del axes[ix]
+
+        # reduced data needs different contrast limits than single planes
+        signature = (''.join(axes), frame.dtype)
+        if signature != self._signature:
+            if self._signature is not None:
+                self.reset()
+            self._signature = signature
+
+        order = [axes.index('y'), axes.index('x')]
+        if 'c' in axes:
+            order.append(axes.index('c'))
+
+        frame = np.transpose(frame, order)
+        if frame.ndim == 2:
+            return frame
+
+        return self.blend(frame)
+
+    def _buffers(self, shape):
+        shape = shape + (3,)
+        if self._accumulator is None or self._accumulator.shape != shape:
+            self._accumulator = np.empty(shape, dtype=np.uint16)
+            self._channel_buffer = np.empty(shape, dtype=np.uint8)
+            self._output = np.empty(shape, dtype=np.uint8)
+
+        return self._accumulator, self._channel_buffer, self._output
+
+    def blend(self, frame):
+        """Blends a (y, x, c) frame into a (y, x, 3) uint8 RGB image.
+
+        The image is a buffer that is overwritten by the next blend of a frame of the same size.
+        """
+        n_channels = frame.shape[2]
+        accumulator, buffer, output = self._buffers(frame.shape[:2])
+        accumulator.fill(0)
+
+        for i in range(n_channels):
+            mapper = self.channel(i, n_channels)
+            channel = frame[:, :, i]
+
+            if mapper.colormap == 'gray':
+                np.add(accumulator, mapper.to_display(channel)[:, :, np.newaxis], out=accumulator)
+            else:
+                np.add(accumulator, mapper.to_display(channel, out=buffer), out=accumulator)
+
+        np.minimum(accumulator, 255, out=accumulator)
+        np.copyto(output, accumulator, casting='unsafe')
+
+        return output
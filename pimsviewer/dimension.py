@@ -1,20 +1,26 @@
-import os
 import numpy as np
-from PyQt5 import uic
 from PyQt5.QtCore import QDir, Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap
 from PyQt5.QtWidgets import (QHBoxLayout, QSlider, QWidget, QAction, QApplication, QFileDialog, QLabel, QMainWindow, QMenu, QMessageBox, QScrollArea, QSizePolicy, QStatusBar, QVBoxLayout, QDockWidget, QPushButton, QStyle, QLineEdit, QCheckBox, QInputDialog)
 
-class Dimension(QWidget):
+from pimsviewer.playback import PlaybackClock
+from pimsviewer.projection import PROJECTIONS
+from pimsviewer.utils import load_ui_form
+
+class Dimension(QWidget, load_ui_form('dimension')):
 
     _playing = False
     _size = 0
     _position = 0
     _mergeable = False
     _merge = False
+    _projection = 'sum'
     _playable = False
+    # true while the position is moved by playback, not by a seek
+    stepping = False
     _fps = 5.0
-    _max_playback_fps = 5.0
+    # maximum rate at which the playback timer fires, faster playback skips frames
+    _max_playback_fps = 60.0
 
     play_event = pyqtSignal(QWidget)
 
@@ -24,13 +30,14 @@ class Dimension(QWidget):
         self.name = name
         self._size = size
 
-        dirname = os.path.dirname(os.path.realpath(__file__))
-        uic.loadUi(os.path.join(dirname, 'dimension.ui'), self)
+        self.setupUi(self)
 
         self.playButton.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
         self.playButton.clicked.connect(self.click_event)
 
+        self.clock = PlaybackClock(self._fps, self._max_playback_fps)
         self.playTimer = QTimer()
+        self.playTimer.setTimerType(Qt.PreciseTimer)
         self.playTimer.timeout.connect(self.play_tick)
 
         self.posButton.pressed.connect(self.update_position_from_btn)
@@ -43,6 +50,11 @@ class Dimension(QWidget):
         if not self.mergeable:
             self.mergeButton.hide()
 
+        self.projectionBox.addItems(PROJECTIONS)
+        self.projectionBox.setCurrentText(self._projection)
+        self.projectionBox.currentTextChanged.connect(self.update_projection)
+        self.projectionBox.hide()
+
         self._merge = self.mergeButton.isChecked()
 
         self.fps = self._fps
@@ -50,20 +62,6 @@ class Dimension(QWidget):
 
         self.hide()
 
-    def merge_image_over_dimension(self, image):
-        # problem here: could be two axes with same size
-        # TODO: think of a clever fix for this
-        try:
-            ix = image.shape.index(self._size)
-        except ValueError:
-            return image
-
-        if self.name != 'c':
-            # I don't know what to do, sum over axis
-            image = np.sum(image, axis=ix)
-
-        return image
-
     def enable(self):
         if not self.playable:
             return
@@ -78,6 +76,10 @@ class Dimension(QWidget):
             self.mergeButton.setEnabled(True)
             self.mergeButton.show()
 
+        if self.projectable:
+            self.projectionBox.setEnabled(True)
+            self.projectionBox.show()
+
         self.show()
 
     def disable(self):
@@ -87,6 +89,7 @@ class Dimension(QWidget):
         self.slider.setEnabled(False)
         self.fpsButton.setEnabled(False)
         self.mergeButton.setEnabled(False)
+        self.projectionBox.setEnabled(False)
 
     def fps_changed(self):
         fps, ok = QInputDialog.getDouble(self, "Playback framerate", "New playback framerate", self.fps)
@@ -107,10 +110,13 @@ class Dimension(QWidget):
         if not self.playing:
             return
 
-        if self._fps > self._max_playback_fps:
-            self.position += int(round(self._fps / self._max_playback_fps))
-        else:
-            self.position += 1
+        steps = self.clock.advance()
+        if steps > 0:
+            self.stepping = True
+            try:
+                self.position += steps
+            finally:
+                self.stepping = False
 
     @property
     def size(self):
@@ -133,10 +139,25 @@ class Dimension(QWidget):
         fps = float(fps)
 
         self._fps = fps
-        play_fps = fps if fps < self._max_playback_fps else self._max_playback_fps
-        self.playTimer.setInterval(int(round(1000.0 / play_fps)))
+        self.clock.fps = fps
+        self.update_timer_interval()
         self.fpsButton.setText('%d fps' % self.fps)
 
+    @property
+    def max_playback_fps(self):
+        return self._max_playback_fps
+
+    @max_playback_fps.setter
+    def max_playback_fps(self, max_playback_fps):
+        self._max_playback_fps = float(max_playback_fps)
+        self.clock.max_fps = self._max_playback_fps
+        self.update_timer_interval()
+
+    def update_timer_interval(self):
+        play_fps = self.clock.shown_fps
+        if play_fps > 0:
+            self.playTimer.setInterval(int(round(1000.0 / play_fps)))
+
     @property
     def playable(self):
         return self._playable
@@ -153,8 +174,10 @@ class Dimension(QWidget):
     def playing(self, playing):
         self._playing = bool(playing)
         if self._playing:
+            self.clock.start()
             self.playTimer.start()
         else:
+            self.clock.stop()
             self.playTimer.stop()
 
     @property
@@ -207,6 +230,29 @@ class Dimension(QWidget):
             self.mergeButton.setChecked(self._merge)
             self.play_event.emit(self)
 
+    def update_projection(self):
+        self.projection = self.projectionBox.currentText()
+
+    @property
+    def projection(self):
+        return self._projection
+
+    @projection.setter
+    def projection(self, projection):
+        if projection not in PROJECTIONS:
+            raise ValueError("Unknown projection '%s'" % projection)
+
+        if projection != self._projection:
+            self._projection = projection
+            self.projectionBox.setCurrentText(projection)
+            if self.merge:
+                self.play_event.emit(self)
+
+    @property
+    def projectable(self):
+        # merged channels are composited, other merged axes are projected
+        return self.mergeable and self.name != 'c'
+
     @property
     def mergeable(self):
         return self._mergeable
@@ -0,0 +1,120 @@
+from bisect import bisect_left
+from os import path
+from pims.utils.sort import natural_keys
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from pimsviewer.utils import list_files_in_dir
+
+
+def _sort_key(filename):
+    # names with the same natural key, like img1.tif and img01.tif, are told apart by the name itself
+    return natural_keys(filename), filename
+
+
+class DirectoryIndex(QObject):
+    """Naturally sorted index of the files in a directory.
+
+    The index is built once and kept up to date through a filesystem watcher:
+    on a change the directory is listed again, but only added and removed
+    files are inserted into or deleted from the sorted index.
+    """
+    # ms to wait for more changes before updating, e.g. while files are written
+    update_delay = 250
+
+    changed = pyqtSignal()
+
+    def __init__(self, directory, extensions=None, parent=None):
+        super(DirectoryIndex, self).__init__(parent)
+
+        self.directory = directory
+        self.extensions = extensions
+
+        self.files = []
+        self._keys = []
+        self.add(list_files_in_dir(directory, extensions))
+
+        self.updateTimer = QTimer(self)
+        self.updateTimer.setSingleShot(True)
+        self.updateTimer.setInterval(self.update_delay)
+        self.updateTimer.timeout.connect(self.update)
+
+        self.watcher = QFileSystemWatcher([directory], self)
+        self.watcher.directoryChanged.connect(self.updateTimer.start)
+
+    def add(self, filenames):
+        if len(filenames) > len(self.files):
+            # building from scratch is faster than inserting one by one
+            self.files = sorted(self.files + list(filenames), key=_sort_key)
+            self._keys = [_sort_key(f) for f in self.files]
+            return
+
+        for filename in filenames:
+            key = _sort_key(filename)
+            i = bisect_left(self._keys, key)
+            self._keys.insert(i, key)
+            self.files.insert(i, filename)
+
+    def remove(self, filenames):
+        for filename in filenames:
+            i = self.index(filename)
+            if i is not None:
+                del self._keys[i]
+                del self.files[i]
+
+    def update(self):
+        if not path.isdir(self.directory):
+            return
+
+        current = set(list_files_in_dir(self.directory, self.extensions))
+        indexed = set(self.files)
+
+        added = current - indexed
+        removed = indexed - current
+        if not added and not removed:
+            return
+
+        self.remove(removed)
+        self.add(added)
+        self.changed.emit()
+
+    def index(self, filename):
+        i = bisect_left(self._keys, _sort_key(filename))
+        if i < len(self.files) and self.files[i] == filename:
+            return i
+        return None
+
+    def neighbour(self, filename, step=1):
+        """Returns the path of the file `step` places from filename, wrapping around.
+
+        filename itself does not need to be in the index, e.g. when it has an
+        unsupported extension or was removed. Returns None when there is no
+        other file.
+        """
+        filename = path.basename(filename)
+        n = len(self.files)
+
+        i = self.index(filename)
+        if i is None:
+            if n == 0:
+                return None
+            # the position where filename would be inserted
+            i = bisect_left(self._keys, _sort_key(filename))
+            if step > 0:
+                step -= 1
+        elif n < 2:
+            return None
+
+        return path.join(self.directory, self.files[(i + step) % n])
+
+    def close(self):
+        self.updateTimer.stop()
+        self.watcher.removePaths(self.watcher.directories())
+
+    def __contains__(self, filename):
+        return self.index(path.basename(filename)) is not None
+
+    def __len__(self):
+        return len(self.files)
+
+    def __repr__(self):
+        return "<DirectoryIndex: %d files in %s>" % (len(self.files), self.directory)
@@ -0,0 +1,196 @@
+import os
+import sys
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import numpy as np
+
+
+def default_cache_directory():
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'pimsviewer', 'frames')
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode('utf-8')).hexdigest()
+
+
+class DiskCache(object):
+    """Decoded frames stored on disk, to be read back as memory maps in later sessions.
+
+    Every file gets a directory named after its path, size and modification
+    time, so frames of a file that changed are never returned. Frames are
+    stored as `.npy` files, written on a background thread; reading a frame
+    updates its modification time, and when the cache grows beyond its size
+    cap the least recently used frames of all files are removed.
+    """
+    # fraction of the size cap that eviction frees, so that it does not run on every write
+    evict_fraction = 0.1
+    # frames waiting to be written before further frames are dropped
+    max_pending = 32
+
+    def __init__(self, directory=None, max_size_mb=4096):
+        super(DiskCache, self).__init__()
+
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = Lock()
+        self._pending = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='disk-cache')
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.nbytes = sum(size for _, _, size in self._entries())
+
+    def store(self, filename):
+        """The frames of filename, or None when it is not a file on disk."""
+        try:
+            stat = os.stat(filename)
+        except (OSError, TypeError, ValueError):
+            return None
+
+        key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+        return FileStore(self, os.path.join(self.directory, _digest(key)), key[0])
+
+    def read(self, path):
+        try:
+            frame = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return frame
+
+    def write(self, path, frame):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+
+        self._writer.submit(self._write, path, frame)
+        return True
+
+    def _write(self, path, frame):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = '%s.%d.tmp' % (path, os.getpid())
+            with open(temporary, 'wb') as f:
+                np.save(f, np.ascontiguousarray(frame))
+            # a frame that was read twice before it was stored replaces itself
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temporary, path)
+            size = os.path.getsize(path) - replaced
+        except OSError:
+            return
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        with self._lock:
+            self.nbytes += size
+            if self.nbytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(access time, path, size) of all stored frames."""
+        try:
+            directories = list(os.scandir(self.directory))
+        except OSError:
+            return
+
+        for directory in directories:
+            if not directory.is_dir():
+                continue
+            try:
+                for entry in os.scandir(directory.path):
+                    if entry.name.endswith('.npy'):
+                        stat = entry.stat()
+                        yield stat.st_mtime, entry.path, stat.st_size
+            except OSError:
+                continue
+
+    def _evict(self):
+        # other sessions may share the directory, so the size is counted again
+        entries = sorted(self._entries())
+        self.nbytes = sum(size for _, _, size in entries)
+        target = self.max_bytes * (1 - self.evict_fraction)
+
+        for _, path, size in entries:
+            if self.nbytes <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.nbytes -= size
+            self.evictions += 1
+
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                # not empty
+                pass
+
+    def flush(self):
+        """Waits until all frames are written."""
+        self._writer.submit(lambda: None).result()
+
+    def clear(self):
+        self.flush()
+        with self._lock:
+            for _, path, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.nbytes = 0
+
+    def shutdown(self):
+        self._writer.shutdown(wait=True)
+
+    def stats(self):
+        return {'size_mb': self.nbytes / (1024.0 * 1024.0), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+    def __repr__(self):
+        return "<DiskCache: %s, %.1f/%.1f MB, %d hits, %d misses, %d evictions>" % (
+            self.directory, self.nbytes / (1024.0 * 1024.0), self.max_bytes / (1024.0 * 1024.0),
+            self.hits, self.misses, self.evictions)
+
+
+class FileStore(object):
+    """The frames of a single file in a DiskCache, by FrameRequest."""
+
+    def __init__(self, cache, directory, filename):
+        super(FileStore, self).__init__()
+
+        self.cache = cache
+        self.directory = directory
+        self.filename = filename
+
+    def path(self, request):
+        return os.path.join(self.directory, _digest(tuple(request)) + '.npy')
+
+    def get(self, request):
+        return self.cache.read(self.path(request))
+
+    def put(self, request, frame):
+        return self.cache.write(self.path(request), frame)
+
+    def __repr__(self):
+        return "<FileStore: %s in %s>" % (self.filename, self.directory)
@@ -0,0 +1,176 @@
+import numpy as np
+
+# colormaps that are available without matplotlib, as the RGB value at full intensity
+_color_ramps = {
+    'red': (255, 0, 0),
+    'green': (0, 255, 0),
+    'blue': (0, 0, 255),
+    'cyan': (0, 255, 255),
+    'magenta': (255, 0, 255),
+    'yellow': (255, 255, 0),
+}
+
+COLORMAPS = ['gray'] + sorted(_color_ramps)
+
+
+def colormap_table(name):
+    """Returns a (256, 3) uint8 table mapping display intensity to RGB."""
+    ramp = np.arange(256, dtype=np.float32) / 255.0
+
+    if name == 'gray':
+        rgb = (255, 255, 255)
+    elif name in _color_ramps:
+        rgb = _color_ramps[name]
+    else:
+        try:
+            import matplotlib
+        except ImportError:
+            raise ValueError("Unknown colormap '%s' (matplotlib is required for colormaps other than %s)" % (name, ', '.join(COLORMAPS)))
+
+        try:
+            colormap = matplotlib.colormaps[name]
+        except KeyError:
+            raise ValueError("Unknown colormap '%s'" % name)
+        return (colormap(ramp)[:, :3] * 255.0 + 0.5).astype(np.uint8)
+
+    return (np.outer(ramp, rgb) + 0.5).astype(np.uint8)
+
+
+class DisplayMapper(object):
+    """Maps raw pixel values to display values using lookup tables.
+
+    uint8 and uint16 data (including 12-bit data stored as uint16) are mapped
+    with a single gather from a precomputed 256 or 65536-entry table. Other
+    data types are clipped and scaled linearly. The output is a uint8 array,
+    with an extra RGB axis for colormaps other than 'gray'.
+
+    When no limits are given, they are set from the first frame that is
+    mapped and then kept, so that brightness is stable between frames.
+    """
+
+    def __init__(self, vmin=None, vmax=None, gamma=1.0, colormap='gray'):
+        super(DisplayMapper, self).__init__()
+
+        self._vmin = vmin
+        self._vmax = vmax
+        self._gamma = float(gamma)
+        self._colormap = colormap
+        self._colormap_table = None
+        self.auto_limits = vmin is None or vmax is None
+
+        self._luts = {}
+
+    def _invalidate(self):
+        self._luts = {}
+
+    def __getstate__(self):
+        # lookup tables are cheaper to recompute than to send to another process
+        state = self.__dict__.copy()
+        state['_luts'] = {}
+        return state
+
+    @property
+    def limits(self):
+        if self._vmin is None or self._vmax is None:
+            return None
+        return (self._vmin, self._vmax)
+
+    @limits.setter
+    def limits(self, limits):
+        if limits is None:
+            self._vmin, self._vmax = None, None
+            self.auto_limits = True
+        else:
+            vmin, vmax = float(limits[0]), float(limits[1])
+            if vmax <= vmin:
+                raise ValueError('The minimum should be smaller than the maximum')
+            self._vmin, self._vmax = vmin, vmax
+            self.auto_limits = False
+        self._invalidate()
+
+    @property
+    def gamma(self):
+        return self._gamma
+
+    @gamma.setter
+    def gamma(self, gamma):
+        if gamma <= 0:
+            raise ValueError('Gamma should be larger than 0')
+        self._gamma = float(gamma)
+        self._invalidate()
+
+    @property
+    def colormap(self):
+        return self._colormap
+
+    @colormap.setter
+    def colormap(self, colormap):
+        self._colormap_table = None if colormap == 'gray' else colormap_table(colormap)
+        self._colormap = colormap
+        self._invalidate()
+
+    def reset(self):
+        """Forget automatically determined limits, e.g. when opening a new file."""
+        if self.auto_limits:
+            self._vmin, self._vmax = None, None
+            self._invalidate()
+
+    def autoscale(self, array):
+        vmin, vmax = float(np.min(array)), float(np.max(array))
+        if vmax <= vmin:
+            vmax = vmin + 1.0
+        self._vmin, self._vmax = vmin, vmax
+        self._invalidate()
+
+    def _scale(self, values):
+        # maps values to [0, 255] as float32, in place if possible
+        vmin, vmax = self.limits
+        values = np.subtract(values, vmin, dtype=np.float32)
+        values *= 1.0 / max(vmax - vmin, 1e-12)
+        np.clip(values, 0.0, 1.0, out=values)
+        if self._gamma != 1.0:
+            np.power(values, self._gamma, out=values)
+        values *= 255.0
+        values += 0.5
+        return values
+
+    def _apply_colormap(self, display):
+        if self._colormap_table is None and self._colormap != 'gray':
+            self._colormap_table = colormap_table(self._colormap)
+
+        if self._colormap_table is None:
+            return display
+        return np.take(self._colormap_table, display, axis=0)
+
+    def lut(self, dtype):
+        dtype = np.dtype(dtype)
+        try:
+            return self._luts[dtype]
+        except KeyError:
+            pass
+
+        values = np.arange(np.iinfo(dtype).max + 1, dtype=np.float32)
+        lut = self._apply_colormap(self._scale(values).astype(np.uint8))
+        self._luts[dtype] = lut
+
+        return lut
+
+    def to_display(self, array, out=None):
+        if array.dtype == bool:
+            array = array.view(np.uint8)
+
+        if self.limits is None:
+            self.autoscale(array)
+
+        if array.dtype in (np.uint8, np.uint16):
+            # the LUT already contains the colormap: one gather gives the result
+            return np.take(self.lut(array.dtype), array, axis=0, out=out)
+
+        display = self._apply_colormap(self._scale(array).astype(np.uint8))
+        if out is not None:
+            out[...] = display
+            return out
+        return display
+
+    def __repr__(self):
+        return "<DisplayMapper: limits=%s, gamma=%.2f, colormap=%s>" % (self.limits, self.gamma, self.colormap)
@@ -0,0 +1,127 @@
+import numpy as np
+from PyQt5.QtWidgets import (QDialog, QFormLayout, QDoubleSpinBox, QComboBox, QPushButton)
+
+from pimsviewer.display import COLORMAPS
+
+
+class DisplaySettings(QDialog):
+    def __init__(self, parent=None):
+        super(DisplaySettings, self).__init__(parent)
+        self.app = parent
+
+        self.setWindowTitle('Display settings')
+
+        self.form = QFormLayout()
+        self.setLayout(self.form)
+
+        # the whole frame, or one of the channels when they are merged
+        self.channelInput = QComboBox()
+        self.channelInput.currentIndexChanged.connect(self.update_inputs)
+        self.form.addRow('Apply to', self.channelInput)
+
+        self.minInput = QDoubleSpinBox()
+        self.maxInput = QDoubleSpinBox()
+        for spinbox in [self.minInput, self.maxInput]:
+            spinbox.setRange(-1e12, 1e12)
+            spinbox.setDecimals(2)
+            spinbox.valueChanged.connect(self.apply_limits)
+        self.form.addRow('Minimum', self.minInput)
+        self.form.addRow('Maximum', self.maxInput)
+
+        self.autoButton = QPushButton('Auto')
+        self.autoButton.clicked.connect(self.auto_limits)
+        self.form.addRow('', self.autoButton)
+
+        self.gammaInput = QDoubleSpinBox()
+        self.gammaInput.setRange(0.05, 10.0)
+        self.gammaInput.setSingleStep(0.1)
+        self.gammaInput.valueChanged.connect(self.apply_gamma)
+        self.form.addRow('Gamma', self.gammaInput)
+
+        self.colormapInput = QComboBox()
+        self.colormapInput.addItems(COLORMAPS)
+        self.colormapInput.currentTextChanged.connect(self.apply_colormap)
+        self.form.addRow('Colormap', self.colormapInput)
+
+    @property
+    def n_channels(self):
+        # channels have displays of their own only when they are merged
+        if self.app.reader is None or not self.app.dimensions['c'].merge:
+            return 0
+        return self.app.reader.sizes.get('c', 0)
+
+    def shown_data(self):
+        """The shown frame, or its plane of the selected channel, or None."""
+        data = self.app.shownData
+        channel = self.channelInput.currentIndex() - 1
+        if data is None or channel < 0:
+            return data
+
+        axes = self.app.get_current_request().bundle_axes
+        if 'c' not in axes or data.ndim != len(axes):
+            return None
+        return np.take(data, channel, axis=axes.index('c'))
+
+    @property
+    def display(self):
+        channel = self.channelInput.currentIndex() - 1
+        if channel < 0:
+            return self.app.compositor.display
+        return self.app.compositor.channel(channel, self.n_channels)
+
+    def update_channels(self):
+        items = ['Frame'] + ['Merged channel %d' % i for i in range(self.n_channels)]
+        if items == [self.channelInput.itemText(i) for i in range(self.channelInput.count())]:
+            return
+
+        self.channelInput.blockSignals(True)
+        self.channelInput.clear()
+        self.channelInput.addItems(items)
+        self.channelInput.blockSignals(False)
+
+    def showEvent(self, event):
+        super(DisplaySettings, self).showEvent(event)
+        self.update_channels()
+        self.update_inputs()
+
+    def update_inputs(self):
+        inputs = [self.minInput, self.maxInput, self.gammaInput, self.colormapInput]
+        for widget in inputs:
+            widget.blockSignals(True)
+
+        # limits are set when a frame is mapped, the shown one is used when this display has not mapped any yet
+        if self.display.limits is None:
+            data = self.shown_data()
+            if data is not None:
+                self.display.autoscale(data)
+        if self.display.limits is not None:
+            vmin, vmax = self.display.limits
+            self.minInput.setValue(vmin)
+            self.maxInput.setValue(vmax)
+        self.gammaInput.setValue(self.display.gamma)
+        self.colormapInput.setCurrentText(self.display.colormap)
+
+        for widget in inputs:
+            widget.blockSignals(False)
+
+    def apply_limits(self):
+        vmin, vmax = self.minInput.value(), self.maxInput.value()
+        if vmax <= vmin:
+            self.app.statusbar.showMessage('The minimum should be smaller than the maximum')
+            return
+
+        self.display.limits = (vmin, vmax)
+        self.app.showFrame()
+
+    def auto_limits(self):
+        self.display.limits = None
+        self.app.showFrame()
+        self.update_inputs()
+
+    def apply_gamma(self):
+        self.display.gamma = self.gammaInput.value()
+        self.app.showFrame()
+
+    def apply_colormap(self, colormap):
+        self.display.colormap = colormap
+        self.app.showFrame()
@@ -1,20 +1,98 @@
 import numpy as np
-from collections import deque
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pims.display import to_rgb
 from os import path
 
 from PIL import Image, ImageQt
-from PyQt5.QtCore import QDir, Qt, QRectF
-from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap
-from PyQt5.QtWidgets import (QHBoxLayout, QSlider, QWidget, QAction, QApplication, QFileDialog, QLabel, QMainWindow, QMenu, QMessageBox, QScrollArea, QSizePolicy, QStatusBar, QVBoxLayout, QDockWidget, QPushButton, QStyle, QLineEdit, QDialog, QGraphicsEllipseItem, QCheckBox, QDoubleSpinBox)
+from PyQt5.QtCore import QDir, Qt, QRectF, QPointF, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap, QPainterPath, QPen, QPolygonF
+from PyQt5.QtWidgets import (QHBoxLayout, QSlider, QWidget, QAction, QApplication, QFileDialog, QLabel, QMainWindow, QMenu, QMessageBox, QScrollArea, QSizePolicy, QStatusBar, QVBoxLayout, QDockWidget, QPushButton, QStyle, QLineEdit, QDialog, QGraphicsEllipseItem, QGraphicsPathItem, QGraphicsPixmapItem, QGraphicsItem, QCheckBox, QDoubleSpinBox, QSpinBox)
 
-import pandas as pd
-
-from pimsviewer.utils import pixmap_from_array
 from pimsviewer.plugins import Plugin
+from pimsviewer.utils import pixmap_from_array, FutureWatcher
+from pimsviewer.positions import PositionIndex, ChunkedPositions, FrameMarkers, TrajectoryIndex, Trails, read_positions
+from pimsviewer.render import Markers
+
+
+class TrailsItem(QGraphicsItem):
+    """Polylines through the recent positions of every particle, see positions.Trails.
+
+    The polyline of each particle is extended and trimmed by `apply` as the
+    trails move, instead of being built again every frame.
+    """
+
+    def __init__(self, parent=None):
+        super(TrailsItem, self).__init__(parent)
+
+        self.pen = QPen(Qt.yellow)
+        self.pen.setCosmetic(True)
+        self.polygons = {}
+        self.x = self.y = self.ranks = None
+        self.rect = QRectF()
+
+    def set_points(self, x, y, ranks):
+        """Image coordinates of the rows of the TrajectoryIndex."""
+        self.prepareGeometryChange()
+        self.x, self.y, self.ranks = x.tolist(), y.tolist(), ranks
+        valid = np.isfinite(x) & np.isfinite(y)
+        if valid.any():
+            left, top = x[valid].min(), y[valid].min()
+            self.rect = QRectF(left, top, x[valid].max() - left, y[valid].max() - top).adjusted(-1, -1, 1, 1)
+        else:
+            self.rect = QRectF()
+
+    def rebuild(self, trails):
+        x, y = self.x, self.y
+        self.polygons = {}
+        for rank in np.flatnonzero(trails.hi > trails.lo).tolist():
+            rows = range(trails.lo[rank], trails.hi[rank])
+            self.polygons[rank] = QPolygonF([QPointF(x[row], y[row]) for row in rows])
+        self.update()
+
+    def apply(self, changes):
+        added, dropped, forward = changes
+        for rank in dropped.tolist():
+            polygon = self.polygons[rank]
+            polygon.remove(0 if forward else polygon.size() - 1)
+            if polygon.isEmpty():
+                del self.polygons[rank]
+
+        for row, rank in zip(added.tolist(), self.ranks[added].tolist()):
+            point = QPointF(self.x[row], self.y[row])
+            polygon = self.polygons.setdefault(rank, QPolygonF())
+            if forward:
+                polygon.append(point)
+            else:
+                polygon.insert(0, point)
+
+        if len(added) or len(dropped):
+            self.update()
+
+    def boundingRect(self):
+        return self.rect
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(self.pen)
+        for polygon in self.polygons.values():
+            if polygon.size() > 1:
+                painter.drawPolyline(polygon)
 
 class AnnotatePlugin(Plugin):
     name = 'Annotate plugin'
+    # number of frame overlays that are kept
+    overlay_cache_size = 16
+    # a density raster is drawn instead of circles when more markers are in view,
+    # or when circles would be smaller than min_marker_radius screen pixels
+    max_markers = 5000
+    min_marker_radius = 1.0
+    # screen pixels per bin of the density raster
+    density_bin = 2.0
+    # rows per chunk of a position file, shown while the rest loads
+    chunk_rows = 1000000
+
+    # (load id, PositionIndex) of a chunk, emitted from the loading thread
+    chunk_loaded = pyqtSignal(int, object)
 
     def __init__(self, parent=None, positions_df=None):
         super(AnnotatePlugin, self).__init__(parent)
@@ -24,13 +102,33 @@ class AnnotatePlugin(Plugin):
         self.r_name = 'r'
 
         self.unit_scaling = None
-        self.positions_df = positions_df
+        self.positions = None
+        self.trajectories = None
+        self.trails = None
+        self.trails_key = None
+
+        self.overlayItem = None
+        self.densityItem = None
+        self.trailsItem = None
+        self.imageWidget = None
+        self.overlays = OrderedDict()
+        self.shown_overlay = None
+        # (area, zoom) in which the shown overlay is valid
+        self.shown_view = None
+
+        # files are read on a thread of their own, loads that are superseded stop at the next chunk
+        self.loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pimsviewer-positions')
+        self.load_id = 0
+        self.loadWatcher = FutureWatcher(self)
+        self.loadWatcher.finished.connect(self.load_done)
+        self.chunk_loaded.connect(self.add_chunk)
+        QApplication.instance().aboutToQuit.connect(self.cancel_load)
 
         self.vbox = QVBoxLayout()
         self.setLayout(self.vbox)
 
         self.label = QLabel('Annotate Plugin')
-        self.description = QLabel('Loads trajectories from CSV files containing the columns frame,x,y(,r) and draws circles at the specified locations.')
+        self.description = QLabel('Loads trajectories from CSV, Parquet or Feather files containing the columns frame,x,y(,r,particle) and draws circles at the specified locations, and the trails of particles.')
         self.description.setWordWrap(True)
         self.vbox.addWidget(self.label)
         self.vbox.addWidget(self.description)
@@ -39,6 +137,9 @@ class AnnotatePlugin(Plugin):
         self.browseBtn.clicked.connect(self.open)
         self.vbox.addWidget(self.browseBtn)
 
+        self.statusLabel = QLabel('')
+        self.vbox.addWidget(self.statusLabel)
+
         self.scaleLabel = QLabel('Scale factor (units/px)')
         self.scaleInput = QDoubleSpinBox()
         self.scaleInput.setMinimum(0)
@@ -54,46 +155,248 @@ class AnnotatePlugin(Plugin):
         self.swapXYSwitch.setChecked(False)
         self.vbox.addWidget(self.swapXYSwitch)
 
-        self.items = []
+        self.trailLabel = QLabel('Trail length (frames)')
+        self.trailInput = QSpinBox()
+        self.trailInput.setRange(0, 10000)
+        self.trailInput.setSpecialValueText('Off')
+        self.trailInput.setEnabled(False)
+        self.trailInput.valueChanged.connect(lambda length: self.view_changed())
+        self.vbox.addWidget(self.trailLabel)
+        self.vbox.addWidget(self.trailInput)
+
+        if positions_df is not None:
+            self.set_positions(positions_df)
+
+    def index_positions(self, positions_df):
+        positions = PositionIndex.from_dataframe(positions_df, r_name=self.r_name)
+        trajectories = TrajectoryIndex.from_dataframe(positions_df) if 'particle' in positions_df else None
+        return positions, trajectories
+
+    def set_positions(self, positions_df):
+        self.set_indices(*self.index_positions(positions_df))
+
+    def set_indices(self, positions, trajectories=None):
+        """Shows the positions of a PositionIndex, and trails of a TrajectoryIndex."""
+        self.positions = positions
+        self.trajectories = trajectories
+        self.overlays.clear()
+        self.shown_overlay = None
+        self.trails = None
+        self.trailInput.setEnabled(self.trajectories is not None)
+
+    def load(self, filename):
+        """Loads a position file in the background; frames are shown as their positions are read."""
+        self.cancel_load()
+        self.set_indices(ChunkedPositions())
+        self.statusLabel.setText('Loading %s...' % path.basename(filename))
+
+        future = self.loader.submit(self.read_file, filename, self.load_id)
+        future.filename = filename
+        self.loadWatcher.watch(future)
+        return future
+
+    def read_file(self, filename, load_id):
+        import pandas as pd
+
+        chunks = []
+        for chunk in read_positions(filename, self.chunk_rows):
+            if load_id != self.load_id:
+                return None
+            chunks.append(chunk)
+            self.chunk_loaded.emit(load_id, PositionIndex.from_dataframe(chunk, r_name=self.r_name))
+
+        # only the indices are kept
+        positions_df = pd.concat(chunks, ignore_index=True)
+        del chunks
+        return load_id, self.index_positions(positions_df)
+
+    def cancel_load(self):
+        self.load_id += 1
+
+    def add_chunk(self, load_id, index):
+        if load_id != self.load_id:
+            return
 
-    def clearAll(self, image_widget):
-        for item in self.items:
-            image_widget.removeItemFromScene(item)
+        self.positions.add(index)
+        self.statusLabel.setText('Loading: %d positions...' % len(self.positions))
+
+        # overlays of the frames in the chunk are incomplete
+        for key in [key for key in self.overlays if index.count(key[0])]:
+            del self.overlays[key]
+        if self.shown_overlay is not None and index.count(self.shown_overlay[0]):
+            self.shown_overlay = None
+
+        if self.active and self.app is not None and 't' in self.app.dimensions:
+            if index.count(self.app.dimensions['t'].position):
+                self.showFrame(self.app.imageView, self.app.dimensions)
+
+    def load_done(self, future):
+        try:
+            result = future.result()
+        except Exception as exception:
+            self.positions = None
+            self.clearAll(self.imageWidget)
+            self.statusLabel.setText('')
+            QMessageBox.critical(self, "Error", "Cannot load %s: %s" % (future.filename, exception))
+            return
+
+        if result is None or result[0] != self.load_id:
+            return
+
+        self.set_indices(*result[1])
+        self.statusLabel.setText('%d positions in %s' % (len(self.positions), path.basename(future.filename)))
+        if self.app is not None:
+            self.app.refreshPlugins()
 
-        self.items = []
+    def clearAll(self, image_widget):
+        if self.overlayItem is not None:
+            self.overlayItem.setPath(QPainterPath())
+            self.densityItem.setVisible(False)
+            self.trailsItem.setVisible(False)
+        self.shown_overlay = None
+        self.trails = None
+
+    def markers(self):
+        if self.positions is None:
+            return None
+        return Markers(self.positions, swap_xy=self.x_name != 'x', scale=self.unit_scaling)
+
+    def overlay(self):
+        self.set_unit_scaling()
+        return self.markers()
+
+    def build_overlay(self, frame_no):
+        return FrameMarkers(*self.markers().positions(frame_no))
+
+    def circles(self, markers, rows):
+        path = QPainterPath()
+        for xi, yi, ri in zip(markers.x[rows].tolist(), markers.y[rows].tolist(), markers.r[rows].tolist()):
+            path.addEllipse(QRectF(xi - ri, yi - ri, 2.0*ri, 2.0*ri))
+
+        return path
+
+    def density(self, markers, bin_size, area):
+        counts, left, top = markers.density(bin_size, area.left(), area.top(), area.right(), area.bottom())
+        if counts.size == 0:
+            return None, left, top
+
+        rgba = np.zeros(counts.shape + (4,), dtype=np.uint8)
+        rgba[:, :, 0] = 255
+        # logarithmic, so that sparse areas stay visible next to dense ones
+        alpha = np.log1p(counts)
+        alpha *= 255.0 / max(alpha.max(), 1e-6)
+        rgba[:, :, 3] = alpha
+
+        return pixmap_from_array(rgba), left, top
+
+    def get_overlay(self, key):
+        try:
+            self.overlays.move_to_end(key)
+            return self.overlays[key]
+        except KeyError:
+            pass
+
+        path = self.build_overlay(key[0])
+        self.overlays[key] = path
+        while len(self.overlays) > self.overlay_cache_size:
+            self.overlays.popitem(last=False)
+
+        return path
+
+    def init_overlay_item(self, image_widget):
+        # child of the image, so that markers are in image coordinates and follow zooming
+        self.overlayItem = QGraphicsPathItem(image_widget.image)
+        pen = QPen(Qt.red)
+        pen.setWidth(2)
+        pen.setCosmetic(True)
+        self.overlayItem.setPen(pen)
+
+        self.densityItem = QGraphicsPixmapItem(image_widget.image)
+        self.densityItem.setVisible(False)
+
+        self.trailsItem = TrailsItem(image_widget.image)
+        self.trailsItem.setVisible(False)
+
+        self.imageWidget = image_widget
+        image_widget.view_changed.connect(self.view_changed)
+
+    def view_changed(self):
+        if self.active and self.positions is not None and self.shown_overlay is not None:
+            self.showFrame(self.imageWidget, self.app.dimensions)
+
+    def covers(self, view, zoom):
+        if self.shown_view is None:
+            return False
+        area, shown_zoom = self.shown_view
+        return area.contains(view) and 0.8 < zoom / shown_zoom < 1.25
+
+    def show_overlay(self, key, image_widget):
+        """Draws the markers that are in view, or their density when there are too many."""
+        markers = self.get_overlay(key)
+        view = image_widget.visible_rect()
+        zoom = image_widget.zoom
+
+        # the overlay covers half a view around the visible part, so that it is not rebuilt for every step of panning
+        area = view.adjusted(-view.width() / 2, -view.height() / 2, view.width() / 2, view.height() / 2)
+        rows = markers.visible(area.left(), area.top(), area.right(), area.bottom())
+
+        # bins of a power of two image pixels, about density_bin screen pixels wide; zoomed in
+        # further than bins of one pixel, the markers in view are drawn however many there are
+        bin_size = 2.0 ** np.ceil(np.log2(self.density_bin / zoom))
+        if bin_size < 1.0 or (len(rows) <= self.max_markers and markers.radius * zoom >= self.min_marker_radius):
+            self.overlayItem.setPath(self.circles(markers, rows))
+            self.densityItem.setVisible(False)
+        else:
+            pixmap, left, top = self.density(markers, bin_size, area)
+            self.overlayItem.setPath(QPainterPath())
+            if pixmap is not None:
+                self.densityItem.setPixmap(pixmap)
+                self.densityItem.setScale(bin_size)
+                self.densityItem.setPos(left, top)
+            self.densityItem.setVisible(pixmap is not None)
 
-    def rect_from_xyr(self, x, y, r, scaleFactor):
-        x_top_left = (x - r)*scaleFactor
-        y_top_left = (y - r)*scaleFactor
-        size = 2.0*r*scaleFactor
-        return QRectF(x_top_left, y_top_left, size, size)
+        self.shown_overlay = key
+        self.shown_view = (area, zoom)
 
     def showFrame(self, image_widget, dimensions):
-        if self.positions_df is None:
+        if self.positions is None:
             return
         self.set_unit_scaling()
 
-        scaleFactor = image_widget.scaleFactor
-        self.clearAll(image_widget)
+        if self.overlayItem is None:
+            self.init_overlay_item(image_widget)
+
         frame_no = dimensions['t'].position
+        self.show_trails(frame_no)
 
-        selection = self.positions_df[self.positions_df['frame'] == frame_no]
+        key = (frame_no, self.x_name, self.unit_scaling)
+        if key == self.shown_overlay and self.covers(image_widget.visible_rect(), image_widget.zoom):
+            return
 
-        for i, row in selection.iterrows():
-            x = float(row[self.x_name]) * self.unit_scaling
-            y = float(row[self.y_name]) * self.unit_scaling
+        self.show_overlay(key, image_widget)
 
-            r = float(row[self.r_name]) * self.unit_scaling
-            if np.isnan(r):
-                r = 10.0
+    def show_trails(self, frame_no):
+        length = self.trailInput.value()
+        if self.trajectories is None or length == 0:
+            self.trailsItem.setVisible(False)
+            self.trails = None
+            return
 
-            ellipse = QGraphicsEllipseItem(self.rect_from_xyr(x, y, r, scaleFactor))
-            pen = ellipse.pen()
-            pen.setWidth(2)
-            pen.setColor(Qt.red)
-            ellipse.setPen(pen)
-            image_widget.addItemToScene(ellipse)
-            self.items.append(ellipse)
+        key = (self.x_name, self.unit_scaling, length)
+        if self.trails is None or key != self.trails_key:
+            x, y = self.trajectories.x, self.trajectories.y
+            if self.x_name != 'x':
+                x, y = y, x
+            self.trailsItem.set_points(x * self.unit_scaling, y * self.unit_scaling, self.trajectories.ranks)
+            self.trails = Trails(self.trajectories, length)
+            self.trails_key = key
+
+        changes = self.trails.move_to(frame_no)
+        if changes is None:
+            self.trailsItem.rebuild(self.trails)
+        else:
+            self.trailsItem.apply(changes)
+        self.trailsItem.setVisible(True)
 
     def swap_xy(self):
         if not self.swapXYSwitch.isChecked():
@@ -119,16 +422,13 @@ class AnnotatePlugin(Plugin):
             parentFile = self.app.filename
             currentDir = path.dirname(parentFile)
 
-        fileName, _ = QFileDialog.getOpenFileName(self, "Open trajectories", currentDir)
+        fileName, _ = QFileDialog.getOpenFileName(self, "Open trajectories", currentDir,
+                                                  "Positions (*.csv *.parquet *.pq *.feather *.arrow);;All files (*)")
         if fileName:
-            try:
-                self.positions_df = pd.read_csv(fileName)
-            except Exception as exception:
-                QMessageBox.critical(self, "Error", "Cannot load %s: %s" % (fileName, exception))
-                return
+            self.load(fileName)
 
-        if self.app is not None:
-            self.app.refreshPlugins()
+def add_noise(array, level):
+    return array + np.random.random(array.shape) * level / 100 * array.max()
 
 class ProcessingPlugin(Plugin):
     name = 'Processing plugin (example)'
@@ -152,24 +452,16 @@ class ProcessingPlugin(Plugin):
         self.slider.valueChanged.connect(self.update_noise)
         self.vbox.addWidget(self.slider)
 
+        # runs on the viewer's worker pool, before the frame is displayed
+        self.noise = self.add_stage(add_noise, level=self.noise_level)
+
     def update_noise(self):
         self.noise_level = self.slider.value()
-        self.showFrame(self.parent().imageView, self.parent().dimensions)
+        self.noise.set_params(level=self.noise_level)
+        self.app.showFrame()
 
     def activate(self):
         super(ProcessingPlugin, self).activate()
 
-        self.showFrame(self.parent().imageView, self.parent().dimensions)
-
-    def showFrame(self, image_widget, dimensions):
-        arr = self.parent().get_current_frame()
-
-        arr = arr + np.random.random(arr.shape) * self.noise_level / 100 * arr.max()
-        arr = arr / np.max(arr)
-
-        arr = (arr * 255.0).astype(np.uint8)
-        
-        image = pixmap_from_array(arr)
-
-        image_widget.setPixmap(image)
+        self.app.showFrame()
 
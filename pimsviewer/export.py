@@ -0,0 +1,232 @@
+import os
+import copy
+import math
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from PIL import Image
+
+from pimsviewer.wrapped_reader import FrameRequest, open_reader
+from pimsviewer.compositing import Compositor
+from pimsviewer.render import render_frame, write_image
+
+EXPORT_FORMATS = ['png', 'tif']
+
+# state of a worker process, set by _init_worker
+_worker = None
+
+
+def _init_worker(filename, settings):
+    global _worker
+    _worker = dict(settings, reader=open_reader(filename))
+
+
+def _render(request):
+    settings = dict(_worker)
+    reader = settings.pop('reader')
+    return render_frame(reader, request, **settings)
+
+
+def _export_frame(request, filename):
+    write_image(_render(request), filename)
+    return filename
+
+
+def _render_tile(i, request, scale):
+    return i, scale_image(_render(request), scale)
+
+
+def scale_image(data, scale):
+    if scale == 1:
+        return data
+    size = (max(1, int(round(data.shape[1] * scale))), max(1, int(round(data.shape[0] * scale))))
+    return np.asarray(Image.fromarray(data).resize(size, Image.BILINEAR))
+
+
+def output_pattern(filename, digits=5):
+    """Turns 'dir/name.png' into the pattern 'dir/name_{:05d}.png'."""
+    root, ext = os.path.splitext(filename)
+    return '%s_{:0%dd}%s' % (root.replace('{', '{{').replace('}', '}}'), digits, ext)
+
+
+class Exporter(object):
+    """Renders frames along an axis to numbered image files on a process pool.
+
+    The frames are those of `request` at the positions in `frames` along
+    `axis`, rendered with render_frame: read or projected, processed,
+    composited and mapped for display like in the viewer, and with overlays
+    drawn on. `output` is a file name pattern with a field for the frame
+    number, e.g. 'frames/frame_{:05d}.png' (see output_pattern); the image
+    format follows from its extension.
+
+    Every worker process opens the file itself and writes the frames it
+    renders, so frames are never sent between processes and only a few are
+    in memory at a time. The first frame is rendered in the calling process,
+    which fixes automatic contrast limits for all frames.
+    """
+
+    def __init__(self, filename, request, axis, frames, output, compositor=None, projection_axis=None,
+                 projections=None, stages=(), overlays=(), max_workers=None):
+        super(Exporter, self).__init__()
+
+        if axis in request.bundle_axes or axis == projection_axis:
+            raise ValueError("Cannot export along merged axis '%s'" % axis)
+
+        self.filename = filename
+        self.axis = axis
+        # the position along the playing axis of request is kept when exporting along another one
+        coords = request.coords
+        coords.pop(axis, None)
+        request = FrameRequest.create(0, axis, request.bundle_axes, coords)
+        self.requests = [request.with_index(i) for i in frames]
+        self.outputs = self.output_files(output, frames)
+
+        if compositor is None:
+            compositor = Compositor()
+
+        # a copy, as rendering the first frame sets automatic limits
+        self.settings = dict(compositor=copy.deepcopy(compositor), projection_axis=projection_axis,
+                             projections=projections, stages=list(stages), overlays=[o for o in overlays if o is not None])
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        self._cancelled = threading.Event()
+
+    def output_files(self, output, frames):
+        outputs = [output.format(int(i)) for i in frames]
+        if len(set(outputs)) != len(outputs):
+            raise ValueError("Output '%s' does not give a file name per frame" % output)
+        return outputs
+
+    def __len__(self):
+        return len(self.requests)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def render_first(self):
+        """Renders the first frame in this process, after checking that all frames are in range."""
+        directory = os.path.dirname(self.outputs[0])
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        reader = open_reader(self.filename)
+        try:
+            size = reader.sizes.get(self.axis, 1)
+            if not all(0 <= request.index < size for request in self.requests):
+                raise ValueError("Frames out of range 0-%d along '%s'" % (size - 1, self.axis))
+
+            return render_frame(reader, self.requests[0], **self.settings)
+        finally:
+            reader.close()
+
+    def map(self, func, jobs):
+        """Yields func(*job) for every job, in the order they finish, computed on worker processes."""
+        jobs = iter(jobs)
+        pending = set()
+
+        # spawn, as forking a process with Qt threads is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(self)), mp_context=context,
+                                 initializer=_init_worker, initargs=(self.filename, self.settings)) as executor:
+            try:
+                while True:
+                    # keep a few frames queued per worker, instead of submitting all at once
+                    while not self.cancelled and len(pending) < 2 * self.max_workers:
+                        job = next(jobs, None)
+                        if job is None:
+                            break
+                        pending.add(executor.submit(func, *job))
+
+                    if not pending:
+                        break
+
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def run(self, progress=None):
+        """Exports the frames and returns the written files.
+
+        progress(done, total) is called after every frame. When cancelled, the
+        frames that are being rendered are finished and the others are not
+        exported.
+        """
+        if not self.requests:
+            return []
+
+        total = len(self)
+        write_image(self.render_first(), self.outputs[0])
+        written = [self.outputs[0]]
+        if progress is not None:
+            progress(len(written), total)
+
+        if total > 1 and not self.cancelled:
+            for filename in self.map(_export_frame, zip(self.requests[1:], self.outputs[1:])):
+                written.append(filename)
+                if progress is not None:
+                    progress(len(written), total)
+
+        return written
+
+
+class Montage(Exporter):
+    """Renders frames as the tiles of a single image, a contact sheet.
+
+    Tiles are scaled by `scale` on the worker processes and placed row by
+    row, in `columns` columns (by default about as many as rows). Takes the
+    arguments of Exporter, with `output` the file name of the montage.
+    """
+
+    def __init__(self, filename, request, axis, frames, output, columns=None, scale=1.0, **kwargs):
+        super(Montage, self).__init__(filename, request, axis, frames, output, **kwargs)
+
+        if scale <= 0:
+            raise ValueError("Scale of tiles should be positive")
+
+        self.columns = columns or int(math.ceil(math.sqrt(len(self))))
+        self.scale = scale
+
+    def output_files(self, output, frames):
+        return [output]
+
+    def run(self, progress=None):
+        """Renders the montage and returns [output], or [] when cancelled."""
+        if not self.requests:
+            return []
+
+        total = len(self)
+        first = scale_image(self.render_first(), self.scale)
+        height, width = first.shape[:2]
+        rows = int(math.ceil(total / self.columns))
+        montage = np.zeros((rows * height, self.columns * width) + first.shape[2:], dtype=np.uint8)
+
+        def place(i, tile):
+            row, column = divmod(i, self.columns)
+            montage[row * height:(row + 1) * height, column * width:(column + 1) * width] = tile
+
+        place(0, first)
+        done = 1
+        if progress is not None:
+            progress(done, total)
+
+        jobs = ((i, request, self.scale) for i, request in enumerate(self.requests[1:], 1))
+        if total > 1 and not self.cancelled:
+            for i, tile in self.map(_render_tile, jobs):
+                place(i, tile)
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+
+        if self.cancelled:
+            return []
+
+        write_image(montage, self.outputs[0])
+        return self.outputs
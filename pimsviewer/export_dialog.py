@@ -0,0 +1,117 @@
+import os
+from os import path
+from PyQt5.QtWidgets import (QDialog, QFormLayout, QComboBox, QSpinBox, QCheckBox, QLineEdit, QPushButton,
+                             QHBoxLayout, QDialogButtonBox, QFileDialog)
+
+from pimsviewer.export import EXPORT_FORMATS, output_pattern
+
+
+class ExportDialog(QDialog):
+    """Asks which frames to export, along which axis and to where."""
+
+    def __init__(self, parent=None):
+        super(ExportDialog, self).__init__(parent)
+        self.app = parent
+
+        self.setWindowTitle('Export frames')
+
+        self.form = QFormLayout()
+        self.setLayout(self.form)
+
+        self.axisInput = QComboBox()
+        self.axisInput.addItems(self.axes)
+        self.axisInput.currentIndexChanged.connect(self.update_range)
+        self.form.addRow('Along axis', self.axisInput)
+
+        self.startInput = QSpinBox()
+        self.stopInput = QSpinBox()
+        self.stepInput = QSpinBox()
+        self.stepInput.setMinimum(1)
+        self.form.addRow('First frame', self.startInput)
+        self.form.addRow('Last frame', self.stopInput)
+        self.form.addRow('Step', self.stepInput)
+
+        self.formatInput = QComboBox()
+        self.formatInput.addItems(EXPORT_FORMATS)
+        self.formatInput.currentTextChanged.connect(self.update_extension)
+        self.form.addRow('Format', self.formatInput)
+
+        self.overlaysInput = QCheckBox('Draw overlays of active plugins')
+        self.overlaysInput.setChecked(True)
+        self.form.addRow('', self.overlaysInput)
+
+        self.workersInput = QSpinBox()
+        self.workersInput.setRange(1, 256)
+        self.workersInput.setValue(os.cpu_count() or 1)
+        self.form.addRow('Processes', self.workersInput)
+
+        self.outputInput = QLineEdit()
+        if self.app.filename is not None:
+            root = path.splitext(self.app.filename)[0]
+            self.outputInput.setText('%s.%s' % (root, self.formatInput.currentText()))
+        self.browseButton = QPushButton('Browse...')
+        self.browseButton.clicked.connect(self.browse)
+        outputLayout = QHBoxLayout()
+        outputLayout.addWidget(self.outputInput)
+        outputLayout.addWidget(self.browseButton)
+        self.form.addRow('File name', outputLayout)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+        self.form.addRow(self.buttons)
+
+        self.update_range()
+
+    @property
+    def axes(self):
+        """Axes that are neither merged nor projected, along which frames can be exported."""
+        request = self.app.get_current_request()
+        sizes = self.app.reader.sizes
+        return [dim for dim in 'tzv' if sizes.get(dim, 1) > 1 and dim not in request.bundle_axes
+                and dim != self.app.get_projection_axis()]
+
+    @property
+    def axis(self):
+        return self.axisInput.currentText()
+
+    def update_range(self):
+        if not self.axis:
+            return
+
+        last = self.app.reader.sizes[self.axis] - 1
+        for spinbox in [self.startInput, self.stopInput]:
+            spinbox.setRange(0, last)
+        self.stepInput.setMaximum(max(1, last))
+
+        self.startInput.setValue(0)
+        self.stopInput.setValue(last)
+
+    def update_extension(self, fmt):
+        root = path.splitext(self.outputInput.text())[0]
+        if root:
+            self.outputInput.setText('%s.%s' % (root, fmt))
+
+    def browse(self):
+        fileName, _ = QFileDialog.getSaveFileName(self, "Export frames", self.outputInput.text(),
+                                                  'Images (*.%s)' % self.formatInput.currentText())
+        if fileName:
+            self.outputInput.setText(fileName)
+            self.update_extension(self.formatInput.currentText())
+
+    @property
+    def frames(self):
+        return range(self.startInput.value(), self.stopInput.value() + 1, self.stepInput.value())
+
+    @property
+    def output(self):
+        """File name pattern, with a field for the frame number."""
+        return output_pattern(self.outputInput.text())
+
+    @property
+    def overlays(self):
+        return self.overlaysInput.isChecked()
+
+    @property
+    def workers(self):
+        return self.workersInput.value()
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class FrameCache(object):
+    """Least-recently-used cache of decoded frames with a memory budget.
+
+    Frames are stored read-only, so that cached data cannot be modified in
+    place by its consumers.
+    """
+
+    def __init__(self, max_size_mb=256):
+        super(FrameCache, self).__init__()
+
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._frames = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                frame = self._frames[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key, frame):
+        nbytes = frame.nbytes
+        if nbytes > self.max_bytes:
+            return
+
+        frame.flags.writeable = False
+
+        with self._lock:
+            if key in self._frames:
+                self.nbytes -= self._frames.pop(key).nbytes
+
+            self._frames[key] = frame
+            self.nbytes += nbytes
+
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {'frames': len(self), 'size_mb': self.nbytes / (1024.0 * 1024.0),
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def __contains__(self, key):
+        return key in self._frames
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __repr__(self):
+        return "<FrameCache: %d frames, %.1f/%.1f MB, %d hits, %d misses, %d evictions>" % (
+            len(self), self.nbytes / (1024.0 * 1024.0), self.max_bytes / (1024.0 * 1024.0),
+            self.hits, self.misses, self.evictions)
@@ -1,33 +1,64 @@
 from os import path
 import sys
+import time
+from functools import partial
 import click
-from PyQt5 import uic
-from PyQt5.QtCore import QDir, Qt, QMimeData
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
+from PyQt5.QtCore import QDir, Qt, QMimeData, pyqtSignal
 from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap, QImageWriter
-from PyQt5.QtWidgets import (QHBoxLayout, QSlider, QWidget, QAction, QApplication, QFileDialog, QLabel, QMainWindow, QMenu, QMessageBox, QScrollArea, QSizePolicy, QStatusBar, QVBoxLayout, QDockWidget, QPushButton, QStyle, QLineEdit)
+from PyQt5.QtWidgets import (QHBoxLayout, QSlider, QWidget, QAction, QApplication, QFileDialog, QLabel, QMainWindow, QMenu, QMessageBox, QScrollArea, QSizePolicy, QStatusBar, QVBoxLayout, QDockWidget, QPushButton, QStyle, QLineEdit, QProgressDialog)
 
 from pimsviewer.example_plugins import AnnotatePlugin, Plugin, ProcessingPlugin
 from pimsviewer.imagewidget import ImageWidget
 from pimsviewer.dimension import Dimension
-from pimsviewer.wrapped_reader import WrappedReader
-from pimsviewer.scroll_message_box import ScrollMessageBox
-from pimsviewer.utils import get_supported_extensions, get_all_files_in_dir
+from pimsviewer.wrapped_reader import WrappedReader, open_reader, make_request
+from pimsviewer.disk_cache import DiskCache
+from pimsviewer.reader_pool import ReaderPool, default_pool_size
+from pimsviewer.frame_cache import FrameCache
+from pimsviewer.compare import ComparePane
+from pimsviewer.prefetch import Prefetcher
+from pimsviewer.projection import Projector
+from pimsviewer.preopen import PreOpener
+from pimsviewer.pipeline import Pipeline
+from pimsviewer.export import Exporter
+from pimsviewer.export_dialog import ExportDialog
+from pimsviewer.performance import PerformanceDock
+from pimsviewer.slices import SliceBuilder
+from pimsviewer.slice_view import SliceDock
+from pimsviewer.timing import timings
+from pimsviewer.directory_index import DirectoryIndex
+from pimsviewer.metadata_dialog import MetadataDialog
+from pimsviewer.display_settings import DisplaySettings
+from pimsviewer.compositing import Compositor
+from pimsviewer.utils import get_supported_extensions, load_ui_form, FutureWatcher
 import pims
 import numpy as np
 
-try:
-    from nd2reader import ND2Reader  # remove after pims update
-except:
-    pass
-
-class GUI(QMainWindow):
+class GUI(QMainWindow, load_ui_form('mainwindow')):
     name = "Pimsviewer"
+    # ms after which a progress dialog is shown while opening a file
+    open_progress_delay = 500
+    # files that can be shown next to the opened one
+    max_compare_panes = 3
+
+    # (frames done, total) of a running export, emitted from its thread
+    export_progress = pyqtSignal(int, int)
 
-    def __init__(self, extra_plugins=[]):
+    def __init__(self, extra_plugins=[], cache_size_mb=0, disk_cache=None, max_readers=None, max_playback_fps=None):
         super(GUI, self).__init__()
 
-        dirname = path.dirname(path.realpath(__file__))
-        uic.loadUi(path.join(dirname, 'mainwindow.ui'), self)
+        self.cache_size_mb = cache_size_mb
+        self.disk_cache = disk_cache
+        self.max_readers = max_readers
+        self.max_playback_fps = max_playback_fps
+
+        # the frame cache and decode threads are shared by all files that are shown
+        self.frameCache = FrameCache(cache_size_mb) if cache_size_mb else None
+        self.decodeExecutor = ThreadPoolExecutor(max_workers=max(2, max_readers or default_pool_size()),
+                                                 thread_name_prefix='pimsviewer-decode')
+        self.comparePanes = []
+
+        self.setupUi(self)
 
         self.setWindowTitle(self.name)
         self.setCentralWidget(self.imageView)
@@ -35,11 +66,48 @@ class GUI(QMainWindow):
 
         self.imageView.hover_event.connect(self.image_hover_event)
         self.reader = None
+        self.readerPool = None
+        self.prefetcher = None
+        self.projector = None
+        self.shownData = None
+        self.slicer = None
+        self.iter_axis = ''
         self.dimensions = {}
         self.filename = None
 
         self.init_dimensions()
 
+        self.compositor = Compositor(self.imageView.display)
+        self.displaySettings = None
+        self.performanceDock = None
+        self.sliceDock = None
+
+        self.projectionWatcher = FutureWatcher(self)
+        self.projectionWatcher.finished.connect(self.projection_done)
+
+        self.pipeline = Pipeline()
+        self.processingWatcher = FutureWatcher(self)
+        self.processingWatcher.finished.connect(self.processing_done)
+
+        self.exportExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pimsviewer-export')
+        self.exportWatcher = FutureWatcher(self)
+        self.exportWatcher.finished.connect(self.export_done)
+        self.export_progress.connect(self.update_export_progress)
+        self.exportProgress = None
+        self.exporter = None
+
+        self.directoryIndex = None
+        self.preOpener = PreOpener(self.open_reader, self.get_initial_request)
+        self.openingFile = None
+        self.openingFuture = None
+        self.openProgress = None
+        self.openWatcher = FutureWatcher(self)
+        self.openWatcher.finished.connect(self.open_done)
+
+        self.comparing = {}
+        self.compareWatcher = FutureWatcher(self)
+        self.compareWatcher.finished.connect(self.compare_done)
+
         self.plugins = []
         self.pluginActions = []
         self.init_plugins(extra_plugins)
@@ -71,6 +139,8 @@ class GUI(QMainWindow):
         self.actionClose.setEnabled(hasfile)
         self.actionFile_information.setEnabled(hasfile)
         self.actionSave.setEnabled(hasfile)
+        self.actionExport_frames.setEnabled(hasfile)
+        self.actionCompare.setEnabled(hasfile and len(self.comparePanes) + len(self.comparing) < self.max_compare_panes)
         self.actionOpen_next.setEnabled(hasfile)
         self.actionOpen_previous.setEnabled(hasfile)
         self.actionCopy.setEnabled(hasfile)
@@ -122,111 +192,342 @@ class GUI(QMainWindow):
         if not fileName:
             return
 
-        self.imageView.image.pixmap().save(fileName)
+        self.imageView.image.to_pixmap().save(fileName)
         self.statusbar.showMessage('Image exported to %s' % fileName)
 
-    def show_file_info(self):
-        items = []
+    def export_frames(self):
+        if self.exportProgress is not None:
+            self.statusbar.showMessage('Already exporting frames')
+            return
+
+        dialog = ExportDialog(parent=self)
+        if not dialog.axes:
+            self.statusbar.showMessage('No axis to export frames along, all are merged')
+            return
+        if not dialog.exec_():
+            return
 
-        # Metadata
-        for prop in self.reader.metadata:
-            html = '<p><strong>%s:</strong></p><p><pre>%s</pre></p>' % (prop, self.reader.metadata[prop])
-            items.append(html)
+        stages = [(stage.func, dict(stage.params)) for stage in self.pipeline.stages if stage.enabled]
+        overlays = [plugin.overlay() for plugin in self.plugins if plugin.active] if dialog.overlays else []
 
         try:
-            html = '<p><strong>Framerate:</strong></p><p><pre>%.3f</pre></p>' % (self.reader.frame_rate)
-            items.append(html)
-            num_frames = self.reader.sizes['t']
-            html = '<p><strong>Duration:</strong></p><p><pre>%.3f s</pre></p>' % (num_frames / self.reader.frame_rate)
-            items.append(html)
-        except (AttributeError):
-            html = '<p><strong>Framerate:</strong></p><p><pre>Unknown</pre></p>'
-            items.append(html)
-            num_frames = self.reader.sizes['t']
-            html = '<p><strong>Duration:</strong></p><p><pre>%d frames</pre></p>' % (num_frames)
-            items.append(html)
-
-        # File path
-        html = '<p><strong>Filename:</strong></p><p>%s</p>' % (self.filename)
-        items.append(html)
-
-        # Reader
-        if isinstance(self.reader, WrappedReader):
-            reader_type = type(self.reader.reader).__name__
-        else:
-            reader_type = type(self.reader).__name__
-        html = '<p><strong>PIMS reader:</strong></p><p>%s</p><p><pre>%s</pre></p>' % (reader_type, self.reader.__repr__())
-        items.append(html)
+            exporter = Exporter(self.filename, self.get_current_request(), dialog.axis, dialog.frames, dialog.output,
+                                compositor=self.compositor, projection_axis=self.get_projection_axis(),
+                                projections=self.get_projections(), stages=stages, overlays=overlays,
+                                max_workers=dialog.workers)
+        except ValueError as exception:
+            QMessageBox.critical(self, "Error", "Cannot export frames: %s" % exception)
+            return
 
-        ScrollMessageBox(items, parent=self)
+        self.exportProgress = QProgressDialog('Exporting frames...', 'Cancel', 0, len(exporter), self)
+        self.exportProgress.setWindowModality(Qt.WindowModal)
+        self.exportProgress.setMinimumDuration(0)
+        self.exportProgress.canceled.connect(exporter.cancel)
+        self.exportProgress.setValue(0)
+        self.exporter = exporter
 
-    def open(self, checked=False, fileName=None):
-        if self.reader is not None:
-            self.close_file()
+        self.exportWatcher.watch(self.exportExecutor.submit(exporter.run, self.export_progress.emit))
 
-        if fileName is None:
-            fileName, _ = QFileDialog.getOpenFileName(self, "Open File", QDir.currentPath())
+    def update_export_progress(self, done, total):
+        if self.exportProgress is not None and not self.exportProgress.wasCanceled():
+            self.exportProgress.setValue(done)
+
+    def export_done(self, future):
+        self.exportProgress.reset()
+        self.exportProgress = None
+        self.exporter = None
+
+        if future.exception() is not None:
+            QMessageBox.critical(self, "Error", "Cannot export frames: %s" % future.exception())
+            return
+
+        files = future.result()
+        if files:
+            self.statusbar.showMessage('Exported %d frames to %s' % (len(files), path.dirname(files[0])))
+
+    def file_info(self):
+        """Returns an iterator over (name, value) of information about the open file, ending with its metadata.
+
+        Entries are read when iterated, also when another file has been opened since.
+        """
+        wrapped, filename = self.reader, self.filename
+        reader = wrapped.reader if isinstance(wrapped, WrappedReader) else wrapped
+
+        def entries():
+            yield 'Filename', filename
+            yield 'PIMS reader', '%s\n\n%r' % (type(reader).__name__, wrapped)
+            yield 'Axes', ', '.join('%s=%d' % (dim, size) for dim, size in wrapped.sizes.items())
+
+            num_frames = wrapped.sizes.get('t', 1)
+            try:
+                frame_rate = wrapped.frame_rate
+                yield 'Framerate', '%.3f' % frame_rate
+                yield 'Duration', '%.3f s' % (num_frames / frame_rate)
+            except (AttributeError, TypeError, ZeroDivisionError):
+                yield 'Framerate', 'Unknown'
+                yield 'Duration', '%d frames' % num_frames
+
+            if isinstance(wrapped, WrappedReader) and wrapped.cache is not None:
+                yield 'Frame cache', wrapped.cache
+            if isinstance(wrapped, WrappedReader) and wrapped.disk_store is not None:
+                yield 'Disk cache', self.disk_cache
 
-        if fileName:
             try:
-                self.reader = WrappedReader(pims.open(fileName))
-            except:
-                QMessageBox.critical(self, "Error", "Cannot load %s." % fileName)
+                metadata = wrapped.metadata
+            except Exception as exception:
+                yield 'Metadata', 'Unavailable: %s' % exception
                 return
 
-            self.filename = fileName
-            self.update_dimensions()
-            self.showFrame()
+            for prop in metadata:
+                yield prop, metadata[prop]
 
-            self.actionFit_width.setEnabled(True)
-            self.updateActions()
-            self.updateWindowTitle()
+        return entries()
 
-    def open_next_prev(self):
-        direction_next = True
-        if self.sender().objectName() == "actionOpen_previous":
-            direction_next = False
+    def show_file_info(self):
+        MetadataDialog(self.file_info(), title='File information: %s' % path.basename(self.filename), parent=self).show()
+
+    def show_performance(self, visible=True):
+        if self.performanceDock is None:
+            self.performanceDock = PerformanceDock(parent=self)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.performanceDock)
+            self.performanceDock.visibilityChanged.connect(self.actionPerformance.setChecked)
+        self.performanceDock.setVisible(visible)
+
+    def show_slices(self, visible=True):
+        if self.sliceDock is None:
+            self.sliceDock = SliceDock(parent=self)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.sliceDock)
+            self.sliceDock.visibilityChanged.connect(self.actionSlices.setChecked)
+        self.sliceDock.setVisible(visible)
+
+    def show_display_settings(self):
+        if self.displaySettings is None:
+            self.displaySettings = DisplaySettings(parent=self)
+        self.displaySettings.show()
+
+    def open_reader(self, fileName):
+        return open_reader(fileName, disk_cache=self.disk_cache, cache=self.frameCache)
+
+    def open(self, checked=False, fileName=None, wait=False):
+        """Opens a file in the background; the current file is shown until it has been opened.
+
+        With wait, returns when the file has been opened.
+        """
+        if fileName is None:
+            fileName, _ = QFileDialog.getOpenFileName(self, "Open File", QDir.currentPath())
 
-        supported_extensions = get_supported_extensions()
+        if not fileName:
+            return
 
-        current_directory = path.dirname(self.filename)
-        file_list = get_all_files_in_dir(current_directory, extensions=supported_extensions)
-        if len(file_list) < 2:
-            self.statusbar.showMessage('No file found for opening')
+        self.cancel_open()
+
+        future = self.preOpener.open(fileName)
+        self.openingFile = fileName
+        self.openingFuture = future
+
+        if wait:
+            futures_wait([future])
+            self.open_done(future)
+            return
+
+        # calls open_done right away when the file was opened in advance
+        self.openWatcher.watch(future)
+        if self.openingFuture is future:
+            self.statusbar.showMessage('Opening %s...' % fileName)
+            self.openProgress = QProgressDialog('Opening %s...' % path.basename(fileName), 'Cancel', 0, 0, self)
+            self.openProgress.setWindowModality(Qt.WindowModal)
+            self.openProgress.setMinimumDuration(self.open_progress_delay)
+            self.openProgress.canceled.connect(self.cancel_open)
+            self.openProgress.setValue(0)
+
+    def cancel_open(self):
+        if self.openingFuture is None:
             return
 
+        self.preOpener.discard(self.openingFuture)
+        self.statusbar.showMessage('Cancelled opening %s' % self.openingFile)
+        self.open_finished()
+
+    def open_finished(self):
+        self.openingFile = None
+        self.openingFuture = None
+        if self.openProgress is not None:
+            self.openProgress.canceled.disconnect(self.cancel_open)
+            self.openProgress.reset()
+            self.openProgress.deleteLater()
+            self.openProgress = None
+
+    def open_done(self, future):
+        # the file of which opening was cancelled is closed by the PreOpener
+        if future is not self.openingFuture:
+            return
+
+        fileName = self.openingFile
+        self.open_finished()
+
         try:
-            current_file_index = file_list.index(path.basename(self.filename))
-        except ValueError:
-            self.statusbar.showMessage('No file found for opening')
+            opened = future.result()
+        except Exception as exception:
+            QMessageBox.critical(self, "Error", "Cannot load %s: %s" % (fileName, exception))
+            return
+
+        if self.reader is not None:
+            self.close_file()
+
+        self.reader = opened.reader
+        # further readers of the file decode in parallel, sharing the caches of self.reader
+        self.readerPool = ReaderPool(self.reader, partial(open_reader, fileName), self.max_readers)
+        self.prefetcher = Prefetcher(self.readerPool, executor=self.decodeExecutor)
+        if opened.frame is not None:
+            # the first frame has been read along with opening the file
+            self.prefetcher.seed(opened.request, opened.frame)
+        self.projector = Projector(self.readerPool)
+        self.slicer = SliceBuilder(self.readerPool)
+        self.pipeline.clear()
+        self.compositor.reset()
+        self.filename = fileName
+        self.update_dimensions()
+        self.showFrame()
+
+        self.actionFit_width.setEnabled(True)
+        self.updateActions()
+        self.updateWindowTitle()
+        self.statusbar.clearMessage()
+
+        self.update_directory_index()
+        self.preopen_neighbours()
+
+    def compare(self, checked=False, fileName=None, wait=False):
+        """Opens a file in the background, to show it next to the opened file at the same positions."""
+        if fileName is None:
+            fileName, _ = QFileDialog.getOpenFileName(self, "Compare with", path.dirname(self.filename or ''))
+
+        if not fileName:
+            return
+
+        future = self.preOpener.open(fileName)
+        self.comparing[future] = fileName
+        self.updateActions()
+
+        if wait:
+            futures_wait([future])
+            self.compare_done(future)
+        else:
+            self.statusbar.showMessage('Opening %s...' % fileName)
+            self.compareWatcher.watch(future)
+
+    def compare_done(self, future):
+        fileName = self.comparing.pop(future, None)
+        if fileName is None:
             return
 
-        next_index = current_file_index + 1 if direction_next else current_file_index - 1
         try:
-            next_file = file_list[next_index]
-        except IndexError:
-            next_index = 0 if direction_next else -1
-            next_file = file_list[next_index]
+            opened = future.result()
+        except Exception as exception:
+            QMessageBox.critical(self, "Error", "Cannot load %s: %s" % (fileName, exception))
+            self.updateActions()
+            return
+
+        pane = ComparePane(opened, fileName, parent=self)
+        self.comparePanes.append(pane)
+        self.addDockWidget(Qt.RightDockWidgetArea, pane, Qt.Horizontal)
+        self.statusbar.clearMessage()
+        self.updateActions()
+        if self.reader is not None:
+            pane.showFrame()
+
+    def remove_compare_pane(self, pane):
+        if pane in self.comparePanes:
+            self.comparePanes.remove(pane)
+        self.updateActions()
+
+    def update_directory_index(self):
+        directory = path.dirname(self.filename)
+        if self.directoryIndex is not None:
+            if self.directoryIndex.directory == directory:
+                return
+            self.directoryIndex.close()
+            self.directoryIndex.deleteLater()
+
+        self.directoryIndex = DirectoryIndex(directory, get_supported_extensions(), parent=self)
+        self.directoryIndex.changed.connect(self.preopen_neighbours)
+
+    def preopen_neighbours(self):
+        if self.filename is None or self.directoryIndex is None:
+            return
+
+        neighbours = [self.directoryIndex.neighbour(self.filename, step) for step in (1, -1)]
+        self.preOpener.keep([f for f in neighbours if f is not None and f != self.filename])
+
+    def open_next_prev(self):
+        step = 1
+        if self.sender().objectName() == "actionOpen_previous":
+            step = -1
+
+        # steps on from the file that is being opened, when stepping faster than files open
+        current = self.openingFile or self.filename
+        self.update_directory_index()
+        next_file = self.directoryIndex.neighbour(current, step)
+        if next_file is None or next_file == current:
+            self.statusbar.showMessage('No file found for opening')
+            return
 
-        self.open(fileName=path.join(current_directory, next_file))
+        self.open(fileName=next_file)
 
     def copy_image_to_clipboard(self):
         data = QMimeData()
-        data.setImageData(self.imageView.image.pixmap())
+        data.setImageData(self.imageView.image.to_pixmap())
         app = QApplication.instance()
         app.clipboard().setMimeData(data)
 
     def close_file(self):
+        self.prefetcher.shutdown()
+        self.prefetcher = None
+        self.projector.shutdown()
+        self.projector = None
+        self.shownData = None
+        self.slicer.shutdown()
+        self.slicer = None
+        self.pipeline.clear()
+        self.readerPool.close()
+        self.readerPool = None
         self.reader.close()
         self.reader = None
         self.filename = None
         self.showFrame()
         self.updateWindowTitle()
 
+    def closeEvent(self, event):
+        """Stops the work in the background and closes all files, so that exiting does not wait for it."""
+        if self.exporter is not None:
+            self.exporter.cancel()
+        self.cancel_open()
+        for future in list(self.comparing):
+            self.preOpener.discard(future)
+        self.comparing.clear()
+        self.preOpener.shutdown()
+
+        for pane in list(self.comparePanes):
+            pane.close()
+        if self.reader is not None:
+            self.close_file()
+        if self.directoryIndex is not None:
+            self.directoryIndex.close()
+
+        self.pipeline.shutdown()
+        self.decodeExecutor.shutdown(wait=True)
+        self.exportExecutor.shutdown(wait=True)
+        if self.disk_cache is not None:
+            self.disk_cache.shutdown()
+
+        super(GUI, self).closeEvent(event)
+
     def init_dimensions(self):
         for dim in 'tvzcxy':
             self.dimensions[dim] = Dimension(dim, 0)
             self.dimensions[dim].play_event.connect(self.play_event)
+            if self.max_playback_fps:
+                self.dimensions[dim].max_playback_fps = self.max_playback_fps
             if dim not in ['x', 'y']:
                 self.add_to_dock(self.dimensions[dim])
                 self.dimensions[dim].playable = True
@@ -240,14 +541,28 @@ class GUI(QMainWindow):
         if not self.reader:
             return
 
-        if len(self.reader.iter_axes) > 0:
-            current_player = self.reader.iter_axes[0]
-            if dimension.name != current_player:
-                self.dimensions[current_player].playing = False
-
-        self.reader.iter_axes = dimension.name
+        if self.iter_axis and dimension.name != self.iter_axis:
+            self.dimensions[self.iter_axis].playing = False
+
+        self.iter_axis = dimension.name
+        if dimension.name == 'c' and self.displaySettings is not None and self.displaySettings.isVisible():
+            # channels can be set when they are merged
+            self.displaySettings.update_channels()
+            self.displaySettings.update_inputs()
+        if not dimension.stepping:
+            # frames of other positions only stand in for the wanted one while stepping through them
+            self.reset_stand_ins()
         self.showFrame()
 
+    def reset_stand_ins(self):
+        if self.projector is not None:
+            self.projector.reset_latest()
+        self.pipeline.reset_latest()
+
+    @property
+    def playing(self):
+        return bool(self.iter_axis) and self.dimensions[self.iter_axis].playing
+
     def image_hover_event(self, point):
         self.statusbar.showMessage('[%.1f, %.1f]' % (point.x(), point.y()))
 
@@ -268,6 +583,7 @@ class GUI(QMainWindow):
                 self.dimensions[dim].hide()
 
         # current playing axis
+        self.iter_axis = ''
         self.reader.iter_axes = ''
 
         bundle_axes = ''
@@ -284,54 +600,119 @@ class GUI(QMainWindow):
             except AttributeError:
                 self.statusbar.showMessage('Unable to read frame rate from file')
 
-    def get_current_frame(self):
-        self.reader.bundle_axes = 'xy'
-        default_coords = {}
+    def get_projection_axis(self, sizes=None):
+        """Returns the merged axis that is projected plane by plane, if any."""
+        if sizes is None:
+            sizes = self.reader.sizes
 
         for dim in self.dimensions:
-            if dim not in self.reader.sizes:
-                continue
-
             dim_obj = self.dimensions[dim]
+            if dim in sizes and dim_obj.projectable and dim_obj.merge:
+                return dim
 
-            default_coords[dim] = dim_obj.position
+        return None
 
-            if dim_obj.merge and dim not in self.reader.bundle_axes:
-                self.reader.bundle_axes += dim
+    def get_projections(self):
+        return {dim: self.dimensions[dim].projection for dim in self.dimensions if self.dimensions[dim].projectable}
 
-        self.reader.default_coords = default_coords
+    def get_request(self, sizes, positions, iter_axis=''):
+        merged = ''.join(dim for dim in self.dimensions if self.dimensions[dim].merge)
+        return make_request(sizes, positions, merged, iter_axis, self.get_projection_axis(sizes))
 
-        # always one playing axis at a time
-        if len(self.reader.iter_axes) > 1:
-            self.reader.iter_axes = self.reader.iter_axes[0]
+    def get_current_request(self):
+        positions = {dim: self.dimensions[dim].position for dim in self.dimensions}
+        return self.get_request(self.reader.sizes, positions, self.iter_axis)
 
-        if len(self.reader.iter_axes) > 0:
-            try:
-                dim_obj = self.dimensions[self.reader.iter_axes[0]]
-                i = dim_obj.position
-            except KeyError:
-                i = 0
-        else:
-            i = 0
+    def get_initial_request(self, reader):
+        """Returns the request of the first frame shown after opening reader, or None for a projection."""
+        if self.get_projection_axis(reader.sizes) is not None:
+            return None
+        return self.get_request(reader.sizes, {})
+
+    def get_current_frame(self, request=None, wait=True):
+        """Returns the frame of request, or None if wait is False and its projection is not ready yet."""
+        if request is None:
+            request = self.get_current_request()
+
+        axis = self.get_projection_axis()
+        if axis is not None:
+            return self.get_projection(request, axis, wait)
 
         try:
-            frame = self.reader[i]
+            frame = self.prefetcher.get_frame(request)
         except IndexError:
-            self.statusbar.showMessage('Unable to find %s=%d' % (dim_obj.name, i))
-            frame = self.reader[0]
-
-        if 'c' in self.reader.bundle_axes:
-            cix = self.reader.bundle_axes.index('c')
-            if cix != 0:
-                frame = np.swapaxes(frame, 0, cix)
-                frame = np.swapaxes(frame, 1, 2).copy()
+            self.statusbar.showMessage('Unable to find %s=%d' % (request.iter_axes, request.index))
+            frame = self.prefetcher.get_frame(request.with_index(0))
 
         return frame
 
+    def get_projection(self, request, axis, wait=True):
+        mode = self.dimensions[axis].projection
+        future = self.projector.project(request, axis, self.reader.sizes[axis], mode, self.get_frame_group(request))
+        if wait or future.done():
+            return future.result()
+
+        self.statusbar.showMessage("Computing %s projection along '%s'..." % (mode, axis))
+        self.projectionWatcher.watch(future)
+        return None
+
+    def projection_done(self, future):
+        if future.cancelled() or self.reader is None:
+            return
+
+        if future.exception() is not None:
+            self.statusbar.showMessage('Unable to compute projection: %s' % future.exception())
+            return
+
+        if future.result() is not None:
+            self.showFrame()
+
+    def get_frame_key(self, request):
+        """Identifies the frame of request, including its projection."""
+        axis = self.get_projection_axis()
+        if axis is None:
+            return request
+        return self.projector.key(request, axis, self.dimensions[axis].projection)
+
+    def get_frame_group(self, request):
+        """Identifies the frames of request at all positions along the playing axis, which can stand in for each other."""
+        return self.get_frame_key(request._replace(index=0, iter_axes=''))
+
+    def process_frame(self, frame_key, frame, group=None, wait=True):
+        """Returns frame processed by the pipeline, or None if wait is False and it is not ready yet."""
+        future = self.pipeline.process(frame_key, frame, group)
+        if wait or future.done():
+            return future.result()
+
+        self.processingWatcher.watch(future)
+        return None
+
+    def processing_done(self, future):
+        # while playing, results of earlier frames are shown too, until the wanted one is done
+        if future.cancelled() or self.reader is None:
+            return
+        if future.key != self.pipeline.wanted and not self.playing:
+            return
+
+        if future.exception() is not None:
+            self.statusbar.showMessage('Unable to process frame: %s' % future.exception())
+            return
+
+        self.showFrame()
+
+    def prefetch(self, request):
+        if not request.iter_axes or self.get_projection_axis() is not None:
+            return
+
+        dim_obj = self.dimensions[request.iter_axes]
+        fps = dim_obj.fps if dim_obj.playing else 0.0
+        self.prefetcher.prefetch(request, self.reader.sizes[request.iter_axes], fps)
+
     def refreshPlugins(self):
         for plugin in self.plugins:
             if plugin.active:
-                plugin.showFrame(self.imageView, self.dimensions)
+                with timings.measure('plugin %s' % plugin.name):
+                    plugin.showFrame(self.imageView, self.dimensions)
 
     def showFrame(self):
         if self.reader is None:
@@ -341,19 +722,67 @@ class GUI(QMainWindow):
         if len(self.dimensions) == 0:
             self.update_dimensions()
 
-        image_data = self.get_current_frame()
-        for bdim in self.reader.bundle_axes:
-            if bdim in ['x', 'y']:
-                continue
-            image_data = self.dimensions[bdim].merge_image_over_dimension(image_data)
+        start = time.perf_counter()
+
+        request = self.get_current_request()
+        frame_key = self.get_frame_key(request)
+        group = self.get_frame_group(request)
+        with timings.measure('frame'):
+            image_data = self.get_current_frame(request, wait=False)
+        if image_data is None:
+            # while playing, the latest finished projection is shown until this one is, so that playback goes on
+            # when projecting is slower
+            latest = self.projector.latest(group) if self.playing else None
+            if latest is None:
+                return
+            frame_key, image_data = latest
+
+        with timings.measure('process'):
+            image_data = self.process_frame(frame_key, image_data, group, wait=False)
+        if image_data is None:
+            # likewise for processing
+            image_data = self.pipeline.latest(group) if self.playing else None
+            if image_data is None:
+                return
+
+        # a frame that stands in for another one may be shown several times
+        new_frame = image_data is not self.shownData
+        self.shownData = image_data
+
+        with timings.measure('composite'):
+            image_data = self.compositor.composite(image_data, request.bundle_axes, self.get_projections())
 
         self.imageView.setPixmap(image_data)
+        for pane in self.comparePanes:
+            pane.showFrame()
         self.refreshPlugins()
+        if self.sliceDock is not None:
+            self.sliceDock.request_update()
+
+        self.prefetch(request)
+        self.update_playback_status(request, new_frame)
+
+        timings.add('show frame', time.perf_counter() - start, start)
+
+    def update_playback_status(self, request, new_frame=True):
+        if not request.iter_axes or not self.dimensions[request.iter_axes].playing:
+            return
+
+        clock = self.dimensions[request.iter_axes].clock
+        if new_frame:
+            clock.frame_shown()
+        self.statusbar.showMessage("Playing '%s' at %.1f fps (target %.1f fps), %d frames dropped" % (request.iter_axes, clock.achieved_fps, clock.fps, clock.dropped))
 
 @click.command()
 @click.argument('filepath', required=False, type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True, resolve_path=True))
 @click.option('--example-plugins/--no-example-plugins', default=True, help='Load additional example plugins')
-def run(filepath, example_plugins):
+@click.option('--cache-size', default=0, type=click.FloatRange(min=0), help='Memory budget of the decoded frame cache in MB (0 to disable)')
+@click.option('--disk-cache-size', default=0, type=click.FloatRange(min=0), help='Size of the decoded frame cache on disk, kept across sessions, in MB (0 to disable)')
+@click.option('--disk-cache-dir', default=None, type=click.Path(file_okay=False, writable=True), help='Directory of the disk cache (default: the user cache directory)')
+@click.option('--readers', default=None, type=click.IntRange(min=1), help='Readers that decode frames of a file in parallel (default: the number of CPUs, up to 4)')
+@click.option('--max-fps', default=None, type=click.FloatRange(min=1), help='Highest rate at which frames are shown while playing, faster playback skips frames in between (default: 60)')
+def run(filepath, example_plugins, cache_size, disk_cache_size, disk_cache_dir, readers, max_fps):
+    """Shows the viewer, with FILEPATH opened."""
     app = QApplication(sys.argv)
 
     if example_plugins:
@@ -361,7 +790,12 @@ def run(filepath, example_plugins):
     else:
         extra_plugins = []
 
-    gui = GUI(extra_plugins=extra_plugins)
+    disk_cache = None
+    if disk_cache_size:
+        disk_cache = DiskCache(disk_cache_dir, max_size_mb=disk_cache_size)
+
+    gui = GUI(extra_plugins=extra_plugins, cache_size_mb=cache_size, disk_cache=disk_cache, max_readers=readers,
+              max_playback_fps=max_fps)
     if filepath is not None:
         gui.open(fileName=filepath)
     gui.show()
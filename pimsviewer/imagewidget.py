@@ -5,11 +5,17 @@ from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap
 from PyQt5.QtWidgets import (QAction, QApplication, QFileDialog, QLabel, QMainWindow, QMenu, QMessageBox, QScrollArea, QSizePolicy, QGraphicsView, QGraphicsScene)
 
 from pimsviewer.pims_image import PimsImage
+from pimsviewer.display import DisplayMapper
 from pimsviewer.utils import image_to_pixmap
+from pimsviewer.timing import timings
 
 class ImageWidget(QGraphicsView):
 
     hover_event = pyqtSignal(QPointF)
+    # (start, end, finished) of a line drawn with Shift+drag, in image coordinates
+    line_event = pyqtSignal(QPointF, QPointF, bool)
+    # the visible part of the image changed, by scrolling, zooming or resizing
+    view_changed = pyqtSignal()
 
     def __init__(self, parent=None):
         super(ImageWidget, self).__init__(parent)
@@ -18,12 +24,15 @@ class ImageWidget(QGraphicsView):
         self.scene.setSceneRect(QRectF())
         self.setScene(self.scene)
 
+        self.display = DisplayMapper()
+
         self.image = PimsImage(self)
         self.scene.addItem(self.image)
 
         self.setDragMode(QGraphicsView.ScrollHandDrag)
 
         self.fitWindow = True
+        self._line_start = None
 
         self.doResize()
 
@@ -39,16 +48,58 @@ class ImageWidget(QGraphicsView):
             return
 
         if isinstance(pixmap, QImage):
-            pixmap = image_to_pixmap(image)
+            pixmap = image_to_pixmap(pixmap)
 
         if not self.image.isVisible():
             self.image.setVisible(True)
 
-        if not isinstance(pixmap, QPixmap):
-            pixmap = self.image.array_to_pixmap(pixmap)
+        with timings.measure('pixmap'):
+            if isinstance(pixmap, QPixmap):
+                self.image.setPixmap(pixmap)
+            else:
+                self.image.setArray(pixmap)
 
-        self.image.setPixmap(pixmap)
-        self.doResize()
+        with timings.measure('resize'):
+            self.doResize()
+
+    def visible_rect(self):
+        """The part of the image that is visible, in image coordinates."""
+        return self.image.mapFromScene(self.mapToScene(self.viewport().rect()).boundingRect()).boundingRect()
+
+    @property
+    def zoom(self):
+        """Screen pixels per image pixel."""
+        return self.transform().m11() * self.image.scale()
+
+    def scrollContentsBy(self, dx, dy):
+        super(ImageWidget, self).scrollContentsBy(dx, dy)
+        self.view_changed.emit()
+
+    def image_position(self, pos):
+        return self.image.mapFromScene(self.mapToScene(pos))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and event.modifiers() & Qt.ShiftModifier:
+            self._line_start = self.image_position(event.pos())
+            self.line_event.emit(self._line_start, self._line_start, False)
+            return
+
+        super(ImageWidget, self).mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._line_start is not None:
+            self.line_event.emit(self._line_start, self.image_position(event.pos()), False)
+            return
+
+        super(ImageWidget, self).mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if self._line_start is not None:
+            start, self._line_start = self._line_start, None
+            self.line_event.emit(start, self.image_position(event.pos()), True)
+            return
+
+        super(ImageWidget, self).mouseReleaseEvent(event)
 
     def resizeEvent(self, event):
         super(ImageWidget, self).resizeEvent(event)
@@ -70,6 +121,8 @@ class ImageWidget(QGraphicsView):
         else:
             self.fitInView(self.image, Qt.KeepAspectRatio)
 
+        self.view_changed.emit()
+
     @property
     def scaleFactor(self):
         return self.image.scale()
@@ -0,0 +1,131 @@
+from itertools import islice
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTableView, QPlainTextEdit, QSplitter, QHeaderView,
+                             QDialogButtonBox, QAbstractItemView)
+
+
+class MetadataModel(QAbstractTableModel):
+    """Table of (name, value) entries, loaded and formatted lazily.
+
+    Entries are taken from an iterable a page at a time, when the view
+    scrolls to the end of the loaded rows, and values are formatted as text
+    only when they are shown.
+    """
+    columns = ['Name', 'Value']
+    page_size = 50
+    # characters of a value that are shown in the table
+    summary_length = 200
+
+    def __init__(self, entries, parent=None):
+        super(MetadataModel, self).__init__(parent)
+
+        self._entries = iter(entries)
+        self._exhausted = False
+        self._rows = []
+        self._texts = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.columns[section]
+        return None
+
+    def text(self, row):
+        """The value of a row as text."""
+        try:
+            return self._texts[row]
+        except KeyError:
+            pass
+
+        try:
+            text = str(self._rows[row][1])
+        except Exception as exception:
+            text = '<%s: %s>' % (type(exception).__name__, exception)
+
+        self._texts[row] = text
+        return text
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+
+        if index.column() == 0:
+            return str(self._rows[index.row()][0])
+
+        text = self.text(index.row())
+        if role == Qt.ToolTipRole:
+            return text[:10 * self.summary_length]
+
+        summary = text.strip().split('\n', 1)[0][:self.summary_length]
+        if len(summary) < len(text.strip()):
+            summary += ' ...'
+        return summary
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+
+        rows = list(islice(self._entries, self.page_size))
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+
+class MetadataDialog(QDialog):
+    """Shows file information and metadata, with the full value of the selected entry below."""
+
+    def __init__(self, entries, title='File information', parent=None):
+        super(MetadataDialog, self).__init__(parent)
+
+        self.setWindowTitle(title)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.resize(700, 600)
+
+        self.vbox = QVBoxLayout()
+        self.setLayout(self.vbox)
+
+        self.model = MetadataModel(entries, parent=self)
+        # the view loads further pages when scrolled to the end
+        self.model.fetchMore()
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setWordWrap(False)
+        self.table.selectionModel().currentRowChanged.connect(self.show_value)
+
+        self.value = QPlainTextEdit()
+        self.value.setReadOnly(True)
+        self.value.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.value)
+        splitter.setSizes([400, 200])
+        self.vbox.addWidget(splitter)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        self.buttons.rejected.connect(self.close)
+        self.vbox.addWidget(self.buttons)
+
+    def show_value(self, current, previous=None):
+        if current.isValid():
+            self.value.setPlainText(self.model.text(current.row()))
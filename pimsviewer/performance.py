@@ -0,0 +1,100 @@
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox)
+
+from pimsviewer.timing import timings
+
+
+class PerformanceDock(QDockWidget):
+    """Shows how long the stages of showing a frame take, from the recorded timings."""
+    columns = ['Stage', 'n', 'p50 (ms)', 'p95 (ms)', 'max (ms)']
+    # ms between updates
+    interval = 500
+
+    def __init__(self, parent=None):
+        super(PerformanceDock, self).__init__('Performance', parent)
+        self.app = parent
+
+        self.setObjectName('performanceDock')
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+
+        widget = QWidget()
+        self.vbox = QVBoxLayout()
+        widget.setLayout(self.vbox)
+        self.setWidget(widget)
+
+        self.table = QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.vbox.addWidget(self.table)
+
+        self.queueLabel = QLabel()
+        self.vbox.addWidget(self.queueLabel)
+        self.playbackLabel = QLabel()
+        self.vbox.addWidget(self.playbackLabel)
+
+        buttons = QHBoxLayout()
+        self.clearButton = QPushButton('Clear')
+        self.clearButton.clicked.connect(self.clear)
+        buttons.addWidget(self.clearButton)
+        self.exportButton = QPushButton('Export CSV...')
+        self.exportButton.clicked.connect(self.export)
+        buttons.addWidget(self.exportButton)
+        self.vbox.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.interval)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super(PerformanceDock, self).showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super(PerformanceDock, self).hideEvent(event)
+        self.timer.stop()
+
+    def refresh(self):
+        stats = timings.stats()
+        self.table.setRowCount(len(stats))
+        for row, (stage, values) in enumerate(stats.items()):
+            items = [stage, '%d' % values['n'], '%.2f' % values['p50'], '%.2f' % values['p95'], '%.2f' % values['max']]
+            for column, text in enumerate(items):
+                item = QTableWidgetItem(text)
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        prefetcher = self.app.prefetcher if self.app.reader is not None else None
+        queue = prefetcher.queue_depth if prefetcher is not None else 0
+        pool = self.app.readerPool
+        readers = ', %d of %d readers open' % (pool.size, pool.max_readers) if pool is not None else ''
+        self.queueLabel.setText('Decode queue: %d frames%s' % (queue, readers))
+
+        dimension = self.app.dimensions.get(self.app.iter_axis)
+        if dimension is not None and dimension.playing:
+            clock = dimension.clock
+            self.playbackLabel.setText("Playing '%s': %.1f of %.1f fps, %d dropped" % (
+                dimension.name, clock.achieved_fps, clock.fps, clock.dropped))
+        else:
+            self.playbackLabel.setText('Not playing')
+
+    def clear(self):
+        timings.clear()
+        self.refresh()
+
+    def export(self):
+        fileName, _ = QFileDialog.getSaveFileName(self, "Export timings", 'timings.csv', 'CSV files (*.csv)')
+        if not fileName:
+            return
+
+        try:
+            count = timings.write_csv(fileName)
+        except OSError as exception:
+            QMessageBox.critical(self, "Error", "Cannot export timings to %s: %s" % (fileName, exception))
+            return
+
+        self.app.statusbar.showMessage('Exported %d timings to %s' % (count, fileName))
@@ -1,30 +1,109 @@
 import pims
 import numpy as np
-from PyQt5.QtCore import QDir, Qt, QSize, QRect, pyqtSignal, QPointF
-from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap, QPen
+from PyQt5.QtCore import QDir, Qt, QSize, QRect, QRectF, pyqtSignal, QPointF
+from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap, QPen, QPainterPath
 from PyQt5.QtWidgets import (QAction, QApplication, QFileDialog, QLabel,
                              QMainWindow, QMenu, QMessageBox, QScrollArea,
-                             QSizePolicy, QGraphicsPixmapItem)
+                             QSizePolicy, QGraphicsPixmapItem, QGraphicsItem,
+                             QStyleOptionGraphicsItem)
 
-from pimsviewer.utils import pixmap_from_array, image_to_pixmap
+from pimsviewer.utils import qimage_from_array, image_to_pixmap, can_wrap_as_qimage
+from pimsviewer.tiles import TilePyramid
+from pimsviewer.timing import timings
 
 
 class PimsImage(QGraphicsPixmapItem):
+    # frames with more pixels are drawn in tiles
+    tile_threshold = 4096 * 4096
 
     def __init__(self, parent):
         super(PimsImage, self).__init__()
 
         self.setAcceptHoverEvents(True)
+        # needed for an accurate exposedRect when painting tiles
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
 
         self.parent = parent
+        self.tiles = None
+        # None: use tiles for frames larger than tile_threshold
+        self.tiled = None
 
     def hoverMoveEvent(self, event):
         self.parent.hover_event.emit(event.lastPos())
 
+    def display_data(self, array):
+        """Returns (y, x) raw data, or (y, x, 3|4) uint8 display data."""
+        if array.ndim == 2 or can_wrap_as_qimage(array):
+            return array
+
+        # channel-first data that has not been composited
+        return pims.to_rgb(array)
+
     def array_to_pixmap(self, array):
-        array = np.swapaxes(pims.to_rgb(array), 0, 1)
+        array = self.display_data(array)
+        if array.ndim == 2:
+            array = self.parent.display.to_display(array)
+
+        image = qimage_from_array(array)
+
+        return image_to_pixmap(image)
+
+    def use_tiles(self, array):
+        if self.tiled is not None:
+            return self.tiled
+
+        return array.shape[0] * array.shape[1] > self.tile_threshold
+
+    def setArray(self, array):
+        if not self.use_tiles(array):
+            self.setPixmap(self.array_to_pixmap(array))
+            return
+
+        self.prepareGeometryChange()
+        self.tiles = TilePyramid(self.display_data(array), self.parent.display)
+        self.update()
+
+    def setPixmap(self, pixmap):
+        if self.tiles is not None:
+            self.prepareGeometryChange()
+            self.tiles = None
+
+        super(PimsImage, self).setPixmap(pixmap)
+
+    def to_pixmap(self):
+        """Returns the whole frame as QPixmap, also when it is drawn in tiles."""
+        if self.tiles is not None:
+            return self.tiles.full_pixmap()
+        return self.pixmap()
+
+    def boundingRect(self):
+        if self.tiles is None:
+            return super(PimsImage, self).boundingRect()
+        return QRectF(0, 0, self.tiles.width, self.tiles.height)
+
+    def shape(self):
+        if self.tiles is None:
+            return super(PimsImage, self).shape()
+
+        path = QPainterPath()
+        path.addRect(self.boundingRect())
+        return path
+
+    def paint(self, painter, option, widget=None):
+        with timings.measure('paint'):
+            self.paint_image(painter, option, widget)
 
-        image = pixmap_from_array(array)
+    def paint_image(self, painter, option, widget):
+        if self.tiles is None:
+            return super(PimsImage, self).paint(painter, option, widget)
 
-        return image
+        scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.tiles.level_for_scale(scale)
+        tile_scale = 2 ** level
+        tile_size = self.tiles.tile_size * tile_scale
 
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, scale < 1.0)
+        for ix, iy in self.tiles.tile_range(level, option.exposedRect):
+            pixmap = self.tiles.tile(level, ix, iy)
+            target = QRectF(ix * tile_size, iy * tile_size, pixmap.width() * tile_scale, pixmap.height() * tile_scale)
+            painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
@@ -0,0 +1,185 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+from pimsviewer.frame_cache import FrameCache
+from pimsviewer.timing import timings
+
+
+def _done_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class Stage(object):
+    """One array -> array step of a Pipeline.
+
+    `func(array, **params)` returns a new array and must not modify its input.
+    Results are memoized per frame and `params` (which must be hashable), so
+    func should not depend on anything else. Change them with `set_params`.
+    """
+
+    def __init__(self, func, name=None, enabled=True, **params):
+        super(Stage, self).__init__()
+
+        self.func = func
+        self.name = name or func.__name__
+        self.enabled = enabled
+        self.params = params
+
+    def set_params(self, **params):
+        self.params = dict(self.params, **params)
+
+    def __repr__(self):
+        return "<Stage %s(%s)%s>" % (self.name, ', '.join('%s=%r' % item for item in sorted(self.params.items())),
+                                     '' if self.enabled else ' disabled')
+
+
+class Pipeline(object):
+    """Runs ordered processing stages on frames on a worker pool.
+
+    The output of every stage is memoized per frame key and the parameters
+    of all stages up to it, so changing the parameters of a stage only reruns
+    that stage and the ones after it. Only the most recently requested frame
+    is wanted: queued work for other frames is cancelled, but work that is
+    already running finishes, and `latest` returns the most recently
+    requested frame of a `group` that has finished, e.g. an earlier frame
+    during playback. Frames that finish out of order do not replace a more
+    recently requested one, and `reset_latest` forgets it, e.g. after a seek.
+    """
+
+    def __init__(self, max_workers=2, cache_size_mb=256):
+        super(Pipeline, self).__init__()
+
+        self.stages = []
+        self.cache = FrameCache(cache_size_mb)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pimsviewer-pipeline')
+
+        self.wanted = None
+        self._futures = {}
+        # (group key, request number, frame), requests before _first_latest are not kept
+        self._latest = None
+        self._requests = 0
+        self._first_latest = 0
+        self._lock = Lock()
+        # part of all keys, so that results from before `clear` are never used
+        self._generation = 0
+
+    def add_stage(self, stage, index=None):
+        if index is None:
+            self.stages.append(stage)
+        else:
+            self.stages.insert(index, stage)
+        return stage
+
+    def remove_stage(self, stage):
+        self.stages.remove(stage)
+
+    @property
+    def enabled(self):
+        return any(stage.enabled for stage in self.stages)
+
+    def keys(self, frame_key, stages):
+        """Cache keys of the output of each of the (stage, params) in stages."""
+        keys = []
+        key = (self._generation, frame_key)
+        for stage, params in stages:
+            key = key + ((stage.name, tuple(sorted(params.items()))),)
+            keys.append(key)
+        return keys
+
+    def process(self, frame_key, frame, group=None):
+        """Returns a Future of frame processed by the enabled stages.
+
+        The future has a `key` attribute, which equals `wanted` as long as no
+        other frame has been requested since.
+        """
+        # parameters may change while the stages run
+        stages = [(stage, dict(stage.params)) for stage in self.stages if stage.enabled]
+        if not stages:
+            return _done_future(frame)
+
+        keys = self.keys(frame_key, stages)
+        key = keys[-1]
+
+        with self._lock:
+            self.wanted = key
+
+            result = self.cache.get(key)
+            if result is not None:
+                future = _done_future(result)
+                future.key = key
+                return future
+
+            for other in list(self._futures):
+                if other != key and self._futures[other].cancel():
+                    del self._futures[other]
+
+            if key not in self._futures:
+                group_key = self.keys(group, stages)[-1] if group is not None else None
+                self._requests += 1
+                future = self.executor.submit(self._run, frame, stages, keys, group_key, self._requests)
+                future.key = key
+                self._futures[key] = future
+
+            return self._futures[key]
+
+    def _run(self, frame, stages, keys, group_key=None, number=0):
+        try:
+            # continue from the output of the last memoized stage
+            start = 0
+            for i in range(len(keys) - 1, -1, -1):
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    frame = cached
+                    start = i + 1
+                    break
+
+            for i in range(start, len(stages)):
+                stage, params = stages[i]
+                with timings.measure('stage %s' % stage.name):
+                    frame = stage.func(frame, **params)
+                self.cache.put(keys[i], frame)
+
+            if group_key is not None:
+                self._keep_latest(group_key, number, frame)
+            return frame
+        finally:
+            with self._lock:
+                self._futures.pop(keys[-1], None)
+
+    def _keep_latest(self, group_key, number, frame):
+        with self._lock:
+            latest = self._latest
+            if number < self._first_latest or (latest is not None and latest[0] == group_key and number < latest[1]):
+                return
+            self._latest = (group_key, number, frame)
+
+    def latest(self, group):
+        """The finished frame of group that was requested last, processed by the enabled stages as they are now, or None."""
+        stages = [(stage, dict(stage.params)) for stage in self.stages if stage.enabled]
+        latest = self._latest
+        if not stages or latest is None or latest[0] != self.keys(group, stages)[-1]:
+            return None
+        return latest[2]
+
+    def reset_latest(self):
+        """Forgets the latest frame, also the ones of work that is still running."""
+        with self._lock:
+            self._latest = None
+            self._first_latest = self._requests + 1
+
+    def clear(self):
+        """Cancels pending work and forgets results, e.g. when another file is opened."""
+        self.reset_latest()
+        with self._lock:
+            self.wanted = None
+            self._generation += 1
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self.cache.clear()
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=True)
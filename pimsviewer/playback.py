@@ -0,0 +1,115 @@
+import time
+from collections import deque
+
+
+class PlaybackClock(object):
+    """Keeps playback in sync with the wall clock.
+
+    `advance` returns how many frames playback should move forward since the
+    previous call. This is more than one when showing frames takes longer
+    than the frame interval; the skipped frames are counted as dropped. When
+    fps is above `max_fps`, the rate at which frames are shown, frames are
+    skipped on purpose between them; those are not counted as dropped.
+    `frame_shown` registers a displayed frame, from which the achieved frame
+    rate is measured.
+    """
+    # seconds over which the achieved frame rate is measured
+    window = 2.0
+
+    def __init__(self, fps=5.0, max_fps=None):
+        super(PlaybackClock, self).__init__()
+
+        self._start_time = None
+        self._frames = 0
+        self._ticks = 0
+        self._shown = deque()
+
+        self.max_fps = max_fps
+        self.fps = fps
+        self.dropped = 0
+
+    @property
+    def fps(self):
+        return self._fps
+
+    @fps.setter
+    def fps(self, fps):
+        self._fps = float(fps)
+        if self._start_time is not None:
+            self.start()
+
+    @property
+    def max_fps(self):
+        return self._max_fps
+
+    @max_fps.setter
+    def max_fps(self, max_fps):
+        self._max_fps = float(max_fps) if max_fps else None
+        if self._start_time is not None:
+            self.start()
+
+    @property
+    def shown_fps(self):
+        """The rate at which frames are due to be shown."""
+        if self._max_fps is None:
+            return self._fps
+        return min(self._fps, self._max_fps)
+
+    def start(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+
+        self._start_time = now
+        self._frames = 0
+        self._ticks = 0
+        self.dropped = 0
+        self._shown.clear()
+
+    def stop(self):
+        self._start_time = None
+
+    def advance(self, now=None):
+        if self._start_time is None or self._fps <= 0:
+            return 0
+
+        if now is None:
+            now = time.perf_counter()
+
+        # frames that were due to be shown, at shown_fps, but were not, are dropped
+        elapsed = now - self._start_time
+        ticks = int(elapsed * self.shown_fps)
+        if ticks > self._ticks + 1:
+            per_tick = self._fps / self.shown_fps
+            self.dropped += int((ticks - 1) * per_tick) - int(self._ticks * per_tick)
+        self._ticks = max(ticks, self._ticks)
+
+        target = int(elapsed * self._fps)
+        steps = target - self._frames
+        if steps <= 0:
+            return 0
+
+        self._frames = target
+
+        return steps
+
+    def frame_shown(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+
+        self._shown.append(now)
+        while now - self._shown[0] > self.window:
+            self._shown.popleft()
+
+    @property
+    def achieved_fps(self):
+        if len(self._shown) < 2:
+            return 0.0
+
+        duration = self._shown[-1] - self._shown[0]
+        if duration <= 0:
+            return 0.0
+
+        return (len(self._shown) - 1) / duration
+
+    def __repr__(self):
+        return "<PlaybackClock: %.1f of %.1f fps, %d dropped>" % (self.achieved_fps, self.fps, self.dropped)
@@ -8,9 +8,8 @@ from PyQt5.QtCore import QDir, Qt, QRectF
 from PyQt5.QtGui import QImage, QPainter, QPalette, QPixmap
 from PyQt5.QtWidgets import (QHBoxLayout, QSlider, QWidget, QAction, QApplication, QFileDialog, QLabel, QMainWindow, QMenu, QMessageBox, QScrollArea, QSizePolicy, QStatusBar, QVBoxLayout, QDockWidget, QPushButton, QStyle, QLineEdit, QDialog, QGraphicsEllipseItem)
 
-import pandas as pd
-
 from pimsviewer.utils import pixmap_from_array
+from pimsviewer.pipeline import Stage
 
 class Plugin(QDialog):
     name = 'Plugin'
@@ -19,6 +18,19 @@ class Plugin(QDialog):
     def __init__(self, parent=None):
         super(Plugin, self).__init__(parent)
         self.app = parent
+        self.stages = []
+
+    def add_stage(self, func, name=None, **params):
+        """Adds an array -> array processing stage to the viewer, see pipeline.Stage.
+
+        The stage is enabled while the plugin is active.
+        """
+        stage = Stage(func, name=name, enabled=self.active, **params)
+        self.stages.append(stage)
+        if self.app is not None:
+            self.app.pipeline.add_stage(stage)
+
+        return stage
 
     def activate(self):
         self.active = True
@@ -31,6 +43,12 @@ class Plugin(QDialog):
     @active.setter
     def active(self, active):
         self._active = bool(active)
+        for stage in self.stages:
+            stage.enabled = self._active
 
-    def showFrame(self, image_widget):
+    def showFrame(self, image_widget, dimensions):
         pass
+
+    def overlay(self):
+        """Returns an object that draws this plugin's overlay onto exported frames, see render.Markers."""
+        return None
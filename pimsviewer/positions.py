@@ -0,0 +1,367 @@
+import warnings
+import numpy as np
+from os import path
+
+# columns that are read from position files, and the dtypes they are kept in
+COLUMNS = ('frame', 'x', 'y', 'r', 'particle')
+DTYPES = {'frame': np.int32, 'x': np.float32, 'y': np.float32, 'r': np.float32, 'particle': np.int32}
+ARROW_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+# particle id of positions that are not linked into a trajectory, which have none (NaN) in trackpy tables
+UNLINKED = -1
+
+
+def _needed_columns(filename, names):
+    columns = [name for name in COLUMNS if name in names]
+    missing = [name for name in ('frame', 'x', 'y') if name not in columns]
+    if missing:
+        raise ValueError("%s has no column(s) %s" % (path.basename(filename), ', '.join(missing)))
+    return columns
+
+
+def _compact(df, columns):
+    # positions without a frame number cannot be shown
+    missing = df['frame'].isna()
+    if missing.any():
+        warnings.warn('Skipping %d positions without a frame number' % missing.sum())
+        df = df[~missing]
+
+    df = df[columns]
+    if 'particle' in columns:
+        df = df.fillna({'particle': UNLINKED})
+    return df.astype({name: DTYPES[name] for name in columns})
+
+
+def read_positions(filename, chunk_rows=1000000):
+    """Reads a file of positions in DataFrames of up to chunk_rows rows.
+
+    Only the columns frame, x, y, r and particle are read, in the dtypes of
+    DTYPES. Positions without a frame number are skipped, those without a
+    particle id get UNLINKED. CSV files are read with pandas, Parquet and Feather files with
+    pyarrow, which is optional.
+    """
+    import pandas as pd
+
+    kind = ARROW_FORMATS.get(path.splitext(filename)[1].lower())
+    if kind is None:
+        columns = _needed_columns(filename, pd.read_csv(filename, nrows=0).columns)
+        floats = {name: DTYPES[name] for name in columns if DTYPES[name] == np.float32}
+        for chunk in pd.read_csv(filename, usecols=columns, dtype=floats, chunksize=chunk_rows):
+            yield _compact(chunk, columns)
+        return
+
+    try:
+        import pyarrow
+    except ImportError:
+        raise ValueError("Reading %s files requires pyarrow" % kind.capitalize())
+
+    if kind == 'parquet':
+        import pyarrow.parquet
+        source = pyarrow.parquet.ParquetFile(filename)
+        columns = _needed_columns(filename, source.schema_arrow.names)
+        batches = source.iter_batches(batch_size=chunk_rows, columns=columns)
+    else:
+        import pyarrow.ipc
+        source = pyarrow.ipc.open_file(pyarrow.memory_map(filename))
+        columns = _needed_columns(filename, source.schema.names)
+        batches = (source.get_batch(i).select(columns) for i in range(source.num_record_batches))
+
+    for batch in batches:
+        yield _compact(batch.to_pandas(), columns)
+
+
+def load_positions(filename):
+    import pandas as pd
+    return pd.concat(list(read_positions(filename)), ignore_index=True)
+
+
+class PositionIndex(object):
+    """Particle positions sorted by frame number, with a frame -> rows index.
+
+    The index is built once, after which the positions in a frame are
+    returned as array slices without filtering the whole table.
+    """
+
+    def __init__(self, frames, x, y, r=None):
+        super(PositionIndex, self).__init__()
+
+        frames = np.asarray(frames)
+        order = np.argsort(frames, kind='stable')
+
+        self.frames = frames[order]
+        self.x = np.asarray(x, dtype=np.float32)[order]
+        self.y = np.asarray(y, dtype=np.float32)[order]
+        if r is None:
+            self.r = np.full(len(self.frames), np.nan, dtype=np.float32)
+        else:
+            self.r = np.asarray(r, dtype=np.float32)[order]
+
+        frame_numbers, starts = np.unique(self.frames, return_index=True)
+        stops = np.append(starts[1:], len(self.frames))
+        self._rows = {int(f): slice(int(start), int(stop)) for f, start, stop in zip(frame_numbers, starts, stops)}
+
+    @classmethod
+    def from_dataframe(cls, df, x_name='x', y_name='y', r_name='r', frame_name='frame'):
+        r = df[r_name] if r_name in df else None
+        return cls(df[frame_name], df[x_name], df[y_name], r)
+
+    def rows(self, frame_no):
+        return self._rows.get(int(frame_no), slice(0, 0))
+
+    def positions(self, frame_no):
+        """Returns the x, y and r arrays of the positions in a frame."""
+        rows = self.rows(frame_no)
+        return self.x[rows], self.y[rows], self.r[rows]
+
+    def count(self, frame_no):
+        rows = self.rows(frame_no)
+        return rows.stop - rows.start
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __repr__(self):
+        return "<PositionIndex: %d positions in %d frames>" % (len(self), len(self._rows))
+
+
+class ChunkedPositions(object):
+    """Positions that are added a chunk at a time, while a file loads, with the interface of PositionIndex."""
+
+    def __init__(self):
+        super(ChunkedPositions, self).__init__()
+        self.chunks = []
+
+    def add(self, index):
+        self.chunks.append(index)
+
+    def positions(self, frame_no):
+        parts = [chunk.positions(frame_no) for chunk in self.chunks if chunk.count(frame_no)]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return tuple(np.empty(0, dtype=np.float32) for _ in range(3))
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    def count(self, frame_no):
+        return sum(chunk.count(frame_no) for chunk in self.chunks)
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def __repr__(self):
+        return "<ChunkedPositions: %d positions in %d chunks>" % (len(self), len(self.chunks))
+
+
+class SpatialGrid(object):
+    """Points bucketed into square cells, and ordered by cell.
+
+    The points in a rectangle are found from the cells that it overlaps, a
+    contiguous range of points per row of cells, instead of by testing all
+    points. Cells hold about `per_cell` points when `cell_size` is not given.
+    """
+    per_cell = 16
+
+    def __init__(self, x, y, cell_size=None):
+        super(SpatialGrid, self).__init__()
+
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+
+        valid = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        if len(valid) == 0:
+            self.origin = (0.0, 0.0)
+            self.cell_size = 1.0
+            self.shape = (0, 0)
+            self.order = valid
+            self.cells = valid
+            return
+
+        x, y = self.x[valid], self.y[valid]
+        self.origin = (x.min(), y.min())
+        width = max(x.max() - self.origin[0], 1.0)
+        height = max(y.max() - self.origin[1], 1.0)
+        if cell_size is None:
+            cell_size = np.clip(np.sqrt(width * height * self.per_cell / len(valid)), 1.0, max(width, height))
+        self.cell_size = float(cell_size)
+
+        columns = ((x - self.origin[0]) // self.cell_size).astype(np.int64)
+        rows = ((y - self.origin[1]) // self.cell_size).astype(np.int64)
+        self.shape = (int(rows.max()) + 1, int(columns.max()) + 1)
+
+        cells = rows * self.shape[1] + columns
+        order = np.argsort(cells, kind='stable')
+        self.order = valid[order]
+        self.cells = cells[order]
+
+    def cell_range(self, start, stop, origin, count):
+        first = max(int(np.floor((start - origin) / self.cell_size)), 0)
+        last = min(int(np.floor((stop - origin) / self.cell_size)), count - 1)
+        return first, last
+
+    def query(self, left, top, right, bottom):
+        """Indices of the points in the rectangle, edges included."""
+        c0, c1 = self.cell_range(left, right, self.origin[0], self.shape[1])
+        r0, r1 = self.cell_range(top, bottom, self.origin[1], self.shape[0])
+        if c0 > c1 or r0 > r1:
+            return np.empty(0, dtype=np.intp)
+
+        row_cells = np.arange(r0, r1 + 1) * self.shape[1]
+        starts = np.searchsorted(self.cells, row_cells + c0, 'left')
+        stops = np.searchsorted(self.cells, row_cells + c1, 'right')
+        candidates = np.concatenate([self.order[start:stop] for start, stop in zip(starts, stops)])
+
+        x, y = self.x[candidates], self.y[candidates]
+        inside = (x >= left) & (x <= right) & (y >= top) & (y <= bottom)
+        return candidates[inside]
+
+    def __len__(self):
+        return len(self.order)
+
+
+class FrameMarkers(object):
+    """The markers of one frame in image coordinates, indexed for drawing only the visible ones.
+
+    `density` counts the markers in a rectangle in square bins, for drawing
+    views with too many markers to draw them one by one.
+    """
+
+    def __init__(self, x, y, r):
+        super(FrameMarkers, self).__init__()
+
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.r = np.asarray(r, dtype=np.float64)
+        self.grid = SpatialGrid(self.x, self.y)
+
+        self.max_radius = float(np.nanmax(self.r)) if len(self.r) else 0.0
+        self.radius = float(np.nanmedian(self.r)) if len(self.r) else 0.0
+
+    def visible(self, left, top, right, bottom):
+        """Indices of the markers that overlap the rectangle."""
+        margin = self.max_radius
+        return self.grid.query(left - margin, top - margin, right + margin, bottom + margin)
+
+    def density(self, bin_size, left, top, right, bottom):
+        """Returns (counts, left, top): markers in the rectangle per bin_size square, starting at (left, top).
+
+        Bins are aligned to multiples of bin_size, so left and top are rounded down.
+        """
+        left = np.floor(left / bin_size) * bin_size
+        top = np.floor(top / bin_size) * bin_size
+
+        rows = self.grid.query(left, top, right, bottom)
+        if len(rows) == 0:
+            return np.zeros((0, 0), dtype=np.float32), left, top
+
+        columns = ((self.x[rows] - left) // bin_size).astype(np.intp)
+        lines = ((self.y[rows] - top) // bin_size).astype(np.intp)
+        shape = (lines.max() + 1, columns.max() + 1)
+        counts = np.bincount(lines * shape[1] + columns, minlength=shape[0] * shape[1])
+        return counts.reshape(shape).astype(np.float32), left, top
+
+    def __len__(self):
+        return len(self.x)
+
+
+class TrajectoryIndex(object):
+    """Positions sorted by particle and then by frame, for finding the recent positions of every particle.
+
+    Particles are numbered by rank, 0 to n - 1, in the order of their ids in
+    `particles`; the rows of particle i are `starts[i]:starts[i + 1]`.
+    Positions that are not linked into a trajectory are left out by
+    `from_dataframe`.
+    """
+
+    def __init__(self, frames, x, y, particles):
+        super(TrajectoryIndex, self).__init__()
+
+        frames = np.asarray(frames, dtype=np.int64)
+        self.particles, ranks = np.unique(np.asarray(particles), return_inverse=True)
+        order = np.lexsort((frames, ranks))
+
+        self.frames = frames[order]
+        self.ranks = ranks[order]
+        self.x = np.asarray(x, dtype=np.float32)[order]
+        self.y = np.asarray(y, dtype=np.float32)[order]
+        self.starts = np.searchsorted(self.ranks, np.arange(len(self.particles) + 1))
+
+        # frame and rank combined, in sorting order, to find the rows of a range of frames of all particles at once
+        self.first_frame = int(self.frames.min()) if len(self.frames) else 0
+        self._span = int(self.frames.max()) - self.first_frame + 2 if len(self.frames) else 1
+        self._keys = self.ranks * self._span + (self.frames - self.first_frame)
+
+        # rows in order of frame, and the range of them per frame
+        self._frame_order = np.argsort(self.frames, kind='stable')
+        frame_numbers, starts = np.unique(self.frames[self._frame_order], return_index=True)
+        stops = np.append(starts[1:], len(self.frames))
+        self._frame_rows = {int(f): slice(int(start), int(stop)) for f, start, stop in zip(frame_numbers, starts, stops)}
+
+    @classmethod
+    def from_dataframe(cls, df, x_name='x', y_name='y', frame_name='frame', particle_name='particle'):
+        # UNLINKED or NaN
+        linked = df[particle_name] > UNLINKED
+        if not linked.all():
+            df = df[linked]
+        return cls(df[frame_name], df[x_name], df[y_name], df[particle_name])
+
+    def window(self, first, last):
+        """(start, stop) rows of every particle, for the frames from first to last."""
+        first = min(max(first - self.first_frame, 0), self._span - 1)
+        last = min(max(last - self.first_frame, -1), self._span - 1)
+        offsets = np.arange(len(self.particles)) * self._span
+        return (np.searchsorted(self._keys, offsets + first, 'left'),
+                np.searchsorted(self._keys, offsets + last, 'right'))
+
+    def rows_at(self, frame_no):
+        """Rows of the positions in a frame."""
+        return self._frame_order[self._frame_rows.get(int(frame_no), slice(0, 0))]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __repr__(self):
+        return "<TrajectoryIndex: %d positions of %d particles>" % (len(self), len(self.particles))
+
+
+class Trails(object):
+    """The positions of every particle in the last `length` frames up to the current frame.
+
+    `move_to` a frame next to the current one only adds the positions that
+    enter the window and drops those that leave it, and returns these
+    changes as (added rows, ranks of dropped rows, forward); the rows are
+    added at the end of the trails when moving forward, and at the start when
+    moving backward. Moving further, it returns None, and the trails are
+    `lo[rank]:hi[rank]` of the rows of the TrajectoryIndex.
+    """
+
+    def __init__(self, index, length):
+        super(Trails, self).__init__()
+
+        self.index = index
+        self.length = int(length)
+        self.frame = None
+        self.lo = self.hi = None
+
+    def move_to(self, frame_no):
+        frame_no = int(frame_no)
+        previous, self.frame = self.frame, frame_no
+
+        if previous == frame_no:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), True
+
+        if previous is None or abs(frame_no - previous) != 1:
+            self.lo, self.hi = self.index.window(frame_no - self.length + 1, frame_no)
+            return None
+
+        ranks = self.index.ranks
+        if frame_no > previous:
+            dropped = ranks[self.index.rows_at(frame_no - self.length)]
+            added = self.index.rows_at(frame_no)
+            np.add.at(self.lo, dropped, 1)
+            np.add.at(self.hi, ranks[added], 1)
+            return added, dropped, True
+
+        dropped = ranks[self.index.rows_at(previous)]
+        added = self.index.rows_at(frame_no - self.length + 1)
+        np.subtract.at(self.hi, dropped, 1)
+        np.subtract.at(self.lo, ranks[added], 1)
+        return added, dropped, False
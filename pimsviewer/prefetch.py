@@ -0,0 +1,123 @@
+import math
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait as futures_wait
+
+
+class Prefetcher(object):
+    """Decodes upcoming frames along the playing axis on a thread pool.
+
+    Frames are requested with FrameRequest objects. After a frame has been
+    shown, `prefetch` schedules the next frames in the current playback
+    direction; `get_frame` serves a frame from this buffer when possible and
+    reads it synchronously otherwise.
+
+    Prefetchers of several files can share one `executor`, so that they
+    decode on a common pool of threads; it is then not shut down with them.
+    """
+    min_depth = 2
+    max_depth = 32
+    # seconds of playback to read ahead
+    lookahead = 1.0
+
+    def __init__(self, reader, max_workers=2, max_depth=None, executor=None):
+        super(Prefetcher, self).__init__()
+        self.reader = reader
+
+        if max_depth is not None:
+            self.max_depth = int(max_depth)
+
+        self._own_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pimsviewer-prefetch')
+        self.executor = executor
+        self._buffer = OrderedDict()
+        self._last_request = None
+        self._last_delta = 0
+        self.step = 1
+
+    def get_frame(self, request):
+        future = self._buffer.pop(request, None)
+
+        # a pending read is cancelled and done here, instead of waiting in the queue
+        if future is not None and not future.cancel():
+            return future.result()
+
+        return self.reader.read_frame(request)
+
+    def seed(self, request, frame):
+        """Adds a frame that was read elsewhere, e.g. when the file was opened in advance."""
+        future = Future()
+        future.set_result(frame)
+        self._buffer[request] = future
+
+    def depth(self, fps=0.0):
+        if fps <= 0:
+            return self.min_depth
+
+        depth = int(math.ceil(fps * self.lookahead))
+        return max(self.min_depth, min(depth, self.max_depth))
+
+    def update_step(self, request, size):
+        last_request = self._last_request
+        self._last_request = request
+
+        if last_request is None or last_request.with_index(0) != request.with_index(0):
+            return self.step
+
+        delta = (request.index - last_request.index) % size
+        if delta > size // 2:
+            delta -= size
+
+        if delta == 0:
+            return self.step
+
+        if delta == self._last_delta:
+            # regular playback, possibly skipping frames
+            self.step = delta
+        else:
+            # a seek or a change of direction
+            self.step = 1 if delta > 0 else -1
+        self._last_delta = delta
+
+        return self.step
+
+    def prefetch(self, request, size, fps=0.0):
+        if size < 2:
+            return
+
+        step = self.update_step(request, size)
+        depth = min(self.depth(fps), size - 1)
+
+        wanted = []
+        for i in range(1, depth + 1):
+            key = request.with_index((request.index + i * step) % size)
+            if key != request and key not in wanted:
+                wanted.append(key)
+
+        # cancel stale work, e.g. after a seek or a change of axes
+        for key in list(self._buffer.keys()):
+            if key not in wanted:
+                self._buffer.pop(key).cancel()
+
+        for key in wanted:
+            if key not in self._buffer:
+                self._buffer[key] = self.executor.submit(self.reader.read_frame, key)
+
+    @property
+    def queue_depth(self):
+        return sum(1 for future in self._buffer.values() if not future.done())
+
+    def cancel(self):
+        for future in self._buffer.values():
+            future.cancel()
+        self._buffer.clear()
+        self._last_request = None
+
+    def shutdown(self):
+        pending = list(self._buffer.values())
+        self.cancel()
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+        else:
+            # reads that already started still use the reader
+            futures_wait(pending)
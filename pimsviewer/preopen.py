@@ -0,0 +1,95 @@
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+PreOpened = namedtuple('PreOpened', ['reader', 'request', 'frame'])
+
+
+def _close_result(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().reader.close()
+
+
+class PreOpener(object):
+    """Opens files in advance on a background thread, e.g. the next and previous file in a directory.
+
+    `open_reader(filename)` returns a reader. `first_request(reader)`, when
+    given, returns the FrameRequest of the first frame that will be shown,
+    which is then read as well; it may return None to only open the file.
+    """
+
+    def __init__(self, open_reader, first_request=None, max_workers=1):
+        super(PreOpener, self).__init__()
+
+        self.open_reader = open_reader
+        self.first_request = first_request
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pimsviewer-preopen')
+        # files that are opened right away do not wait for files that are opened in advance,
+        # nor for a file of which opening was cancelled, but still takes a while
+        self.open_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='pimsviewer-open')
+        self._files = OrderedDict()
+
+    def _open(self, filename):
+        reader = self.open_reader(filename)
+
+        try:
+            request = None if self.first_request is None else self.first_request(reader)
+            frame = None if request is None else reader.read_frame(request)
+        except:
+            reader.close()
+            raise
+
+        return PreOpened(reader, request, frame)
+
+    def keep(self, filenames):
+        """Opens filenames in advance, and closes files opened before that are not in filenames."""
+        for filename in list(self._files):
+            if filename not in filenames:
+                self.discard(self._files.pop(filename))
+
+        for filename in filenames:
+            if filename not in self._files:
+                self._files[filename] = self.executor.submit(self._open, filename)
+
+    def open(self, filename):
+        """Returns a Future of filename as PreOpened, without waiting.
+
+        This is the future that opens filename in advance, if there is one,
+        and otherwise filename is opened right away on another thread. The
+        caller becomes responsible for closing the reader, or for passing the
+        future to `discard`.
+        """
+        future = self._files.pop(filename, None)
+        if future is not None and not future.cancel():
+            return future
+
+        return self.open_executor.submit(self._open, filename)
+
+    @staticmethod
+    def discard(future):
+        """Cancels opening a file, or closes it once it has been opened."""
+        if not future.cancel():
+            future.add_done_callback(_close_result)
+
+    def take(self, filename):
+        """Returns filename as PreOpened, or None if it was not opened in advance or could not be opened.
+
+        Waits when filename is being opened. The caller becomes responsible
+        for closing the reader.
+        """
+        future = self._files.pop(filename, None)
+        if future is None or future.cancel():
+            return None
+
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def __contains__(self, filename):
+        return filename in self._files
+
+    def shutdown(self):
+        self.keep([])
+        self.executor.shutdown(wait=True)
+        self.open_executor.shutdown(wait=True)
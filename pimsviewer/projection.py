@@ -0,0 +1,180 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+import numpy as np
+
+from pimsviewer.frame_cache import FrameCache
+from pimsviewer.wrapped_reader import FrameRequest
+from pimsviewer.timing import timings
+
+PROJECTIONS = ['sum', 'max', 'mean', 'min']
+
+
+def project(array, axis, mode):
+    """Projects an array along an axis. Sums and means are computed in float32."""
+    if mode == 'max':
+        return np.max(array, axis=axis)
+    if mode == 'min':
+        return np.min(array, axis=axis)
+    if mode not in PROJECTIONS:
+        raise ValueError("Unknown projection '%s'" % mode)
+
+    out = np.empty(array.shape[:axis] + array.shape[axis + 1:], dtype=np.float32)
+    np.sum(array, axis=axis, dtype=np.float32, out=out)
+    if mode == 'mean':
+        out /= array.shape[axis]
+
+    return out
+
+
+class ChunkedProjection(object):
+    """Accumulates a projection over chunks of planes, stacked along axis 0."""
+
+    def __init__(self, mode):
+        super(ChunkedProjection, self).__init__()
+
+        self.mode = mode
+        self.result = None
+        self.count = 0
+
+    def add(self, chunk):
+        part = project(chunk, 0, 'sum' if self.mode == 'mean' else self.mode)
+        self.count += len(chunk)
+
+        if self.result is None:
+            self.result = part
+        elif self.mode == 'max':
+            np.maximum(self.result, part, out=self.result)
+        elif self.mode == 'min':
+            np.minimum(self.result, part, out=self.result)
+        else:
+            np.add(self.result, part, out=self.result)
+
+    def finish(self):
+        if self.mode == 'mean' and self.count > 0:
+            self.result /= self.count
+        return self.result
+
+
+def read_projection(reader, request, axis, size, mode, chunk_size=16, cancelled=None):
+    """Projects the planes of request along axis, reading chunk_size planes at a time.
+
+    Returns None when `cancelled()` becomes true between chunks.
+    """
+    projection = ChunkedProjection(mode)
+
+    # the position along the playing axis of request is its index, which is replaced by that along axis
+    coords = request.coords
+    coords.pop(axis, None)
+    plane_request = FrameRequest.create(0, axis, request.bundle_axes, coords)
+
+    for start in range(0, size, chunk_size):
+        if cancelled is not None and cancelled():
+            return None
+
+        stop = min(start + chunk_size, size)
+        planes = reader.read_frames([plane_request.with_index(i) for i in range(start, stop)])
+        projection.add(np.stack(planes))
+
+    return projection.finish()
+
+
+class Projector(object):
+    """Computes projections of a reader along an axis on a worker thread.
+
+    Planes are read in chunks along the projected axis, so the whole stack is
+    never in memory at once. Results are cached per request (without the
+    coordinate of the projected axis) and projection mode, so that e.g.
+    toggling channels or replaying frames does not recompute them.
+
+    A projection that has started is always finished, also when another one
+    is requested meanwhile; only the ones that wait are cancelled. While a
+    projection is computed, `latest` returns the most recently requested
+    finished one of the same `group`, e.g. of an earlier frame during
+    playback, until `reset_latest`; see Pipeline.
+    """
+    chunk_size = 16
+
+    def __init__(self, reader, cache_size_mb=256):
+        super(Projector, self).__init__()
+        self.reader = reader
+
+        self.cache = FrameCache(cache_size_mb)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pimsviewer-projection')
+
+        self._futures = {}
+        # (group, request number, key, result), requests before _first_latest are not kept
+        self._latest = None
+        self._requests = 0
+        self._first_latest = 0
+        self._closed = False
+        self._lock = Lock()
+
+    def key(self, request, axis, mode):
+        # all coordinates, including the one along the playing axis, but that of the projected axis
+        coords = request.coords
+        coords.pop(axis, None)
+        return (FrameRequest.create(0, '', request.bundle_axes, coords), axis, mode)
+
+    def project(self, request, axis, size, mode, group=None):
+        """Returns a Future of the projection of the planes of request along axis."""
+        key = self.key(request, axis, mode)
+
+        result = self.cache.get(key)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return future
+
+        with self._lock:
+            for other in list(self._futures):
+                if other != key and self._futures[other].cancel():
+                    del self._futures[other]
+
+            if key not in self._futures:
+                self._requests += 1
+                self._futures[key] = self.executor.submit(self._compute, key, size, group, self._requests)
+
+            return self._futures[key]
+
+    def _compute(self, key, size, group, number=0):
+        request, axis, mode = key
+
+        try:
+            with timings.measure('projection'):
+                result = read_projection(self.reader, request, axis, size, mode, self.chunk_size,
+                                         cancelled=lambda: self._closed)
+            if result is not None:
+                self.cache.put(key, result)
+                if group is not None:
+                    self._keep_latest(group, number, key, result)
+            return result
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    def _keep_latest(self, group, number, key, result):
+        with self._lock:
+            latest = self._latest
+            if number < self._first_latest or (latest is not None and latest[0] == group and number < latest[1]):
+                return
+            self._latest = (group, number, key, result)
+
+    def latest(self, group):
+        """(key, result) of the finished projection of group that was requested last, or None."""
+        latest = self._latest
+        if latest is None or latest[0] != group:
+            return None
+        return latest[2:]
+
+    def reset_latest(self):
+        """Forgets the latest projection, also the ones that are still computed."""
+        with self._lock:
+            self._latest = None
+            self._first_latest = self._requests + 1
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            for future in self._futures.values():
+                future.cancel()
+        self.executor.shutdown(wait=True)
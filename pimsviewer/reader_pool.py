@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition
+
+
+def default_pool_size():
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+class ReaderPool(object):
+    """Independent readers of the same file, so that frames can be decoded in parallel.
+
+    pims readers keep the axes of the next read as state, so a single reader
+    decodes one frame at a time. The pool reads every FrameRequest with a
+    reader that is not in use, opening further readers with `open_reader()`
+    when all are busy, up to `max_readers` including `reader`. All readers
+    share the caches of `reader`, which is the one the viewer shows.
+
+    Prefetcher and Projector accept a pool wherever they accept a reader.
+    """
+
+    def __init__(self, reader, open_reader, max_readers=None):
+        super(ReaderPool, self).__init__()
+
+        self.reader = reader
+        self.open_reader = open_reader
+        self.max_readers = int(max_readers or default_pool_size())
+
+        self._readers = [reader]
+        self._idle = [reader]
+        self._condition = Condition()
+        self._closed = False
+        self._executor = None
+
+    def acquire(self):
+        """A reader that is not in use, which must be given back with `release`."""
+        with self._condition:
+            while not self._idle:
+                if self._closed:
+                    raise ValueError('Reading from a closed ReaderPool')
+                if len(self._readers) < self.max_readers:
+                    # reserve a place while the reader opens, without holding the lock
+                    self._readers.append(None)
+                    break
+                self._condition.wait()
+            else:
+                return self._idle.pop()
+
+        try:
+            reader = self.open_reader()
+        except Exception:
+            with self._condition:
+                # the file cannot be opened again, so the readers that are open have to do
+                self._readers.remove(None)
+                self.max_readers = len(self._readers)
+                self._condition.notify_all()
+            return self.acquire()
+
+        reader.cache = self.reader.cache
+        reader.cache_token = self.reader.cache_token
+        reader.disk_store = self.reader.disk_store
+        with self._condition:
+            self._readers[self._readers.index(None)] = reader
+        return reader
+
+    def release(self, reader):
+        with self._condition:
+            if self._closed and reader is not self.reader:
+                reader.close()
+                return
+            self._idle.append(reader)
+            self._condition.notify()
+
+    def read_frame(self, request):
+        frame = self.reader.cached_frame(request)
+        if frame is not None:
+            return frame
+
+        reader = self.acquire()
+        try:
+            return reader.decode_frame(request)
+        finally:
+            self.release(reader)
+
+    def read_frames(self, requests):
+        """Reads requests in parallel, returning the frames in the same order."""
+        if self.max_readers < 2 or len(requests) < 2:
+            return [self.read_frame(request) for request in requests]
+
+        with self._condition:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_readers, thread_name_prefix='pimsviewer-read')
+        return list(self._executor.map(self.read_frame, requests))
+
+    @property
+    def size(self):
+        """Readers that are open."""
+        return len([reader for reader in self._readers if reader is not None])
+
+    def close(self):
+        """Closes all readers but `reader`; readers in use are closed when they are released."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        for reader in idle:
+            if reader is not self.reader:
+                reader.close()
+
+    def __repr__(self):
+        return "<ReaderPool: %d of %d readers open, %d idle>" % (self.size, self.max_readers, len(self._idle))
@@ -0,0 +1,81 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from pimsviewer.projection import read_projection
+
+
+class Markers(object):
+    """Circles at the positions of a PositionIndex.
+
+    x and y are swapped when `swap_xy`, and coordinates and radii are
+    multiplied by `scale`. Positions without a radius are drawn with
+    `default_radius` pixels. Used for the overlay of the Annotate plugin, and
+    drawn onto rendered frames with `draw`.
+    """
+    default_radius = 10.0
+
+    def __init__(self, index, swap_xy=False, scale=1.0, color=(255, 0, 0), width=2):
+        super(Markers, self).__init__()
+
+        self.index = index
+        self.swap_xy = swap_xy
+        self.scale = scale
+        self.color = color
+        self.width = width
+
+    def positions(self, frame_no):
+        x, y, r = self.index.positions(frame_no)
+        if self.swap_xy:
+            x, y = y, x
+
+        r = np.where(np.isnan(r), self.default_radius, r * self.scale)
+        return x * self.scale, y * self.scale, r
+
+    def draw(self, image, request):
+        """Draws the markers of the frame of request onto an RGB PIL image."""
+        x, y, r = self.positions(request.coords.get('t', 0))
+
+        draw = ImageDraw.Draw(image)
+        for xi, yi, ri in zip(x.tolist(), y.tolist(), r.tolist()):
+            draw.ellipse([xi - ri, yi - ri, xi + ri, yi + ri], outline=self.color, width=self.width)
+
+
+def render_frame(reader, request, compositor, projection_axis=None, projections=None, stages=(), overlays=()):
+    """Renders the frame of request as the viewer displays it, without Qt.
+
+    The frame is read from a WrappedReader, or projected along
+    `projection_axis`, processed by `stages` (a list of (func, params)), and
+    composited and mapped for display by `compositor`. `projections` maps
+    merged axes to their projection mode. `overlays` are objects with a
+    `draw(image, request)` method, drawn onto the result.
+
+    Returns a (y, x) or (y, x, 3) uint8 array.
+    """
+    if projections is None:
+        projections = {}
+
+    if projection_axis is None:
+        frame = reader.read_frame(request)
+    else:
+        mode = projections.get(projection_axis, 'sum')
+        frame = read_projection(reader, request, projection_axis, reader.sizes[projection_axis], mode)
+
+    for func, params in stages:
+        frame = func(frame, **params)
+
+    data = compositor.composite(frame, request.bundle_axes, projections)
+    if data.ndim == 2:
+        data = compositor.display.to_display(data)
+
+    if overlays:
+        image = Image.fromarray(data).convert('RGB')
+        for overlay in overlays:
+            overlay.draw(image, request)
+        data = np.asarray(image)
+
+    return data
+
+
+def write_image(data, filename):
+    """Writes display data to an image file, in the format given by its extension."""
+    Image.fromarray(data).save(filename)
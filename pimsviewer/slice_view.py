@@ -0,0 +1,245 @@
+from PyQt5.QtCore import Qt, QLineF, pyqtSignal
+from PyQt5.QtGui import QPen, QColor
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QFormLayout, QComboBox, QLabel,
+                             QGraphicsLineItem)
+
+from pimsviewer.imagewidget import ImageWidget
+from pimsviewer.wrapped_reader import make_request
+from pimsviewer.utils import FutureWatcher
+
+
+class SliceDock(QDockWidget):
+    """Shows a slice through the planes along an axis: xz or yz at the cursor, or a kymograph along a line.
+
+    The cursor is placed, and the line drawn, with Shift+drag on the image.
+    Slices are built by the viewer's SliceBuilder and shown while they fill.
+    Moves of the cursor and of the shown frame while a slice is being built
+    are followed once it is done, see request_update.
+    """
+    kinds = [('xz', 'xz at the cursor'), ('yz', 'yz at the cursor'), ('line', 'Kymograph along a line')]
+    # axes that are sliced along by default, in order of preference
+    default_axes = {'xz': 'zvt', 'yz': 'zvt', 'line': 'tzv'}
+
+    # (key, partly filled slice, filled rows), emitted from the thread of the SliceBuilder
+    slice_progress = pyqtSignal(object, object, int)
+
+    def __init__(self, parent=None):
+        super(SliceDock, self).__init__('Slices', parent)
+        self.app = parent
+
+        self.setObjectName('sliceDock')
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
+
+        widget = QWidget()
+        self.vbox = QVBoxLayout()
+        widget.setLayout(self.vbox)
+        self.setWidget(widget)
+
+        form = QFormLayout()
+        self.kindInput = QComboBox()
+        for kind, text in self.kinds:
+            self.kindInput.addItem(text, kind)
+        self.kindInput.currentIndexChanged.connect(self.kind_changed)
+        form.addRow('Slice', self.kindInput)
+
+        self.axisInput = QComboBox()
+        self.axisInput.currentIndexChanged.connect(self.update_slice)
+        form.addRow('Along', self.axisInput)
+        self.vbox.addLayout(form)
+
+        self.view = ImageWidget()
+        # slices are shown with the contrast and colormap of the image
+        self.view.display = self.app.imageView.display
+        self.view.setMinimumHeight(120)
+        self.vbox.addWidget(self.view, 1)
+
+        self.label = QLabel()
+        self.label.setWordWrap(True)
+        self.vbox.addWidget(self.label)
+
+        pen = QPen(QColor(0, 255, 255))
+        pen.setCosmetic(True)
+        # where the slice is taken, on the image
+        self.lineItem = QGraphicsLineItem(self.app.imageView.image)
+        self.lineItem.setPen(pen)
+        self.lineItem.setVisible(False)
+        # the shown plane, on the slice
+        self.positionItem = QGraphicsLineItem(self.view.image)
+        self.positionItem.setPen(pen)
+        self.positionItem.setVisible(False)
+
+        self.start = None
+        self.end = None
+        self.future = None
+        self.sizes = None
+        # the slice that is shown, and whether it is to be updated when the one being built is done
+        self.shownResult = None
+        self.pending = False
+
+        self.watcher = FutureWatcher(self)
+        self.watcher.finished.connect(self.slice_done)
+        self.slice_progress.connect(self.show_progress)
+        self.app.imageView.line_event.connect(self.set_line)
+
+    @property
+    def kind(self):
+        return self.kindInput.currentData()
+
+    @property
+    def axis(self):
+        return self.axisInput.currentData()
+
+    def showEvent(self, event):
+        super(SliceDock, self).showEvent(event)
+        self.update_line()
+        self.update_slice()
+
+    def hideEvent(self, event):
+        super(SliceDock, self).hideEvent(event)
+        self.lineItem.setVisible(False)
+
+    def kind_changed(self):
+        self.sizes = None
+        self.update_axes()
+        self.update_line()
+        self.update_slice()
+
+    def update_axes(self):
+        """Lists the axes of the file that can be sliced along, when the file changed."""
+        sizes = self.app.reader.sizes if self.app.reader is not None else {}
+        if sizes == self.sizes:
+            return
+        self.sizes = dict(sizes)
+
+        axes = [dim for dim in 'tvzc' if sizes.get(dim, 1) > 1]
+        preferred = [dim for dim in self.default_axes[self.kind] if dim in axes]
+
+        self.axisInput.blockSignals(True)
+        self.axisInput.clear()
+        for dim in axes:
+            self.axisInput.addItem("'%s' (%d)" % (dim, sizes[dim]), dim)
+        if preferred:
+            self.axisInput.setCurrentIndex(axes.index(preferred[0]))
+        self.axisInput.blockSignals(False)
+
+    def set_line(self, start, end, finished):
+        if not self.isVisible():
+            return
+
+        self.start, self.end = start, end
+        self.update_line()
+
+        # a kymograph is built when its line has been drawn, slices follow the cursor
+        if finished:
+            self.update_slice()
+        elif self.kind != 'line':
+            self.request_update()
+
+    def update_line(self):
+        image = self.app.imageView.image.boundingRect()
+        if self.end is None or image.isEmpty():
+            self.lineItem.setVisible(False)
+            return
+
+        if self.kind == 'xz':
+            y = int(self.end.y()) + 0.5
+            line = QLineF(image.left(), y, image.right(), y)
+        elif self.kind == 'yz':
+            x = int(self.end.x()) + 0.5
+            line = QLineF(x, image.top(), x, image.bottom())
+        else:
+            line = QLineF(self.start, self.end)
+
+        self.lineItem.setLine(line)
+        self.lineItem.setVisible(True)
+
+    def position(self):
+        if self.kind == 'xz':
+            return int(self.end.y())
+        if self.kind == 'yz':
+            return int(self.end.x())
+        return ((int(self.start.x()), int(self.start.y())), (int(self.end.x()), int(self.end.y())))
+
+    def request_update(self):
+        """Updates the slice, or when one is being built, once it is done.
+
+        Slices near the last one are taken from the band of the SliceBuilder
+        right away; this keeps the reads from being restarted on every move.
+        """
+        if self.future is not None and not self.future.done():
+            self.pending = True
+            return
+        self.update_slice()
+
+    def update_slice(self):
+        self.pending = False
+        if not self.isVisible() or self.app.reader is None:
+            return
+
+        self.update_axes()
+        axis = self.axis
+        if axis is None:
+            self.show_slice(None, 'The file has no axis to slice along.')
+            return
+        if self.end is None:
+            self.show_slice(None, 'Shift+drag on the image to place the cursor or draw a line.')
+            return
+
+        sizes = self.app.reader.sizes
+        positions = {dim: self.app.dimensions[dim].position for dim in self.app.dimensions}
+        request = make_request(sizes, positions)
+
+        self.future = self.app.slicer.build(request, axis, sizes[axis], self.kind, self.position(),
+                                            progress=self.slice_progress.emit)
+        if self.future.done():
+            self.slice_done(self.future)
+        else:
+            self.label.setText("Reading planes along '%s'..." % axis)
+            self.watcher.watch(self.future)
+
+    def show_progress(self, key, result, count):
+        if self.app.slicer is None or key != self.app.slicer.wanted or result.size == 0:
+            return
+
+        self.shownResult = None
+        self.view.setPixmap(result)
+        self.label.setText("Read %d of %d planes along '%s'" % (count, len(result), key[1]))
+
+    def slice_done(self, future):
+        if future is not self.future or future.cancelled() or self.app.reader is None:
+            return
+        if self.pending:
+            self.update_slice()
+            return
+
+        if future.exception() is not None:
+            self.show_slice(None, 'Unable to read the slice: %s' % future.exception())
+            return
+
+        result = future.result()
+        if result is None:
+            return
+        if result.size == 0:
+            self.show_slice(None, 'The line is outside the image.')
+            return
+
+        axis = self.axis
+        if result is not self.shownResult:
+            self.show_slice(result, '')
+        if self.kind == 'line':
+            description = '%d pixels along the line' % result.shape[1]
+        else:
+            description = '%s at %s=%d' % (self.kind, {'xz': 'y', 'yz': 'x'}[self.kind], self.position())
+        self.label.setText("%s, %d planes along '%s'" % (description, len(result), axis))
+
+        # marks the plane that is shown in the image
+        row = self.app.dimensions[axis].position + 0.5
+        self.positionItem.setLine(QLineF(0, row, result.shape[1], row))
+        self.positionItem.setVisible(True)
+
+    def show_slice(self, result, text):
+        if result is None:
+            self.positionItem.setVisible(False)
+        self.shownResult = result
+        self.view.setPixmap(result)
+        self.label.setText(text)
@@ -0,0 +1,219 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+import numpy as np
+
+from pimsviewer.frame_cache import FrameCache
+from pimsviewer.timing import timings
+
+# xz: a row at y, yz: a column at x, line: the pixels along ((x0, y0), (x1, y1))
+SLICES = ['xz', 'yz', 'line']
+
+
+def line_points(start, end):
+    """(y, x) pixel coordinates along the line from (x, y) start to end, one pixel apart."""
+    (x0, y0), (x1, y1) = start, end
+    count = int(np.ceil(np.hypot(x1 - x0, y1 - y0))) + 1
+    xs = np.rint(np.linspace(x0, x1, count)).astype(np.intp)
+    ys = np.rint(np.linspace(y0, y1, count)).astype(np.intp)
+    return ys, xs
+
+
+def slice_extractor(kind, position, shape):
+    """Returns a function that takes the slice at position out of a (y, x) plane of shape."""
+    height, width = shape[:2]
+
+    if kind == 'xz':
+        y = min(max(int(position), 0), height - 1)
+        return lambda plane: plane[y]
+    if kind == 'yz':
+        x = min(max(int(position), 0), width - 1)
+        return lambda plane: plane[:, x]
+    if kind == 'line':
+        ys, xs = line_points(*position)
+        inside = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+        ys, xs = ys[inside], xs[inside]
+        return lambda plane: plane[ys, xs]
+
+    raise ValueError("Unknown slice '%s'" % kind)
+
+
+def read_slice(reader, request, axis, size, kind, position, chunk_size=16, cancelled=None, progress=None):
+    """Stacks the slice at position of every plane of request along axis.
+
+    Planes are read chunk_size at a time, and only the slice of each is
+    kept, so the planes are never in memory at once. `progress(result, count)`
+    is called after every chunk, with the first count rows of result filled.
+    Returns None when `cancelled()` becomes true between chunks.
+    """
+    # the requests of the planes are those of the frames along axis, so that they are shared with playback
+    coords = dict((dim, pos) for dim, pos in request.default_coords if dim != axis)
+    plane_request = request._replace(iter_axes=axis, default_coords=tuple(sorted(coords.items())))
+
+    result = None
+    extract = None
+    for start in range(0, size, chunk_size):
+        if cancelled is not None and cancelled():
+            return None
+
+        stop = min(start + chunk_size, size)
+        planes = reader.read_frames([plane_request.with_index(i) for i in range(start, stop)])
+        if result is None:
+            extract = slice_extractor(kind, position, planes[0].shape)
+            row = extract(planes[0])
+            result = np.zeros((size,) + row.shape, dtype=row.dtype)
+
+        for i, plane in enumerate(planes):
+            result[start + i] = extract(plane)
+
+        if progress is not None:
+            progress(result, stop)
+
+    return result
+
+
+def read_band(reader, request, axis, size, kind, position, max_bytes, chunk_size=16, cancelled=None, progress=None):
+    """Stacks the rows (xz) or columns (yz) around position of every plane of request along axis.
+
+    As many rows or columns are kept as fit in max_bytes, at least one.
+    Returns (first, lines, band), with lines the number of rows or columns of
+    a plane and band of shape (size, rows, width) for xz or (size, height,
+    columns) for yz, or None when `cancelled()` becomes true between chunks.
+    `progress` is called as in read_slice, with the slice at position.
+    """
+    coords = dict((dim, pos) for dim, pos in request.default_coords if dim != axis)
+    plane_request = request._replace(iter_axes=axis, default_coords=tuple(sorted(coords.items())))
+
+    band = None
+    for start in range(0, size, chunk_size):
+        if cancelled is not None and cancelled():
+            return None
+
+        stop = min(start + chunk_size, size)
+        planes = reader.read_frames([plane_request.with_index(i) for i in range(start, stop)])
+        if band is None:
+            lines = planes[0].shape[0 if kind == 'xz' else 1]
+            center = min(max(int(position), 0), lines - 1)
+            count = int(min(lines, max(1, max_bytes // (size * (planes[0].nbytes // lines)))))
+            first = min(max(center - count // 2, 0), lines - count)
+            if kind == 'xz':
+                band = np.zeros((size, count) + planes[0].shape[1:], dtype=planes[0].dtype)
+            else:
+                band = np.zeros((size, planes[0].shape[0], count) + planes[0].shape[2:], dtype=planes[0].dtype)
+
+        for i, plane in enumerate(planes):
+            band[start + i] = plane[first:first + count] if kind == 'xz' else plane[:, first:first + count]
+
+        if progress is not None:
+            progress(band[:, center - first] if kind == 'xz' else band[:, :, center - first], stop)
+
+    return first, lines, band
+
+
+class SliceBuilder(object):
+    """Builds slices through the planes of a reader along an axis on a worker thread.
+
+    Slices are cached per request (without the coordinate of the sliced
+    axis), kind and position, so that returning to a position, or moving
+    along the sliced axis, shows them right away. Requesting another slice
+    stops the one that is being built.
+
+    For xz and yz slices, a band of rows or columns around the position of
+    up to `band_size_mb` is kept, from which slices at the positions nearby
+    are taken without reading the planes again, e.g. while moving the cursor.
+    """
+    chunk_size = 16
+    band_size_mb = 64
+
+    def __init__(self, reader, cache_size_mb=64):
+        super(SliceBuilder, self).__init__()
+        self.reader = reader
+
+        self.cache = FrameCache(cache_size_mb)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pimsviewer-slice')
+
+        self._futures = {}
+        self._wanted = None
+        # (request, axis, kind), and read_band's (first, lines, band)
+        self._band = None
+        self._lock = Lock()
+
+    def key(self, request, axis, kind, position):
+        coords = tuple((dim, pos) for dim, pos in request.default_coords if dim != axis)
+        return (request._replace(index=0, iter_axes='', default_coords=coords), axis, kind, position)
+
+    def build(self, request, axis, size, kind, position, progress=None):
+        """Returns a Future of the slice; `progress(key, result, count)` is called as it fills, see read_slice."""
+        key = self.key(request, axis, kind, position)
+
+        result = self.cache.get(key)
+        if result is None:
+            result = self.from_band(key)
+            if result is not None:
+                self.cache.put(key, result)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return future
+
+        with self._lock:
+            self._wanted = key
+            for other in list(self._futures):
+                if other != key and self._futures[other].cancel():
+                    del self._futures[other]
+
+            if key not in self._futures:
+                self._futures[key] = self.executor.submit(self._build, key, size, progress)
+
+            return self._futures[key]
+
+    def _build(self, key, size, progress):
+        request, axis, kind, position = key
+        if progress is not None:
+            report = lambda result, count: progress(key, result, count)
+        else:
+            report = None
+
+        cancelled = lambda: self._wanted != key
+        try:
+            with timings.measure('slice'):
+                if kind == 'line':
+                    result = read_slice(self.reader, request, axis, size, kind, position, self.chunk_size,
+                                        cancelled=cancelled, progress=report)
+                else:
+                    band = read_band(self.reader, request, axis, size, kind, position, self.band_size_mb * 1e6,
+                                     self.chunk_size, cancelled=cancelled, progress=report)
+                    if band is not None:
+                        self._band = ((request, axis, kind),) + band
+                    result = self.from_band(key) if band is not None else None
+            if result is not None:
+                self.cache.put(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    def from_band(self, key):
+        """The slice of key taken from the band, or None if the band does not hold it."""
+        request, axis, kind, position = key
+        band = self._band
+        if kind == 'line' or band is None or band[0] != (request, axis, kind):
+            return None
+
+        first, lines, array = band[1:]
+        # positions beyond the plane are clamped to its edge, as in slice_extractor
+        i = min(max(int(position), 0), lines - 1) - first
+        if not 0 <= i < array.shape[1 if kind == 'xz' else 2]:
+            return None
+        return array[:, i].copy() if kind == 'xz' else array[:, :, i].copy()
+
+    @property
+    def wanted(self):
+        return self._wanted
+
+    def shutdown(self):
+        with self._lock:
+            self._wanted = None
+            self._band = None
+            for future in self._futures.values():
+                future.cancel()
+        self.executor.shutdown(wait=True)
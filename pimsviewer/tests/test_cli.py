@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+import tifffile
+from click.testing import CliRunner
+from pims import FramesSequenceND
+
+from pimsviewer.cli import main
+from pimsviewer.wrapped_reader import make_request
+
+
+class StackReader(FramesSequenceND):
+    """Reads a (t, z, y, x) array saved with numpy, from files with the extension 'tzyx'."""
+    class_priority = 20
+
+    @classmethod
+    def class_exts(cls):
+        return {'tzyx'}
+
+    def __init__(self, filename, **kwargs):
+        super(StackReader, self).__init__()
+        self._data = np.load(filename)
+        for dim, size in zip('tzyx', self._data.shape):
+            self._init_axis(dim, size)
+        self._register_get_frame(lambda t, z, **ind: self._data[t, z], 'yx')
+
+    @property
+    def pixel_type(self):
+        return self._data.dtype
+
+
+class RenderCommandTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'stack.tif')
+        tifffile.imwrite(self.filename, np.arange(6 * 16 * 20, dtype=np.uint16).reshape(6, 16, 20))
+        self.runner = CliRunner()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def render(self, *args):
+        result = self.runner.invoke(main, ['render', self.filename] + list(args))
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result
+
+    def test_frames(self):
+        output = os.path.join(self.directory, 'out', 'frame.png')
+        self.render(output, '--frames', '1:6:2', '--workers', '1')
+        self.assertEqual(sorted(os.listdir(os.path.dirname(output))),
+                         ['frame_00001.png', 'frame_00003.png', 'frame_00005.png'])
+
+    def test_single_frame(self):
+        output = os.path.join(self.directory, 'frame.tif')
+        self.render(output, '--frames', '-1', '--limits', '0', '2000')
+        data = np.asarray(Image.open(output))
+        self.assertEqual(data.shape, (16, 20))
+        # the last frame starts at 5 * 320 = 1600
+        self.assertEqual(data[0, 0], 204)
+
+    def test_montage(self):
+        output = os.path.join(self.directory, 'montage.png')
+        self.render(output, '--montage', '--columns', '4', '--scale', '0.5', '--workers', '1')
+        self.assertEqual(np.asarray(Image.open(output)).shape, (2 * 8, 4 * 10))
+
+    def test_projection(self):
+        filename = os.path.join(self.directory, 'stack.tzyx')
+        with open(filename, 'wb') as f:
+            np.save(f, np.arange(3 * 4 * 16 * 20, dtype=np.uint16).reshape(3, 4, 16, 20))
+
+        # every frame along t is projected at its own position
+        means = []
+        for t in [0, 2]:
+            output = os.path.join(self.directory, 'frame_%d.png' % t)
+            result = self.runner.invoke(main, ['render', filename, output, '--merge', 'z', '--frames', str(t),
+                                               '--projection', 'mean', '--limits', '0', '4000'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            means.append(np.asarray(Image.open(output)).mean())
+        self.assertLess(means[0], means[1])
+
+    def test_invalid(self):
+        output = os.path.join(self.directory, 'frame.png')
+        for args in [['--merge', 'c'], ['--axis', 'q'], ['--frames', '1:2:0'], ['--frames', '10:20']]:
+            result = self.runner.invoke(main, ['render', self.filename, output] + args)
+            self.assertEqual(result.exit_code, 2, args)
+
+    def test_make_request(self):
+        sizes = {'t': 6, 'z': 4, 'c': 2, 'y': 16, 'x': 20}
+        request = make_request(sizes, {'t': 3, 'z': 1}, merged='cz', iter_axis='t', projection_axis='z')
+        self.assertEqual((request.index, request.iter_axes, request.bundle_axes), (3, 't', 'yxc'))
+        self.assertEqual(request.coords, {'t': 3, 'z': 1, 'c': 0, 'y': 0, 'x': 0})
+
+        # frames along the playing axis differ in index only, so that prefetched frames are found
+        self.assertEqual(make_request(sizes, {'t': 4, 'z': 1}, 'cz', 't', 'z'), request.with_index(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
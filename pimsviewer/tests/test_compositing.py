@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+
+from pimsviewer.compositing import Compositor
+
+
+class CompositorTest(unittest.TestCase):
+    def test_axis_order(self):
+        compositor = Compositor()
+        frame = np.random.randint(0, 1000, (3, 10, 8), dtype=np.uint16)
+
+        single = compositor.composite(frame[0], 'yx')
+        self.assertTrue(np.shares_memory(single, frame))
+        np.testing.assert_array_equal(compositor.composite(frame[0].T, 'xy'), frame[0])
+
+        rgb = compositor.composite(frame, 'cyx').copy()
+        rgb_moved = compositor.composite(np.moveaxis(frame, 0, 2), 'yxc')
+        self.assertEqual(rgb.shape, (10, 8, 3))
+        self.assertEqual(rgb.dtype, np.uint8)
+        np.testing.assert_array_equal(rgb, rgb_moved)
+
+    def test_channel_colormaps(self):
+        compositor = Compositor()
+        frame = np.zeros((4, 5, 2), dtype=np.uint8)
+        frame[..., 0] = 255
+        compositor.channel(0, 2).limits = (0, 255)
+        compositor.channel(1, 2).limits = (0, 255)
+
+        rgb = compositor.composite(frame, 'yxc')
+        np.testing.assert_array_equal(rgb[0, 0], [0, 255, 0])
+
+        compositor.channel(0).colormap = 'red'
+        rgb = compositor.composite(frame, 'yxc')
+        np.testing.assert_array_equal(rgb[0, 0], [255, 0, 0])
+
+    def test_blend_buffer(self):
+        compositor = Compositor()
+        frame = np.zeros((4, 5, 2), dtype=np.uint8)
+        frame[..., 0] = 200
+        frame[..., 1] = 100
+        compositor.channel(0, 2).colormap = compositor.channel(1, 2).colormap = 'gray'
+        compositor.channel(0).limits = compositor.channel(1).limits = (0, 255)
+
+        # blended channels saturate, in a buffer that the next blend reuses
+        rgb = compositor.composite(frame, 'yxc')
+        np.testing.assert_array_equal(rgb[0, 0], [255, 255, 255])
+        frame[..., 0] = 0
+        self.assertIs(compositor.composite(frame, 'yxc'), rgb)
+        np.testing.assert_array_equal(rgb[0, 0], [100, 100, 100])
+
+    def test_reduce_other_axes(self):
+        compositor = Compositor()
+        frame = np.full((6, 7, 5), 60000, dtype=np.uint16)
+
+        summed = compositor.composite(frame, 'zyx')
+        self.assertEqual(summed.shape, (7, 5))
+        self.assertEqual(summed.dtype, np.float32)
+        self.assertEqual(summed[0, 0], 360000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pimsviewer.directory_index import DirectoryIndex
+from pimsviewer.preopen import PreOpener
+
+
+class DirectoryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ['img10.tif', 'img2.tif', 'img1.tif', 'notes.txt']:
+            self.touch(name)
+        os.mkdir(os.path.join(self.directory, 'sub.tif'))
+
+        self.index = DirectoryIndex(self.directory, extensions={'tif'})
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def touch(self, name):
+        open(os.path.join(self.directory, name), 'w').close()
+
+    def test_natural_order(self):
+        self.assertEqual(self.index.files, ['img1.tif', 'img2.tif', 'img10.tif'])
+
+    def test_neighbour(self):
+        path = lambda name: os.path.join(self.directory, name)
+        self.assertEqual(self.index.neighbour(path('img2.tif'), 1), path('img10.tif'))
+        self.assertEqual(self.index.neighbour(path('img10.tif'), 1), path('img1.tif'))
+        self.assertEqual(self.index.neighbour(path('img1.tif'), -1), path('img10.tif'))
+
+        # files that are not in the index
+        self.assertEqual(self.index.neighbour(path('img3.txt'), 1), path('img10.tif'))
+        self.assertEqual(self.index.neighbour(path('img3.txt'), -1), path('img2.tif'))
+
+    def test_update(self):
+        self.touch('img3.tif')
+        os.remove(os.path.join(self.directory, 'img1.tif'))
+        self.index.update()
+
+        self.assertEqual(self.index.files, ['img2.tif', 'img3.tif', 'img10.tif'])
+        self.assertNotIn('img1.tif', self.index)
+
+    def test_same_natural_key(self):
+        # img01.tif sorts as img1.tif
+        self.touch('img01.tif')
+        self.index.update()
+        self.assertEqual(self.index.files, ['img01.tif', 'img1.tif', 'img2.tif', 'img10.tif'])
+        self.assertEqual((self.index.index('img01.tif'), self.index.index('img1.tif')), (0, 1))
+
+        path = lambda name: os.path.join(self.directory, name)
+        self.assertEqual(self.index.neighbour(path('img1.tif'), -1), path('img01.tif'))
+        self.assertEqual(self.index.neighbour(path('img01.tif'), 1), path('img1.tif'))
+
+        self.index.remove(['img1.tif'])
+        self.assertEqual(self.index.files, ['img01.tif', 'img2.tif', 'img10.tif'])
+
+
+class ClosingReader(object):
+    def __init__(self, filename):
+        self.filename = filename
+        self.closed = False
+
+    def read_frame(self, request):
+        return request
+
+    def close(self):
+        self.closed = True
+
+
+class PreOpenerTest(unittest.TestCase):
+    def test_take_and_keep(self):
+        preopener = PreOpener(ClosingReader, lambda reader: reader.filename + '-request')
+        preopener.keep(['a', 'b'])
+
+        opened = preopener.take('a')
+        self.assertEqual(opened.reader.filename, 'a')
+        self.assertEqual(opened.frame, 'a-request')
+        self.assertIsNone(preopener.take('a'))
+
+        b = preopener._files['b'].result().reader
+        preopener.keep(['c'])
+        self.assertTrue(b.closed)
+        self.assertNotIn('b', preopener)
+
+        preopener.shutdown()
+        self.assertFalse(opened.reader.closed)
+
+    def test_open_and_discard(self):
+        preopener = PreOpener(ClosingReader)
+        preopener.keep(['a'])
+        future = preopener._files['a']
+
+        # the file that is opened in advance is taken over
+        self.assertIs(preopener.open('a'), future)
+        self.assertNotIn('a', preopener)
+
+        other = preopener.open('b')
+        reader = other.result().reader
+        self.assertEqual(reader.filename, 'b')
+        preopener.discard(other)
+        self.assertTrue(reader.closed)
+
+        preopener.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from pimsviewer.disk_cache import DiskCache
+from pimsviewer.wrapped_reader import WrappedReader, FrameRequest
+from pimsviewer.tests.test_prefetch import CountingReader
+
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_directory = os.path.join(self.directory, 'cache')
+        self.filename = self.source('movie.raw')
+        self.request = FrameRequest.create(3, 't', 'yx', {'z': 1})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def source(self, name, data=b'frames'):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return filename
+
+    def test_across_sessions(self):
+        cache = DiskCache(self.cache_directory)
+        reader = WrappedReader(CountingReader(), disk_store=cache.store(self.filename))
+        frame = reader.read_frame(self.request)
+        cache.flush()
+        cache.shutdown()
+        self.assertEqual(len(reader.reader.reads), 1)
+
+        # a new session reads the frame from disk, without decoding it
+        cache = DiskCache(self.cache_directory)
+        self.assertEqual(cache.nbytes, os.path.getsize(cache.store(self.filename).path(self.request)))
+        reader = WrappedReader(CountingReader(), disk_store=cache.store(self.filename))
+        cached = reader.read_frame(self.request)
+        self.assertIsInstance(cached, np.memmap)
+        np.testing.assert_array_equal(cached, frame)
+        self.assertEqual(len(reader.reader.reads), 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.shutdown()
+
+    def test_modified_file(self):
+        cache = DiskCache(self.cache_directory)
+        store = cache.store(self.filename)
+        store.put(self.request, np.ones((8, 6)))
+        cache.flush()
+
+        self.source('movie.raw', b'other frames')
+        self.assertIsNone(cache.store(self.filename).get(self.request))
+        self.assertIsNone(cache.store(os.path.join(self.directory, 'missing.raw')))
+        cache.shutdown()
+
+    def test_lru_eviction(self):
+        frame = np.zeros(256 * 1024, dtype=np.uint8)
+        cache = DiskCache(self.cache_directory, max_size_mb=1)
+        stores = [cache.store(self.source('movie%d.raw' % i)) for i in range(2)]
+        requests = [self.request.with_index(i) for i in range(3)]
+
+        for i, request in enumerate(requests):
+            stores[i % 2].put(request, frame)
+            cache.flush()
+            # modification times of the frames must differ
+            os.utime(stores[i % 2].path(request), (i, i))
+
+        self.assertIsNotNone(stores[0].get(requests[0]))
+        stores[1].put(requests[1].with_index(4), frame)
+        cache.flush()
+
+        # the least recently used frame of all files was removed
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(stores[1].get(requests[1]))
+        self.assertIsNotNone(stores[0].get(requests[0]))
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        cache.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
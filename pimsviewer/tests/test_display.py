@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+
+from pimsviewer.display import DisplayMapper, colormap_table
+
+
+class DisplayMapperTest(unittest.TestCase):
+    def test_lut_matches_linear(self):
+        array = np.arange(0, 4096, 7, dtype=np.uint16).reshape(1, -1)
+        mapper = DisplayMapper(vmin=100, vmax=4000)
+
+        display = mapper.to_display(array)
+        linear = mapper.to_display(array.astype(np.float64))
+
+        self.assertEqual(display.dtype, np.uint8)
+        self.assertEqual(len(mapper.lut(np.uint16)), 65536)
+        np.testing.assert_array_equal(display, linear)
+        self.assertEqual(display[0, 0], 0)
+        self.assertEqual(display[0, -1], 255)
+
+    def test_limits_are_kept(self):
+        mapper = DisplayMapper()
+        first = np.array([[10, 20]], dtype=np.uint8)
+        mapper.to_display(first)
+        self.assertEqual(mapper.limits, (10.0, 20.0))
+
+        display = mapper.to_display(np.array([[15, 40]], dtype=np.uint8))
+        self.assertEqual(mapper.limits, (10.0, 20.0))
+        self.assertEqual(display[0, 1], 255)
+
+        mapper.reset()
+        self.assertIsNone(mapper.limits)
+
+        with self.assertRaises(ValueError):
+            mapper.limits = (20, 10)
+
+    def test_gamma_and_colormap(self):
+        array = np.array([[0, 64, 255]], dtype=np.uint8)
+        mapper = DisplayMapper(vmin=0, vmax=255, gamma=2.0, colormap='green')
+
+        display = mapper.to_display(array)
+        self.assertEqual(display.shape, (1, 3, 3))
+        np.testing.assert_array_equal(display[0, :, 0], 0)
+        self.assertEqual(display[0, 1, 1], colormap_table('green')[16, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+import tifffile
+
+from pimsviewer.wrapped_reader import FrameRequest, open_reader
+from pimsviewer.compositing import Compositor
+from pimsviewer.display import DisplayMapper
+from pimsviewer.render import render_frame
+from pimsviewer.export import Exporter, output_pattern
+
+
+def invert(array):
+    return array.max() - array
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'stack.tif')
+        data = np.arange(8 * 16 * 20, dtype=np.uint16).reshape(8, 16, 20)
+        tifffile.imwrite(self.filename, data)
+
+        self.request = FrameRequest.create(0, iter_axes='t')
+        self.output = os.path.join(self.directory, 'frames', 'frame_{:03d}.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_output_pattern(self):
+        self.assertEqual(output_pattern('dir/name.png'), 'dir/name_{:05d}.png')
+        self.assertEqual(output_pattern('a{b}.tif', digits=2), 'a{{b}}_{:02d}.tif')
+
+    def test_export(self):
+        stages = [(invert, {})]
+        exporter = Exporter(self.filename, self.request, 't', range(1, 8, 3), self.output,
+                            stages=stages, max_workers=1)
+        self.assertEqual(len(exporter), 3)
+
+        written = exporter.run()
+        self.assertEqual(sorted(written), [self.output.format(i) for i in [1, 4, 7]])
+
+        reader = open_reader(self.filename)
+        try:
+            for i in [1, 4, 7]:
+                expected = render_frame(reader, self.request.with_index(i), Compositor(), stages=stages)
+                np.testing.assert_array_equal(np.asarray(Image.open(self.output.format(i))), expected)
+        finally:
+            reader.close()
+
+    def test_export_projection(self):
+        filename = os.path.join(self.directory, 'channels.tif')
+        tifffile.imwrite(filename, np.arange(4 * 3 * 16 * 20, dtype=np.uint16).reshape(4, 3, 16, 20),
+                         photometric='rgb', planarconfig='separate')
+
+        # the projection along c of every frame along t, not the one of the first
+        request = FrameRequest.create(2, 't', 'yx', {'c': 1})
+        exporter = Exporter(filename, request, 't', range(4), self.output, compositor=Compositor(DisplayMapper(0, 4000)),
+                            projection_axis='c', projections={'c': 'mean'}, max_workers=1)
+        exporter.run()
+
+        means = [np.asarray(Image.open(self.output.format(i))).mean() for i in range(4)]
+        self.assertTrue(all(a < b for a, b in zip(means, means[1:])), means)
+
+    def test_cancel(self):
+        exporter = Exporter(self.filename, self.request, 't', range(8), self.output)
+        exporter.cancel()
+        self.assertEqual(exporter.run(), [self.output.format(0)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Exporter(self.filename, self.request, 'y', range(8), self.output)
+        with self.assertRaises(ValueError):
+            Exporter(self.filename, self.request, 't', range(8), os.path.join(self.directory, 'frame.png'))
+        with self.assertRaises(ValueError):
+            Exporter(self.filename, self.request, 't', range(4, 12), self.output).run()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+
+from pimsviewer.frame_cache import FrameCache
+from pimsviewer.wrapped_reader import WrappedReader, FrameRequest
+from pimsviewer.tests.test_prefetch import CountingReader
+
+
+class FrameCacheTest(unittest.TestCase):
+    def test_lru_eviction(self):
+        frame_size = 1024 * 1024
+        cache = FrameCache(max_size_mb=3)
+        for i in range(3):
+            cache.put(i, np.zeros(frame_size, dtype=np.uint8))
+
+        self.assertIsNotNone(cache.get(0))
+        cache.put(3, np.zeros(frame_size, dtype=np.uint8))
+
+        self.assertIn(0, cache)
+        self.assertNotIn(1, cache)
+        self.assertEqual(cache.nbytes, 3 * frame_size)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 0, 1))
+
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.misses, 1)
+
+    def test_wrapped_reader_cache(self):
+        reader = WrappedReader(CountingReader(), cache_size_mb=1)
+        request = FrameRequest.create(3, 't', 'yx', {'z': 1})
+
+        first = reader.read_frame(request)
+        second = reader.read_frame(request)
+        self.assertIs(first, second)
+        self.assertFalse(second.flags.writeable)
+        self.assertEqual(len(reader.reader.reads), 1)
+
+        reader.read_frame(request._replace(default_coords=(('z', 2),)))
+        self.assertEqual(len(reader.reader.reads), 2)
+        self.assertEqual(reader.cache.stats()['hits'], 1)
+
+    def test_shared_cache(self):
+        cache = FrameCache(max_size_mb=1)
+        readers = [WrappedReader(CountingReader(t=20 * (i + 1))) for i in range(2)]
+        for i, reader in enumerate(readers):
+            reader.cache = cache
+            reader.cache_token = ('file%d' % i, 0)
+
+        request = FrameRequest.create(3, 't', 'yx', {'z': 1})
+        frames = [reader.read_frame(request) for reader in readers]
+        self.assertIsNot(frames[0], frames[1])
+        self.assertIs(readers[1].read_frame(request), frames[1])
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,19 @@
+import os
+import shutil
 import sys
+import tempfile
 import unittest
+import numpy as np
+import tifffile
 from PyQt5.QtTest import QTest
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 
 from pimsviewer.gui import GUI
+from pimsviewer.display_settings import DisplaySettings
+from pimsviewer.wrapped_reader import WrappedReader
+from pimsviewer.prefetch import Prefetcher
+from pimsviewer.tests.test_prefetch import CountingReader
 
 class GuiTest(unittest.TestCase):
     app = None
@@ -21,5 +30,93 @@ class GuiTest(unittest.TestCase):
     def test_init(self):
         self.assertEqual(self.app.windowTitle(), self.app.name)
 
+    def test_prefetch_playback_requests(self):
+        reader = WrappedReader(CountingReader())
+        prefetcher = Prefetcher(reader)
+        try:
+            for t in range(8):
+                # requests as built by the viewer while playing along t
+                request = self.app.get_request(reader.sizes, {'t': t, 'z': 1}, 't')
+                if t > 0:
+                    self.assertIn(request, prefetcher._buffer)
+                prefetcher.get_frame(request)
+                prefetcher.prefetch(request, 20, fps=10.0)
+                for future in list(prefetcher._buffer.values()):
+                    future.result()
+        finally:
+            prefetcher.shutdown()
+
+        # every frame is decoded once, ahead of being shown
+        self.assertEqual(len(reader.reader.reads), len(set(reader.reader.reads)))
+
+    def test_close(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'stack.tif')
+            tifffile.imwrite(filename, np.zeros((6, 16, 20), dtype=np.uint16))
+            self.app.open(fileName=filename, wait=True)
+            self.app.compare(fileName=filename, wait=True)
+            pane = self.app.comparePanes[0]
+
+            # closing the window stops the background work and closes the files
+            self.app.close()
+            self.assertIsNone(self.app.reader)
+            self.assertEqual(self.app.comparePanes, [])
+            self.assertIsNone(pane.reader)
+            with self.assertRaises(RuntimeError):
+                self.app.decodeExecutor.submit(lambda: None)
+            with self.assertRaises(RuntimeError):
+                self.app.preOpener.executor.submit(lambda: None)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_display_limits(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'stack.tif')
+            tifffile.imwrite(filename, np.arange(6 * 16 * 20, dtype=np.uint16).reshape(6, 16, 20))
+            self.app.open(fileName=filename, wait=True)
+            display = self.app.compositor.display
+
+            # the inputs start at the limits that are set from the shown frame
+            display.reset()
+            settings = DisplaySettings(parent=self.app)
+            settings.update_inputs()
+            self.assertEqual((settings.minInput.value(), settings.maxInput.value()), (0, 319))
+
+            # and limits are only applied in order
+            settings.maxInput.setValue(100)
+            self.assertEqual(display.limits, (0, 100))
+            settings.minInput.setValue(200)
+            self.assertEqual(display.limits, (0, 100))
+        finally:
+            self.app.close()
+            shutil.rmtree(directory)
+
+    def test_channel_limits(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'channels.tif')
+            tifffile.imwrite(filename, np.arange(2 * 3 * 16 * 20, dtype=np.uint16).reshape(2, 3, 16, 20),
+                             photometric='rgb', planarconfig='separate')
+            self.app.open(fileName=filename, wait=True)
+            settings = DisplaySettings(parent=self.app)
+
+            # channels have settings of their own only when they are merged
+            self.app.dimensions['c'].merge = False
+            settings.update_channels()
+            self.assertEqual(settings.channelInput.count(), 1)
+            self.app.dimensions['c'].merge = True
+            settings.update_channels()
+            self.assertEqual(settings.channelInput.count(), 4)
+
+            # the inputs of a channel start at the limits of that channel
+            self.app.compositor.reset()
+            settings.channelInput.setCurrentIndex(2)
+            self.assertEqual((settings.minInput.value(), settings.maxInput.value()), (320, 639))
+        finally:
+            self.app.close()
+            shutil.rmtree(directory)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,48 @@
+import sys
+import unittest
+from PyQt5.QtWidgets import QApplication
+
+from pimsviewer.metadata_dialog import MetadataModel
+
+
+class Unprintable(object):
+    def __str__(self):
+        raise ValueError('cannot format')
+
+
+class MetadataModelTest(unittest.TestCase):
+    def setUp(self):
+        self.qapp = QApplication.instance() or QApplication(sys.argv)
+        self.consumed = 0
+
+    def entries(self, n):
+        for i in range(n):
+            self.consumed += 1
+            yield 'key%d' % i, 'line %d\nmore' % i
+
+    def test_pages(self):
+        model = MetadataModel(self.entries(120))
+        model.page_size = 50
+        self.assertEqual(model.rowCount(), 0)
+
+        model.fetchMore()
+        self.assertEqual((model.rowCount(), self.consumed), (50, 50))
+        self.assertTrue(model.canFetchMore())
+
+        model.fetchMore()
+        model.fetchMore()
+        self.assertEqual(model.rowCount(), 120)
+        self.assertFalse(model.canFetchMore())
+
+    def test_values(self):
+        model = MetadataModel([('a', 'first\nsecond'), ('b', Unprintable())])
+        model.fetchMore()
+
+        self.assertEqual(model.data(model.index(0, 0)), 'a')
+        self.assertEqual(model.data(model.index(0, 1)), 'first ...')
+        self.assertEqual(model.text(0), 'first\nsecond')
+        self.assertEqual(model.text(1), '<ValueError: cannot format>')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import threading
+import unittest
+import numpy as np
+
+from pimsviewer.pipeline import Pipeline, Stage
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = Pipeline(max_workers=1)
+        self.calls = []
+
+    def tearDown(self):
+        self.pipeline.shutdown()
+
+    def counting(self, name, func):
+        def stage(array, **params):
+            self.calls.append(name)
+            return func(array, **params)
+        return Stage(stage, name=name)
+
+    def test_stages_in_order(self):
+        self.pipeline.add_stage(self.counting('add', lambda a, value=1: a + value))
+        self.pipeline.add_stage(self.counting('scale', lambda a, factor=2: a * factor))
+
+        result = self.pipeline.process('frame', np.ones(3)).result()
+        np.testing.assert_array_equal(result, [4, 4, 4])
+
+        self.pipeline.stages[1].enabled = False
+        np.testing.assert_array_equal(self.pipeline.process('frame', np.ones(3)).result(), [2, 2, 2])
+
+    def test_memoized_per_params(self):
+        add = self.pipeline.add_stage(self.counting('add', lambda a, value: a + value))
+        add.set_params(value=1)
+        scale = self.pipeline.add_stage(self.counting('scale', lambda a, factor: a * factor))
+        scale.set_params(factor=2)
+
+        self.pipeline.process('frame', np.ones(3)).result()
+        future = self.pipeline.process('frame', np.ones(3))
+        self.assertTrue(future.done())
+        self.assertEqual(self.calls, ['add', 'scale'])
+
+        # only the changed stage and the ones after it run again
+        scale.set_params(factor=3)
+        np.testing.assert_array_equal(self.pipeline.process('frame', np.ones(3)).result(), [6, 6, 6])
+        self.assertEqual(self.calls, ['add', 'scale', 'scale'])
+
+        self.pipeline.clear()
+        self.pipeline.process('frame', np.ones(3)).result()
+        self.assertEqual(self.calls, ['add', 'scale', 'scale', 'add', 'scale'])
+
+    def test_running_frames_finish(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(array):
+            started.set()
+            release.wait(5)
+            return array + 1
+
+        self.pipeline.add_stage(Stage(slow))
+        self.pipeline.add_stage(self.counting('after', lambda a: a))
+
+        first = self.pipeline.process(1, np.zeros(2), group='view')
+        started.wait(5)
+        second = self.pipeline.process(2, np.zeros(2), group='view')
+        third = self.pipeline.process(3, np.zeros(2), group='view')
+        self.assertEqual(third.key, self.pipeline.wanted)
+
+        # the running frame finishes and stands in for the wanted one, the waiting one is skipped
+        self.assertTrue(second.cancelled())
+        release.set()
+        np.testing.assert_array_equal(first.result(), [1, 1])
+        third.result()
+        self.assertEqual(self.calls, ['after', 'after'])
+        self.assertIs(self.pipeline.latest('view'), third.result())
+        self.assertIsNone(self.pipeline.latest('other view'))
+
+        # not when the stages have changed since
+        self.pipeline.stages[1].set_params(factor=2)
+        self.assertIsNone(self.pipeline.latest('view'))
+
+    def test_out_of_order(self):
+        pipeline = Pipeline(max_workers=2)
+        release = {1: threading.Event(), 2: threading.Event()}
+        pipeline.add_stage(Stage(lambda array: release[int(array[0])].wait(5) and array + 10, name='wait'))
+        try:
+            first = pipeline.process(1, np.ones(2), group='view')
+            second = pipeline.process(2, np.full(2, 2), group='view')
+
+            # the frame that was requested last stays the latest, also when an earlier one finishes after it
+            release[2].set()
+            second.result()
+            release[1].set()
+            first.result()
+            np.testing.assert_array_equal(pipeline.latest('view'), [12, 12])
+
+            # and none is, after a seek
+            pipeline.reset_latest()
+            self.assertIsNone(pipeline.latest('view'))
+        finally:
+            pipeline.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from pimsviewer.playback import PlaybackClock
+
+
+class PlaybackClockTest(unittest.TestCase):
+    def test_follows_wall_clock(self):
+        clock = PlaybackClock(fps=10.0)
+        clock.start(now=0.0)
+
+        self.assertEqual(clock.advance(now=0.05), 0)
+        self.assertEqual(clock.advance(now=0.1), 1)
+        self.assertEqual(clock.advance(now=0.21), 1)
+        self.assertEqual(clock.dropped, 0)
+
+        # showing a frame took too long: skip ahead
+        self.assertEqual(clock.advance(now=0.55), 3)
+        self.assertEqual(clock.dropped, 2)
+
+    def test_max_fps(self):
+        clock = PlaybackClock(fps=240.0, max_fps=60.0)
+        self.assertEqual(clock.shown_fps, 60.0)
+        clock.start(now=0.0)
+
+        # frames between the ones that are shown are skipped, not dropped
+        steps = [clock.advance(now=(i + 0.5) / 60.0) for i in range(1, 61)]
+        self.assertEqual(sum(steps), 242)
+        self.assertEqual(clock.dropped, 0)
+
+        # but the frames of a tick that was missed are
+        self.assertEqual(clock.advance(now=62.5 / 60.0), 8)
+        self.assertEqual(clock.dropped, 4)
+
+    def test_achieved_fps(self):
+        clock = PlaybackClock(fps=30.0)
+        clock.start(now=0.0)
+        for i in range(11):
+            clock.frame_shown(now=i * 0.04)
+        self.assertAlmostEqual(clock.achieved_fps, 25.0)
+
+        clock.frame_shown(now=10.0)
+        self.assertEqual(clock.achieved_fps, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
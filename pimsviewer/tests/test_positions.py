@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from pimsviewer.positions import (PositionIndex, ChunkedPositions, SpatialGrid, FrameMarkers, TrajectoryIndex, Trails,
+                                  read_positions, load_positions, UNLINKED)
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class PositionIndexTest(unittest.TestCase):
+    def test_frame_index(self):
+        df = pd.DataFrame({'frame': [2, 0, 2, 1, 0, 2],
+                           'x': [20., 0., 21., 10., 1., 22.],
+                           'y': [5., 5., 5., 5., 5., 5.]})
+        positions = PositionIndex.from_dataframe(df)
+
+        x, y, r = positions.positions(2)
+        np.testing.assert_array_equal(x, [20., 21., 22.])
+        self.assertTrue(np.all(np.isnan(r)))
+        self.assertEqual(positions.count(0), 2)
+        self.assertEqual(positions.count(5), 0)
+        self.assertEqual(len(positions), 6)
+
+    def test_spatial_grid(self):
+        rng = np.random.default_rng(1)
+        x, y = rng.random(5000) * 500, rng.random(5000) * 300
+        x[7] = np.nan
+        grid = SpatialGrid(x, y)
+        self.assertEqual(len(grid), 4999)
+
+        for left, top, right, bottom in [(100, 50, 180, 90), (-10, -10, 20, 400), (490, 290, 600, 400), (600, 0, 700, 10)]:
+            found = grid.query(left, top, right, bottom)
+            expected = np.flatnonzero((x >= left) & (x <= right) & (y >= top) & (y <= bottom))
+            np.testing.assert_array_equal(np.sort(found), expected)
+
+    def test_frame_markers(self):
+        markers = FrameMarkers([1., 2., 9., 30.], [1., 1., 9., 30.], [1., 1., 1., 4.])
+        np.testing.assert_array_equal(np.sort(markers.visible(0, 0, 25, 25)), [0, 1, 2])
+        # the circle around (30, 30) reaches into the rectangle
+        np.testing.assert_array_equal(np.sort(markers.visible(0, 0, 27, 27)), [0, 1, 2, 3])
+
+        counts, left, top = markers.density(8.0, 0, 0, 40, 40)
+        self.assertEqual((left, top), (0.0, 0.0))
+        self.assertEqual(counts.shape, (4, 4))
+        self.assertEqual((counts[0, 0], counts[1, 1], counts[3, 3], counts.sum()), (2, 1, 1, 4))
+
+        # only the markers in the rectangle are counted, in bins aligned to the bin size
+        counts, left, top = markers.density(4.0, 5, 6, 20, 20)
+        self.assertEqual((left, top), (4.0, 4.0))
+        self.assertEqual(counts.shape, (2, 2))
+        self.assertEqual(counts.sum(), 1)
+
+    def test_trajectory_index(self):
+        df = pd.DataFrame({'frame': [1, 0, 0, 2, 1, 3, 3],
+                           'particle': [7, 7, 3, 7, 3, 3, 7],
+                           'x': [1., 0., 10., 2., 11., 13., 3.],
+                           'y': [0., 0., 0., 0., 0., 0., 0.]})
+        trajectories = TrajectoryIndex.from_dataframe(df)
+        np.testing.assert_array_equal(trajectories.particles, [3, 7])
+        np.testing.assert_array_equal(trajectories.x, [10., 11., 13., 0., 1., 2., 3.])
+
+        lo, hi = trajectories.window(1, 2)
+        np.testing.assert_array_equal(lo, [1, 4])
+        np.testing.assert_array_equal(hi, [2, 6])
+        np.testing.assert_array_equal(trajectories.x[trajectories.rows_at(3)], [13., 3.])
+        self.assertEqual(trajectories.rows_at(3).dtype, np.intp)
+        self.assertEqual(len(trajectories.rows_at(4)), 0)
+
+    def test_trails(self):
+        rng = np.random.default_rng(2)
+        frames = np.concatenate([np.arange(40)] * 5)
+        particles = np.repeat(np.arange(5), 40)
+        keep = rng.random(200) > 0.3
+        trajectories = TrajectoryIndex(frames[keep], rng.random(keep.sum()), rng.random(keep.sum()), particles[keep])
+
+        trails = Trails(trajectories, 4)
+        self.assertIsNone(trails.move_to(10))
+        for frame_no in [11, 12, 13, 12, 11, 12, 12]:
+            changes = trails.move_to(frame_no)
+            self.assertIsNotNone(changes)
+
+            lo, hi = trajectories.window(frame_no - 3, frame_no)
+            np.testing.assert_array_equal(trails.lo, lo)
+            np.testing.assert_array_equal(trails.hi, hi)
+
+        # only the positions that enter and leave the trails change
+        added, dropped, forward = trails.move_to(13)
+        self.assertTrue(forward)
+        np.testing.assert_array_equal(added, trajectories.rows_at(13))
+        np.testing.assert_array_equal(dropped, trajectories.ranks[trajectories.rows_at(9)])
+        self.assertIsNone(trails.move_to(30))
+
+
+
+class PositionFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.df = pd.DataFrame({'y': np.arange(10) * 0.5, 'x': np.arange(10.), 'mass': 1.0, 'signal': 'a',
+                                'frame': np.arange(10) // 3, 'particle': np.arange(10) % 3})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_chunks(self, filename):
+        chunks = list(read_positions(filename, chunk_rows=4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        self.assertEqual(list(chunks[0].columns), ['frame', 'x', 'y', 'particle'])
+        self.assertEqual(chunks[0]['x'].dtype, np.float32)
+        self.assertEqual(chunks[0]['frame'].dtype, np.int32)
+
+        positions = load_positions(filename)
+        np.testing.assert_array_equal(positions['y'], self.df['y'])
+        np.testing.assert_array_equal(positions['particle'], self.df['particle'])
+
+    def test_csv(self):
+        filename = os.path.join(self.directory, 'positions.csv')
+        self.df.to_csv(filename, index=False)
+        self.check_chunks(filename)
+
+        self.df.drop(columns='frame').to_csv(filename, index=False)
+        with self.assertRaises(ValueError):
+            load_positions(filename)
+
+    def test_missing_values(self):
+        # as trackpy writes positions that are not linked into a trajectory
+        self.df['particle'] = self.df['particle'].astype(float)
+        self.df.loc[[1, 4], 'particle'] = np.nan
+        self.df['frame'] = self.df['frame'].astype(float)
+        self.df.loc[9, 'frame'] = np.nan
+        filename = os.path.join(self.directory, 'positions.csv')
+        self.df.to_csv(filename, index=False)
+
+        with self.assertWarns(UserWarning):
+            positions = load_positions(filename)
+        self.assertEqual(len(positions), 9)
+        self.assertEqual(positions['frame'].dtype, np.int32)
+        np.testing.assert_array_equal(positions['particle'][:5], [0, UNLINKED, 2, 0, UNLINKED])
+
+        # unlinked positions are markers, but not in trajectories
+        self.assertEqual(len(PositionIndex.from_dataframe(positions)), 9)
+        trajectories = TrajectoryIndex.from_dataframe(positions)
+        self.assertEqual(len(trajectories), 7)
+        np.testing.assert_array_equal(trajectories.particles, [0, 1, 2])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_formats(self):
+        filename = os.path.join(self.directory, 'positions.parquet')
+        self.df.to_parquet(filename, row_group_size=4)
+        self.check_chunks(filename)
+
+        filename = os.path.join(self.directory, 'positions.feather')
+        self.df.to_feather(filename, chunksize=4)
+        self.check_chunks(filename)
+
+    def test_chunked_positions(self):
+        positions = ChunkedPositions()
+        positions.add(PositionIndex([0, 1, 1], [0., 10., 11.], [0., 0., 0.]))
+        positions.add(PositionIndex([1, 2], [12., 20.], [0., 0.]))
+
+        x, y, r = positions.positions(1)
+        np.testing.assert_array_equal(x, [10., 11., 12.])
+        self.assertEqual(positions.count(2), 1)
+        self.assertEqual(len(positions.positions(5)[0]), 0)
+        self.assertEqual(len(positions), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
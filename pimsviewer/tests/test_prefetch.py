@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+from pims import FramesSequenceND
+
+from pimsviewer.wrapped_reader import WrappedReader, FrameRequest
+from pimsviewer.prefetch import Prefetcher
+
+
+class CountingReader(FramesSequenceND):
+    @property
+    def pixel_type(self):
+        return np.uint16
+
+    def __init__(self, t=20, z=3):
+        super(CountingReader, self).__init__()
+        self._init_axis('y', 8)
+        self._init_axis('x', 6)
+        self._init_axis('t', t)
+        self._init_axis('z', z)
+        self._register_get_frame(self.get_frame_2D, 'yx')
+        self.reads = []
+
+    def get_frame_2D(self, **ind):
+        self.reads.append((ind['t'], ind['z']))
+        return np.full((8, 6), ind['t'] * 10 + ind['z'], dtype=self.pixel_type)
+
+
+class PrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.reader = WrappedReader(CountingReader())
+        self.prefetcher = Prefetcher(self.reader)
+
+    def tearDown(self):
+        self.prefetcher.shutdown()
+
+    def test_read_frame(self):
+        request = FrameRequest.create(4, 't', 'yx', {'t': 0, 'z': 2})
+        frame = self.prefetcher.get_frame(request)
+        self.assertEqual(frame.shape, (8, 6))
+        self.assertEqual(frame[0, 0], 42)
+
+    def test_prefetch_serves_from_buffer(self):
+        request = FrameRequest.create(0, 't', 'yx', {'z': 1})
+        self.prefetcher.prefetch(request, 20, fps=10.0)
+        self.assertEqual(len(self.prefetcher._buffer), 10)
+
+        for future in list(self.prefetcher._buffer.values()):
+            future.result()
+        n_reads = len(self.reader.reader.reads)
+
+        frame = self.prefetcher.get_frame(request.with_index(3))
+        self.assertEqual(frame[0, 0], 31)
+        self.assertEqual(len(self.reader.reader.reads), n_reads)
+
+    def test_direction_and_seek(self):
+        request = FrameRequest.create(10, 't', 'yx', {'z': 0})
+        self.prefetcher.prefetch(request, 20)
+        self.prefetcher.prefetch(request.with_index(9), 20)
+        self.assertEqual(self.prefetcher.step, -1)
+        self.assertIn(request.with_index(8), self.prefetcher._buffer)
+
+        # stale frames are dropped after a seek
+        self.prefetcher.prefetch(request.with_index(0), 20, fps=2.0)
+        self.assertEqual(set(self.prefetcher._buffer), {request.with_index(19), request.with_index(18)})
+
+    def test_shared_executor(self):
+        request = FrameRequest.create(0, 't', 'yx', {'z': 0})
+        other = Prefetcher(WrappedReader(CountingReader()), executor=self.prefetcher.executor)
+        other.prefetch(request, 20, fps=5.0)
+        other.shutdown()
+
+        # the executor is not shut down with a prefetcher that shares it
+        self.prefetcher.prefetch(request, 20)
+        self.assertEqual(self.prefetcher.get_frame(request.with_index(1))[0, 0], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+
+from pimsviewer.wrapped_reader import WrappedReader, FrameRequest
+from pimsviewer.projection import Projector, ChunkedProjection, project, PROJECTIONS
+from pimsviewer.tests.test_prefetch import CountingReader
+
+
+class ProjectionTest(unittest.TestCase):
+    def test_chunks_match_full_projection(self):
+        stack = np.random.randint(0, 60000, (37, 5, 4), dtype=np.uint16)
+
+        for mode in PROJECTIONS:
+            projection = ChunkedProjection(mode)
+            for start in range(0, len(stack), 8):
+                projection.add(stack[start:start + 8])
+
+            np.testing.assert_allclose(projection.finish(), project(stack, 0, mode), rtol=1e-6)
+
+        self.assertEqual(project(stack, 0, 'max').dtype, np.uint16)
+        self.assertEqual(project(stack, 0, 'mean').dtype, np.float32)
+
+
+class ProjectorTest(unittest.TestCase):
+    def setUp(self):
+        self.reader = WrappedReader(CountingReader(t=4, z=20))
+        self.projector = Projector(self.reader)
+        self.projector.chunk_size = 6
+
+    def tearDown(self):
+        self.projector.shutdown()
+
+    def test_project(self):
+        request = FrameRequest.create(0, '', 'yx', {'t': 2, 'z': 5})
+        result = self.projector.project(request, 'z', 20, 'max').result()
+        self.assertEqual(result.shape, (8, 6))
+        self.assertEqual(result[0, 0], 2 * 10 + 19)
+
+        mean = self.projector.project(request, 'z', 20, 'mean').result()
+        self.assertAlmostEqual(mean[0, 0], 2 * 10 + 9.5)
+
+    def test_cached_per_mode_and_coords(self):
+        request = FrameRequest.create(0, '', 'yx', {'t': 1, 'z': 0})
+        self.projector.project(request, 'z', 20, 'sum').result()
+        n_reads = len(self.reader.reader.reads)
+        self.assertEqual(n_reads, 20)
+
+        # the position along the projected axis does not matter
+        other_z = FrameRequest.create(0, '', 'yx', {'t': 1, 'z': 7})
+        future = self.projector.project(other_z, 'z', 20, 'sum')
+        self.assertTrue(future.done())
+        self.assertEqual(len(self.reader.reader.reads), n_reads)
+
+        self.projector.project(FrameRequest.create(0, '', 'yx', {'t': 2, 'z': 0}), 'z', 20, 'sum').result()
+        self.assertEqual(len(self.reader.reader.reads), 2 * n_reads)
+
+    def test_playing_axis(self):
+        # requests along the playing axis differ in index only
+        request = FrameRequest.create(1, 't', 'yx', {'z': 0})
+        first = self.projector.project(request, 'z', 20, 'max').result()
+        third = self.projector.project(request.with_index(3), 'z', 20, 'max').result()
+        self.assertEqual((first[0, 0], third[0, 0]), (10 + 19, 30 + 19))
+
+    def test_running_projection_finishes(self):
+        request = FrameRequest.create(0, 't', 'yx', {'z': 0})
+        group = 'view'
+        first = self.projector.project(request, 'z', 20, 'sum', group)
+        second = self.projector.project(request.with_index(1), 'z', 20, 'sum', group)
+        third = self.projector.project(request.with_index(2), 'z', 20, 'sum', group)
+
+        # the first one started before the others were requested, the second one is skipped
+        self.assertIsNotNone(first.result())
+        self.assertTrue(second.cancelled() or second.result() is not None)
+        key, result = self.projector.latest(group)
+        self.assertIs(result, third.result())
+        self.assertEqual(key, self.projector.key(request.with_index(2), 'z', 'sum'))
+        self.assertIsNone(self.projector.latest('other view'))
+
+    def test_reset_latest(self):
+        request = FrameRequest.create(0, 't', 'yx', {'z': 0})
+        self.projector.project(request, 'z', 20, 'sum', 'view').result()
+        self.assertIsNotNone(self.projector.latest('view'))
+
+        # e.g. after a seek, also the projections that are computed meanwhile do not stand in
+        future = self.projector.project(request.with_index(1), 'z', 20, 'sum', 'view')
+        self.projector.reset_latest()
+        future.result()
+        self.assertIsNone(self.projector.latest('view'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import time
+import unittest
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from pimsviewer.reader_pool import ReaderPool
+from pimsviewer.wrapped_reader import WrappedReader, FrameRequest
+from pimsviewer.tests.test_prefetch import CountingReader
+
+
+class SlowReader(CountingReader):
+    active = 0
+    most_active = 0
+    lock = Lock()
+
+    def get_frame_2D(self, **ind):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.most_active = max(cls.most_active, cls.active)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.active -= 1
+        return super(SlowReader, self).get_frame_2D(**ind)
+
+    def close(self):
+        self.closed = True
+
+
+class ReaderPoolTest(unittest.TestCase):
+    def setUp(self):
+        SlowReader.most_active = 0
+        self.opened = []
+        self.pool = ReaderPool(WrappedReader(SlowReader(), cache_size_mb=1), self.open_reader, max_readers=3)
+        self.requests = [FrameRequest.create(t, 't', 'yx', {'z': 1}) for t in range(12)]
+
+    def tearDown(self):
+        self.pool.close()
+
+    def open_reader(self):
+        reader = WrappedReader(SlowReader())
+        self.opened.append(reader)
+        return reader
+
+    def test_parallel_reads(self):
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            frames = list(executor.map(self.pool.read_frame, self.requests))
+
+        self.assertEqual([frame[0, 0] for frame in frames], [t * 10 + 1 for t in range(12)])
+        self.assertEqual(SlowReader.most_active, 3)
+        self.assertEqual(self.pool.size, 3)
+        self.assertEqual(len(self.opened), 2)
+
+        # all readers share the cache of the first reader
+        self.assertIs(self.opened[0].cache, self.pool.reader.cache)
+        self.pool.read_frames(self.requests)
+        reads = len(self.pool.reader.reader.reads) + sum(len(reader.reader.reads) for reader in self.opened)
+        self.assertEqual(reads, 12)
+
+    def test_cannot_open(self):
+        def open_reader():
+            raise IOError('locked')
+        self.pool.open_reader = open_reader
+
+        frames = self.pool.read_frames(self.requests[:4])
+        self.assertEqual(len(frames), 4)
+        self.assertEqual((self.pool.size, self.pool.max_readers), (1, 1))
+
+    def test_close(self):
+        self.pool.read_frames(self.requests[:4])
+        self.pool.close()
+        self.assertTrue(all(getattr(reader.reader, 'closed', False) for reader in self.opened))
+        # the first reader is closed by its owner
+        self.assertFalse(getattr(self.pool.reader.reader, 'closed', False))
+        with self.assertRaises(ValueError):
+            self.pool.read_frame(self.requests[5])
+
+
+if __name__ == "__main__":
+    unittest.main()
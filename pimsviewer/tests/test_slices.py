@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+
+from pimsviewer.slices import SliceBuilder, read_slice, line_points
+from pimsviewer.wrapped_reader import WrappedReader, FrameRequest
+from pimsviewer.tests.test_prefetch import CountingReader
+
+
+class GradientReader(CountingReader):
+    def get_frame_2D(self, **ind):
+        frame = super(GradientReader, self).get_frame_2D(**ind)
+        return frame + np.arange(6, dtype=frame.dtype) + 100 * np.arange(8, dtype=frame.dtype)[:, np.newaxis]
+
+
+class SliceTest(unittest.TestCase):
+    def setUp(self):
+        self.reader = WrappedReader(GradientReader(t=5, z=4))
+        self.request = FrameRequest.create(0, '', 'yx', {'t': 2, 'z': 1})
+
+    def test_read_slice(self):
+        filled = []
+        xz = read_slice(self.reader, self.request, 'z', 4, 'xz', 3, chunk_size=3,
+                        progress=lambda result, count: filled.append(count))
+        self.assertEqual(xz.shape, (4, 6))
+        np.testing.assert_array_equal(xz[:, 0], [320, 321, 322, 323])
+        np.testing.assert_array_equal(xz[1], 321 + np.arange(6))
+        self.assertEqual(filled, [3, 4])
+
+        yz = read_slice(self.reader, self.request, 'z', 4, 'yz', 100)
+        np.testing.assert_array_equal(yz[0], 20 + 5 + 100 * np.arange(8))
+
+        # pixels along the line that are outside the frame are left out
+        kymograph = read_slice(self.reader, self.request, 't', 5, 'line', ((0, 1), (9, 1)))
+        self.assertEqual(kymograph.shape, (5, 6))
+        np.testing.assert_array_equal(kymograph[4], 141 + np.arange(6))
+
+    def test_line_points(self):
+        ys, xs = line_points((0, 0), (3, 4))
+        self.assertEqual(len(ys), 6)
+        self.assertEqual((ys[-1], xs[-1]), (4, 3))
+
+    def test_builder_cache(self):
+        builder = SliceBuilder(self.reader)
+        try:
+            first = builder.build(self.request, 'z', 4, 'xz', 3).result()
+            reads = len(self.reader.reader.reads)
+            self.assertEqual(reads, 4)
+
+            # the position along the sliced axis does not change the slice
+            other = builder.build(self.request._replace(default_coords=(('t', 2), ('z', 3))), 'z', 4, 'xz', 3)
+            self.assertTrue(other.done())
+            self.assertIs(other.result(), first)
+            self.assertEqual(len(self.reader.reader.reads), reads)
+        finally:
+            builder.shutdown()
+
+    def test_builder_band(self):
+        builder = SliceBuilder(self.reader)
+        try:
+            builder.build(self.request, 'z', 4, 'xz', 3).result()
+            reads = len(self.reader.reader.reads)
+
+            # moving the cursor takes the slices from the rows that were read
+            for y in [4, 7, 0, 100]:
+                future = builder.build(self.request, 'z', 4, 'xz', y)
+                self.assertTrue(future.done())
+                np.testing.assert_array_equal(future.result()[:, 0], 20 + np.arange(4) + 100 * min(y, 7))
+            self.assertEqual(len(self.reader.reader.reads), reads)
+
+            # but not those of another kind or another frame
+            yz = builder.build(self.request, 'z', 4, 'yz', 2)
+            self.assertFalse(yz.done())
+            np.testing.assert_array_equal(yz.result()[0], 22 + 100 * np.arange(8))
+            self.assertEqual(len(self.reader.reader.reads), reads + 4)
+        finally:
+            builder.shutdown()
+
+    def test_builder_small_band(self):
+        builder = SliceBuilder(self.reader)
+        # room for one row of every plane only
+        builder.band_size_mb = 4 * 6 * 2 / 1e6
+        try:
+            builder.build(self.request, 'z', 4, 'xz', 3).result()
+            self.assertIsNotNone(builder.from_band(builder.key(self.request, 'z', 'xz', 3)))
+            self.assertIsNone(builder.from_band(builder.key(self.request, 'z', 'xz', 4)))
+        finally:
+            builder.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
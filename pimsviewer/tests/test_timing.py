@@ -0,0 +1,58 @@
+import os
+import csv
+import shutil
+import tempfile
+import unittest
+
+from pimsviewer.timing import FrameTimings
+
+
+class FrameTimingsTest(unittest.TestCase):
+    def setUp(self):
+        self.timings = FrameTimings(size=4)
+
+    def test_ring_buffer(self):
+        for i in range(10):
+            self.timings.add('decode', i / 1000.0)
+
+        durations = self.timings.durations('decode')
+        self.assertEqual(durations.tolist(), [6.0, 7.0, 8.0, 9.0])
+
+        stats = self.timings.stats()['decode']
+        self.assertEqual(stats['n'], 4)
+        self.assertAlmostEqual(stats['p50'], 7.5)
+        self.assertAlmostEqual(stats['max'], 9.0)
+
+    def test_measure(self):
+        with self.timings.measure('composite'):
+            pass
+        self.assertEqual(self.timings.stages, ['composite'])
+
+        self.timings.enabled = False
+        with self.timings.measure('composite'):
+            pass
+        self.timings.add('decode', 1.0)
+        self.assertEqual(len(self.timings.durations('composite')), 1)
+        self.assertEqual(self.timings.stages, ['composite'])
+
+    def test_write_csv(self):
+        self.timings.add('decode', 0.002, start=10.0)
+        self.timings.add('composite', 0.001, start=10.5)
+        self.timings.add('decode', 0.003, start=11.0)
+
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'timings.csv')
+            self.assertEqual(self.timings.write_csv(filename), 3)
+            with open(filename) as f:
+                rows = list(csv.reader(f))
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual(rows[0], ['start_s', 'stage', 'duration_ms'])
+        self.assertEqual([row[1] for row in rows[1:]], ['decode', 'composite', 'decode'])
+        self.assertEqual([float(row[0]) for row in rows[1:]], [0.0, 0.5, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
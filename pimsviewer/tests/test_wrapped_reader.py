@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pims
+from pims import FramesSequence
+
+from pimsviewer.wrapped_reader import WrappedReader, FrameRequest
+
+
+class PlainReader(FramesSequence):
+    def __init__(self, t=5, shape=(8, 6, 3)):
+        self._len = t
+        self._shape = shape
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def frame_shape(self):
+        return self._shape
+
+    @property
+    def pixel_type(self):
+        return np.uint8
+
+    def get_frame(self, i):
+        frame = np.zeros(self._shape, dtype=self.pixel_type)
+        frame[..., 1] = i
+        frame[0, :, :] += 100
+        return frame
+
+
+class FallbackReaderTest(unittest.TestCase):
+    def test_sizes(self):
+        reader = WrappedReader(PlainReader())
+        self.assertEqual(reader.sizes, {'t': 5, 'c': 3, 'y': 8, 'x': 6})
+        self.assertEqual(reader.default_coords, {'t': 0, 'c': 0, 'y': 0, 'x': 0})
+        # reading default coordinates does not modify the sizes
+        self.assertEqual(reader.sizes['t'], 5)
+
+    def test_read_t_and_bundle_order(self):
+        reader = WrappedReader(PlainReader())
+
+        frame = reader.read_frame(FrameRequest.create(3, 't', 'xy', {'c': 1}))
+        self.assertEqual(frame.shape, (6, 8))
+        self.assertEqual(frame[0, 1], 3)
+        self.assertEqual(frame[0, 0], 103)
+
+        frame = reader.read_frame(FrameRequest.create(0, '', 'cyx', {'t': 4}))
+        self.assertEqual(frame.shape, (3, 8, 6))
+        self.assertEqual(frame[1, 1, 0], 4)
+
+    def test_memmap(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'stack.tif')
+            data = np.arange(6 * 16 * 12, dtype=np.uint16).reshape(6, 16, 12)
+            import tifffile
+            tifffile.imwrite(filename, data)
+
+            reader = WrappedReader(pims.open(filename))
+            frame = reader.read_frame(FrameRequest.create(2, 't', 'xy', {}))
+            self.assertIsInstance(reader._memmap, np.memmap)
+            np.testing.assert_array_equal(frame, data[2].T)
+            reader.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
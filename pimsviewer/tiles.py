@@ -0,0 +1,91 @@
+import math
+from collections import OrderedDict
+import numpy as np
+
+from pimsviewer.utils import qimage_from_array, image_to_pixmap
+
+
+class TilePyramid(object):
+    """Display tiles of a large frame at several levels of detail.
+
+    Level 0 is the frame at full resolution, every next level halves the
+    resolution. Levels are strided views on the frame, so a tile is only
+    read and converted for display when it is requested; converted tiles
+    are kept in an LRU cache.
+
+    `array` is a (y, x) array of raw data that is mapped with `display`, or
+    a (y, x, 3) or (y, x, 4) uint8 array of display data.
+    """
+    tile_size = 512
+    cache_size = 256
+
+    def __init__(self, array, display):
+        super(TilePyramid, self).__init__()
+
+        self.array = array
+        self.display = display
+        self._tiles = OrderedDict()
+
+        self.height, self.width = array.shape[:2]
+        self.levels = 1 + max(0, int(math.ceil(math.log2(max(self.height, self.width) / float(self.tile_size)))))
+
+        # set the display limits from the whole frame, not from the first tile
+        if self.is_raw and display.limits is None:
+            step = 2 ** (self.levels - 1)
+            display.autoscale(array[::step, ::step])
+
+    @property
+    def is_raw(self):
+        return self.array.ndim == 2
+
+    def level(self, level):
+        step = 2 ** level
+        return self.array[::step, ::step]
+
+    def level_for_scale(self, scale):
+        """Returns the coarsest level at which a tile pixel is not larger than a screen pixel."""
+        if scale <= 0:
+            return self.levels - 1
+
+        level = int(math.floor(math.log2(1.0 / scale))) if scale < 1.0 else 0
+        return max(0, min(level, self.levels - 1))
+
+    def tile_range(self, level, rect):
+        """Tile indices (ix, iy) at a level that intersect rect, in full resolution coordinates."""
+        size = self.tile_size * 2 ** level
+        x0 = max(0, int(math.floor(rect.left() / size)))
+        y0 = max(0, int(math.floor(rect.top() / size)))
+        x1 = min(int(math.ceil(self.width / float(size))), int(math.ceil(rect.right() / size)))
+        y1 = min(int(math.ceil(self.height / float(size))), int(math.ceil(rect.bottom() / size)))
+
+        return [(ix, iy) for iy in range(y0, y1) for ix in range(x0, x1)]
+
+    def tile(self, level, ix, iy):
+        key = (level, ix, iy)
+        try:
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+        except KeyError:
+            pass
+
+        size = self.tile_size
+        data = self.level(level)[iy * size:(iy + 1) * size, ix * size:(ix + 1) * size]
+        if self.is_raw:
+            data = self.display.to_display(data)
+
+        pixmap = image_to_pixmap(qimage_from_array(data))
+
+        self._tiles[key] = pixmap
+        while len(self._tiles) > self.cache_size:
+            self._tiles.popitem(last=False)
+
+        return pixmap
+
+    def full_pixmap(self):
+        data = self.array
+        if self.is_raw:
+            data = self.display.to_display(data)
+        return image_to_pixmap(qimage_from_array(data))
+
+    def clear(self):
+        self._tiles.clear()
@@ -0,0 +1,116 @@
+import csv
+import time
+from collections import deque, OrderedDict
+from threading import Lock
+import numpy as np
+
+
+class _Measurement(object):
+    __slots__ = ('timings', 'stage', 'start')
+
+    def __init__(self, timings, stage):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.stage, time.perf_counter() - self.start, self.start)
+
+
+class _NoMeasurement(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FrameTimings(object):
+    """Ring buffers with the durations of the stages of showing frames.
+
+    Stages are timed with `with timings.measure('decode'): ...`, from any
+    thread. Every stage keeps its last `size` durations, from which `stats`
+    computes percentiles; recording costs a deque append per stage and
+    nothing when disabled.
+    """
+
+    def __init__(self, size=1024):
+        super(FrameTimings, self).__init__()
+
+        self.size = size
+        self.enabled = True
+        self._stages = OrderedDict()
+        self._lock = Lock()
+        self._none = _NoMeasurement()
+
+    def measure(self, stage):
+        if not self.enabled:
+            return self._none
+        return _Measurement(self, stage)
+
+    def add(self, stage, duration, start=None):
+        """Records a duration in seconds, of a stage that started at time.perf_counter() `start`."""
+        if not self.enabled:
+            return
+
+        buffer = self._stages.get(stage)
+        if buffer is None:
+            with self._lock:
+                buffer = self._stages.setdefault(stage, deque(maxlen=self.size))
+
+        if start is None:
+            start = time.perf_counter() - duration
+        buffer.append((start, duration))
+
+    @property
+    def stages(self):
+        return list(self._stages)
+
+    def records(self, stage):
+        # copying a deque holds the GIL, so appends from other threads cannot interfere
+        return tuple(self._stages.get(stage, ()))
+
+    def durations(self, stage):
+        """Recorded durations of stage in ms, oldest first."""
+        return np.array([duration for start, duration in self.records(stage)]) * 1e3
+
+    def stats(self):
+        """Count, median, 95th percentile and maximum in ms per stage."""
+        stats = OrderedDict()
+        for stage in self.stages:
+            durations = self.durations(stage)
+            if len(durations) == 0:
+                continue
+            p50, p95 = np.percentile(durations, [50, 95])
+            stats[stage] = OrderedDict([('n', len(durations)), ('p50', p50), ('p95', p95), ('max', durations.max())])
+        return stats
+
+    def clear(self):
+        with self._lock:
+            for buffer in self._stages.values():
+                buffer.clear()
+
+    def write_csv(self, filename):
+        """Writes all recorded timings, ordered by start time, which is in seconds since the first."""
+        rows = [(start, stage, duration) for stage in self.stages for start, duration in self.records(stage)]
+        rows.sort()
+        first = rows[0][0] if rows else 0.0
+
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['start_s', 'stage', 'duration_ms'])
+            for start, stage, duration in rows:
+                writer.writerow(['%.6f' % (start - first), stage, '%.4f' % (duration * 1e3)])
+
+        return len(rows)
+
+    def __repr__(self):
+        return "<FrameTimings: %d stages, %d of %d timings>" % (
+            len(self._stages), sum(len(buffer) for buffer in self._stages.values()), self.size * len(self._stages))
+
+
+# timings of the viewer, recorded by the reader, the image widget and the GUI
+timings = FrameTimings()
@@ -1,19 +1,21 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 import functools
+import importlib
 import numpy as np
 import pims
 from pims import to_rgb, normalize
 from pims.base_frames import FramesSequence, FramesSequenceND
 from pims.utils.sort import natural_keys
 from itertools import chain
-from os import listdir, path
-from os.path import isfile, join
+from os import path, scandir
 
 from PIL import Image, ImageQt
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 
+from pimsviewer.wrapped_reader import load_optional_readers
+
 def memoize(obj):
     """Memoize the function call result"""
     cache = obj.cache = {}
@@ -51,25 +53,80 @@ def get_available_readers():
     return readers
 
 
+@memoize
 def get_supported_extensions():
+    load_optional_readers()
+
     # list all readers derived from the pims baseclasses
     all_handlers = chain(recursive_subclasses(FramesSequence),
                          recursive_subclasses(FramesSequenceND))
     # keep handlers that support the file ext. use set to avoid duplicates.
-    extensions = set(ext for h in all_handlers for ext in map(drop_dot, h.class_exts()))
+    extensions = frozenset(ext for h in all_handlers for ext in map(drop_dot, h.class_exts()))
 
     return extensions
 
+def has_extension(filename, extensions=None):
+    return extensions is None or drop_dot(path.splitext(filename)[1]) in extensions
+
+def list_files_in_dir(directory, extensions=None):
+    # scandir usually knows the file type without a stat call per file
+    with scandir(directory) as entries:
+        return [entry.name for entry in entries if has_extension(entry.name, extensions) and entry.is_file()]
+
+@memoize
+def load_ui_form(name):
+    """Returns the form class of pimsviewer/<name>.ui, for use as a mixin with setupUi.
+
+    Prefers the module compiled by pyuic5 when pimsviewer was built
+    (pimsviewer/ui_<name>.py); otherwise the .ui file is compiled once.
+    """
+    try:
+        module = importlib.import_module('pimsviewer.ui_%s' % name)
+        return next(getattr(module, attr) for attr in dir(module) if attr.startswith('Ui_'))
+    except ImportError:
+        pass
+
+    from PyQt5 import uic
+    form, _ = uic.loadUiType(path.join(path.dirname(path.realpath(__file__)), name + '.ui'))
+    return form
+
 def get_all_files_in_dir(directory, extensions=None):
-    if extensions is None:
-        file_list = [f for f in listdir(directory) if isfile(join(directory, f))]
-    else:
-        file_list = [f for f in listdir(directory) if isfile(join(directory, f))
-                     and drop_dot(path.splitext(f)[1]) in extensions]
+    return sorted(list_files_in_dir(directory, extensions), key=natural_keys)
+
+_qimage_formats = {1: QImage.Format_Grayscale8, 3: QImage.Format_RGB888, 4: QImage.Format_RGBA8888}
+
+def can_wrap_as_qimage(array):
+    if array.dtype != np.uint8:
+        return False
+
+    if array.ndim == 2:
+        return True
+
+    return array.ndim == 3 and array.shape[2] in _qimage_formats
 
-    return sorted(file_list, key=natural_keys)
+def qimage_from_array(array):
+    """Wrap a uint8 array of shape (h, w), (h, w, 3) or (h, w, 4) as QImage.
+
+    The pixel buffer is shared with the array, which is only copied when it
+    is not C-contiguous. A reference to the array is stored on the QImage, so
+    that the buffer is kept alive for as long as the image exists.
+    """
+    if not can_wrap_as_qimage(array):
+        raise ValueError('Cannot wrap array of shape %s and type %s as QImage' % (array.shape, array.dtype))
+
+    array = np.ascontiguousarray(array)
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    height, width = array.shape[:2]
+
+    image = QImage(array.data, width, height, array.strides[0], _qimage_formats[channels])
+    image._array = array
+
+    return image
 
 def pixmap_from_array(array):
+    if can_wrap_as_qimage(array):
+        return image_to_pixmap(qimage_from_array(array))
+
     # Convert to image
     image = Image.fromarray(array)
     pixmap = ImageQt.toqpixmap(image)
@@ -81,3 +138,27 @@ def image_to_pixmap(image):
     pixmap = QPixmap.fromImage(image, flags)
 
     return pixmap
+
+class FutureWatcher(QObject):
+    """Emits `finished` with a concurrent.futures.Future when it is done.
+
+    The signal is delivered in the thread of the watcher (normally the GUI
+    thread), also when the future finishes on a worker thread.
+    """
+    finished = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super(FutureWatcher, self).__init__(parent)
+        self._watched = set()
+
+    def watch(self, future):
+        # watching a future twice emits finished once
+        if future in self._watched:
+            return
+
+        self._watched.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self._watched.discard(future)
+        self.finished.emit(future)
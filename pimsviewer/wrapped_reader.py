@@ -1,13 +1,122 @@
+import importlib
+from collections import namedtuple
+from os import path
+from threading import RLock
+import pims
 from pims import FramesSequenceND
 import numpy as np
 
+from pimsviewer.frame_cache import FrameCache
+from pimsviewer.timing import timings
+
+
+class FrameRequest(namedtuple('FrameRequest', ['index', 'iter_axes', 'bundle_axes', 'default_coords'])):
+    """Self-contained description of a single read from a (wrapped) reader.
+
+    Requests are hashable, so they can be used as keys for buffers and caches.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, index, iter_axes='', bundle_axes='yx', default_coords=None):
+        if default_coords is None:
+            default_coords = {}
+        coords = tuple(sorted((dim, int(pos)) for dim, pos in default_coords.items()))
+        return cls(int(index), ''.join(iter_axes), ''.join(bundle_axes), coords)
+
+    def with_index(self, index):
+        return self._replace(index=int(index))
+
+    @property
+    def coords(self):
+        """Position along every axis that is not bundled, as dict."""
+        coords = dict(self.default_coords)
+        if self.iter_axes:
+            coords[self.iter_axes] = self.index
+        return coords
+
+
+def make_request(sizes, positions, merged='', iter_axis='', projection_axis=None):
+    """Returns the request of the frame at positions, as the viewer shows it.
+
+    Axes in `merged` are bundled, except `projection_axis`, which is read
+    plane by plane and projected. `iter_axis` is the playing axis, if any.
+    """
+    bundle_axes = 'yx'
+    for dim in 'tvzcxy':
+        if dim in sizes and dim in merged and dim not in bundle_axes and dim != projection_axis:
+            bundle_axes += dim
+
+    # always one playing axis at a time, which cannot be bundled or projected
+    iter_axes = ''
+    i = 0
+    if iter_axis in sizes and iter_axis not in bundle_axes and iter_axis != projection_axis:
+        iter_axes = iter_axis
+        i = positions.get(iter_axis, 0)
+
+    # the position along the playing axis is the index only, so that requests
+    # of frames along it differ in index alone, like the ones that are prefetched
+    default_coords = {dim: positions.get(dim, 0) for dim in 'tvzcxy' if dim in sizes and dim != iter_axes}
+
+    return FrameRequest.create(i, iter_axes, bundle_axes, default_coords)
+
+
+# readers that register themselves with pims, but are not part of it
+_optional_readers = {'nd2': 'nd2reader'}
+
+def load_optional_readers(filename=None):
+    """Imports the optional readers, or only the one for filename, when installed."""
+    if filename is None:
+        modules = _optional_readers.values()
+    else:
+        ext = path.splitext(filename)[1].lstrip('.').lower()
+        modules = [_optional_readers[ext]] if ext in _optional_readers else []
+
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def open_reader(filename, cache_size_mb=None, disk_cache=None, cache=None):
+    """Opens filename, with a frame cache of its own of cache_size_mb, or one shared with other files."""
+    load_optional_readers(filename)
+    disk_store = disk_cache.store(filename) if disk_cache is not None else None
+    reader = WrappedReader(pims.open(filename), cache_size_mb=cache_size_mb, disk_store=disk_store)
+    if cache is not None:
+        reader.cache = cache
+        reader.cache_token = (path.abspath(filename), path.getmtime(filename))
+    return reader
+
+
 class WrappedReader(object):
-    def __init__(self, reader):
+    # attributes that are not forwarded to the underlying reader
+    _own_attrs = ['reader', 'cache', 'cache_token', 'disk_store', '_fallback_sizes', '_fallback_axis_order', '_fallback_def_coords',
+                  '_fallback_indexers', '_memmap', '_lock']
+    # files that can be memory mapped when they are not compressed
+    _memmap_exts = ('.tif', '.tiff')
+
+    def __init__(self, reader, cache_size_mb=None, disk_store=None):
         super(WrappedReader, self).__init__()
         self.reader = reader
 
+        # opt-in cache of decoded frames
+        self.cache = None
+        if cache_size_mb:
+            self.cache = FrameCache(cache_size_mb)
+        # distinguishes the frames of this file in a cache that is shared with other files
+        self.cache_token = None
+        # opt-in frames of this file in a DiskCache, kept across sessions
+        self.disk_store = disk_store
+
         self._fallback_sizes = {}
         self._fallback_axis_order = {}
+        self._fallback_def_coords = {}
+        self._fallback_indexers = {}
+        # False until a memory map of the file has been attempted
+        self._memmap = False
+        self._lock = RLock()
 
     def __getattr__(self, attr):
         if hasattr(self.reader, attr):
@@ -23,7 +132,7 @@ class WrappedReader(object):
     def __setattr__(self, attr, value):
         self.setattr_only_self(attr, value)
 
-        if attr not in ['reader', '_fallback_sizes', '_fallback_axis_order']:
+        if attr not in self._own_attrs:
             setattr(self.reader, attr, value)
 
     def get_fallback_function(self, attr):
@@ -33,33 +142,152 @@ class WrappedReader(object):
         if attr == 'default_coords':
             return self.fallback_def_coords
 
+        # a plain FramesSequence iterates over 't' and returns 'yx' frames
+        if attr == 'iter_axes':
+            return 't'
+
+        if attr == 'bundle_axes':
+            return 'yx'
+
         raise AttributeError("Attribute '%s' not found in WrappedReader" % attr)
 
+    def read_frame(self, request):
+        """Read the frame described by a FrameRequest.
+
+        The axis state of the reader is set and used while holding a lock, so
+        this is safe to call from worker threads. When the frame cache or
+        the disk cache is enabled, the request is used as cache key; frames on
+        disk are memory mapped instead of decoded.
+        """
+        frame = self.cached_frame(request)
+        if frame is None:
+            frame = self.decode_frame(request)
+        return frame
+
+    def read_frames(self, requests):
+        return [self.read_frame(request) for request in requests]
+
+    def cache_key(self, request):
+        if self.cache_token is None:
+            return request
+        return (self.cache_token, request)
+
+    def cached_frame(self, request):
+        """The frame of request from the frame cache or the disk cache, or None."""
+        if self.cache is not None:
+            frame = self.cache.get(self.cache_key(request))
+            if frame is not None:
+                return frame
+
+        if self.disk_store is None:
+            return None
+
+        with timings.measure('disk cache'):
+            frame = self.disk_store.get(request)
+
+        if frame is not None and self.cache is not None:
+            self.cache.put(self.cache_key(request), frame)
+        return frame
+
+    def decode_frame(self, request):
+        """Decodes the frame of request, and adds it to the caches."""
+        with self._lock:
+            self.bundle_axes = request.bundle_axes
+            self.iter_axes = request.iter_axes
+            self.default_coords = dict(request.default_coords)
+            with timings.measure('decode'):
+                frame = self[request.index]
+
+        # frames of memory mapped files are read as fast as from the disk cache
+        if self.disk_store is not None and not isinstance(self._memmap, np.memmap):
+            self.disk_store.put(request, frame)
+
+        if self.cache is not None:
+            self.cache.put(self.cache_key(request), frame)
+
+        return frame
+
     def __getitem__(self, key):
         if isinstance(self.reader, FramesSequenceND):
             return self.reader[key]
+
+        # provide a fallback for the FramesSequenceND behaviour
+        iter_axes = ''.join(self.iter_axes)
+        frame_axes, transpose = self.fallback_indexer(iter_axes, ''.join(self.bundle_axes))
+        coords = self.default_coords
+
+        if 't' in iter_axes:
+            t = key
         else:
-            # provide a fallback for the FramesSequenceND behaviour
-            frame = self.reader[0]
-            index_values = []
-            index_order = []
-            for dim in self.sizes:
-                if dim == 't':
-                    continue
-
-                if dim in self.bundle_axes:
-                    index_values.append(slice(None))
-                    index_order.append(self.fallback_axis_order[dim])
-                elif dim in self.iter_axes:
-                    index_values.append(key)
-                    index_order.append(self.fallback_axis_order[dim])
-                else:
-                    index_values.append(self.fallback_def_coords[dim])
-                    index_order.append(self.fallback_axis_order[dim])
-
-            index_order, index_values = (t for t in zip(*sorted(zip(index_order, index_values))))
-
-            return frame[index_values]
+            t = coords.get('t', 0)
+
+        index_values = []
+        for dim, bundled in frame_axes:
+            if bundled:
+                index_values.append(slice(None))
+            elif dim in iter_axes:
+                index_values.append(key)
+            else:
+                index_values.append(coords.get(dim, 0))
+
+        frame = self.fallback_frame(t)[tuple(index_values)]
+        if transpose is not None:
+            frame = np.transpose(frame, transpose)
+
+        return frame
+
+    def fallback_frame(self, t):
+        """Returns frame t, as a view on a memory map if the file allows it."""
+        if self._memmap is False:
+            self._memmap = self.open_memmap()
+
+        if self._memmap is not None:
+            return self._memmap[t]
+
+        return self.reader[t]
+
+    def open_memmap(self):
+        filename = getattr(self.reader, 'filename', None) or getattr(self.reader, '_filename', None)
+        if not isinstance(filename, str) or not filename.lower().endswith(self._memmap_exts):
+            return None
+
+        try:
+            import tifffile
+            array = tifffile.memmap(filename, mode='r')
+        except Exception:
+            # compressed, tiled or otherwise not contiguous
+            return None
+
+        shape = (len(self.reader),) + tuple(self.reader.frame_shape)
+        if shape[0] == 1 and array.shape == shape[1:]:
+            array = array[np.newaxis]
+
+        if array.shape != shape or array.dtype != np.dtype(self.reader.pixel_type):
+            return None
+
+        return array
+
+    def fallback_indexer(self, iter_axes, bundle_axes):
+        """Axes of the underlying frames, and the transpose that gives bundle_axes order.
+
+        Computed once for every combination of iter_axes and bundle_axes.
+        """
+        try:
+            return self._fallback_indexers[(iter_axes, bundle_axes)]
+        except KeyError:
+            pass
+
+        order = self.fallback_axis_order
+        frame_dims = sorted(order, key=order.get)
+        frame_axes = tuple((dim, dim in bundle_axes) for dim in frame_dims)
+
+        kept_dims = [dim for dim in frame_dims if dim in bundle_axes]
+        transpose = tuple(kept_dims.index(dim) for dim in bundle_axes if dim in kept_dims)
+        if transpose == tuple(range(len(kept_dims))):
+            transpose = None
+
+        self._fallback_indexers[(iter_axes, bundle_axes)] = (frame_axes, transpose)
+        return frame_axes, transpose
 
     def __len__(self):
         return len(self.reader)
@@ -77,6 +305,8 @@ class WrappedReader(object):
         return "<<WrappedReader: %s>>" % str(self.reader)
 
     def close(self):
+        self._memmap = None
+
         try:
             self.reader.close()
         except AttributeError:
@@ -101,23 +331,23 @@ class WrappedReader(object):
         sizes['t'] = len(self.reader)
 
         frame_shape = self.reader.frame_shape
-        to_process = np.arange(0, len(frame_shape), 1)
+        to_process = list(range(len(frame_shape)))
 
         if len(to_process) > 2:
-            c_ix = np.argmin(frame_shape)
+            c_ix = int(np.argmin(frame_shape))
             sizes['c'] = frame_shape[c_ix]
             order['c'] = c_ix
-            to_process = np.delete(to_process, c_ix)
+            to_process.remove(c_ix)
 
         if len(to_process) == 3:
-            sizes['z'] = frame_shape[-1]
-            order['z'] = to_process[-1]
-            to_process = np.delete(to_process, -1)
+            z_ix = to_process.pop()
+            sizes['z'] = frame_shape[z_ix]
+            order['z'] = z_ix
 
-        sizes['y'] = frame_shape[0]
-        order['y'] = 0
-        sizes['x'] = frame_shape[1]
-        order['x'] = 1
+        sizes['y'] = frame_shape[to_process[0]]
+        order['y'] = to_process[0]
+        sizes['x'] = frame_shape[to_process[1]]
+        order['x'] = to_process[1]
 
         self._fallback_sizes = sizes
         self._fallback_axis_order = order
@@ -126,10 +356,9 @@ class WrappedReader(object):
 
     @property
     def fallback_def_coords(self):
-        coords = self.fallback_sizes
-        for dim in coords:
-            coords[dim] = 0
-        return coords
+        if len(self._fallback_def_coords) == 0:
+            self._fallback_def_coords = {dim: 0 for dim in self.fallback_sizes}
+        return self._fallback_def_coords
 
     @fallback_def_coords.setter
     def fallback_def_coords(self, value):
@@ -1,5 +1,7 @@
 import os
+from glob import glob
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 try:
     descr = open(os.path.join(os.path.dirname(__file__), 'README.md')).read()
@@ -13,6 +15,25 @@ try:
 except ImportError:
     pass
 
+
+class build_py_with_ui(build_py):
+    """Compiles the Qt Designer files to Python modules, so that they are not parsed at startup."""
+
+    def run(self):
+        build_py.run(self)
+
+        try:
+            from PyQt5 import uic
+        except ImportError:
+            return
+
+        for ui_file in glob(os.path.join('pimsviewer', '*.ui')):
+            name = os.path.splitext(os.path.basename(ui_file))[0]
+            target = os.path.join(self.build_lib, 'pimsviewer', 'ui_%s.py' % name)
+            with open(target, 'w') as f:
+                uic.compileUi(ui_file, f)
+
+
 setup_parameters = dict(
     name="pimsviewer",
     version='2.0',
@@ -20,16 +41,17 @@ setup_parameters = dict(
     author="Ruben Verweij",
     author_email="ruben@lighthacking.nl",
     url="https://github.com/soft-matter/pimsviewer",
-    install_requires=['click', 'pims', 'PyQt5>=5.13.1', 'pandas', 'numpy', 'Pillow'],
-    python_requires='>=3.0',
+    install_requires=['click>=8.0', 'pims', 'PyQt5>=5.13.1', 'pandas', 'numpy', 'Pillow'],
+    python_requires='>=3.7',
     packages=['pimsviewer'],
     package_dir={'pimsviewer': 'pimsviewer'},
     package_data={'': ['*.ui']},
     long_description=descr,
     long_description_content_type="text/markdown",
+    cmdclass={'build_py': build_py_with_ui},
     entry_points={
-        'gui_scripts': [
-            'pimsviewer=pimsviewer.gui:run',
+        'console_scripts': [
+            'pimsviewer=pimsviewer.cli:main',
         ],
     },
 )